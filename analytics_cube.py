@@ -0,0 +1,330 @@
+"""
+Genre x release year x release type aggregate of the whole catalog
+
+Every cell keep a histogram of track popularity (0 - 100), so cell can be merged by adding
+histogram and count, mean and percentile of any group of cell is exact.
+Cell is keyed by the whole genre list of artist rather than by single genre, so track of
+artist with many genre is still counted once when result is not grouped by genre.
+Cube is built by a process pool over chunk of artist partition, then kept up to date
+by every artist that got committed to database. Cells of each artist is kept so artist
+that got committed again has its old histogram subtracted before the new one is added.
+
+Usage: python analytics_cube.py [--by genre year] [--genre pop] [--type album]
+"""
+import argparse
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from artist_db import ArtistDb, parse_genres
+
+# Popularity is an integer from 0 to 100
+BINS = 101
+
+DIMENSIONS = ('genre', 'year', 'type')
+
+# Genre of artist that has no genre
+NO_GENRE = 'unknown'
+
+
+def artist_genres(value) -> list:
+    """
+    Return genre that artist is counted in
+    :param value: Genre list or its text form
+    :return: List of genre, [NO_GENRE] when artist has no genre
+    """
+    return parse_genres(value) or [NO_GENRE]
+
+
+def aggregate(genres: dict, album: pd.DataFrame, track: pd.DataFrame) -> dict:
+    """
+    Count track popularity of each cell of each artist
+    :param genres: Dictionary of artist ID and list of genre
+    :param album: Album rows of artist
+    :param track: Track rows of artist
+    :return: Dictionary of artist ID and its dictionary of (genre tuple, year, type) and popularity histogram,
+    artist without dated track has empty dictionary
+    """
+
+    joined = track[['artist_id', 'album_id', 'popularity']].merge(
+        album[['artist_id', 'album_id', 'release_date', 'type']],
+        on=['artist_id', 'album_id']
+    )
+
+    joined['year'] = pd.to_numeric(joined['release_date'].astype(str).str[:4], errors='coerce')
+    joined = joined.dropna(subset=['year'])
+
+    counts = joined.groupby(
+        ['artist_id', 'year', 'type', 'popularity'], observed=True
+    ).size().rename('count').reset_index()
+
+    cells = {artist_id: {} for artist_id in genres}
+
+    for (artist_id, year, release_type), group in counts.groupby(['artist_id', 'year', 'type'], sort=False):
+        cells[artist_id][(tuple(genres[artist_id]), int(year), release_type)] = np.bincount(
+            group['popularity'].to_numpy(dtype=np.int64).clip(0, BINS - 1),
+            weights=group['count'].to_numpy(),
+            minlength=BINS
+        ).astype(np.int64)
+
+    return cells
+
+
+def merge(cells: dict, other: dict, sign: int = 1):
+    """
+    Add histogram of other into cells
+    :param sign: -1 to subtract instead, cell that become empty is removed
+    """
+
+    for key, histogram in other.items():
+        if key in cells:
+            cells[key] = cells[key] + sign * histogram
+
+            if not cells[key].any():
+                del cells[key]
+        else:
+            cells[key] = sign * histogram
+
+
+def aggregate_chunk(loader, genres: dict) -> dict:
+    """
+    Load and aggregate chunk of artist, run in worker process
+    :param loader: Picklable partition loader of database backend
+    :param genres: Dictionary of artist ID and list of genre of every artist in chunk
+    :return: Dictionary of artist ID and its cells
+    """
+
+    album, track = loader.load(list(genres))
+    return aggregate(genres, album, track)
+
+
+def histogram_statistics(histogram: np.ndarray, percentiles) -> dict:
+    """
+    Return count, mean and percentile of popularity histogram
+    :param histogram: Popularity histogram
+    :param percentiles: Percentile to compute
+    :return: Dictionary of statistics
+    """
+
+    count = int(histogram.sum())
+    statistics = {'count': count}
+
+    if count == 0:
+        statistics['mean'] = np.nan
+        statistics.update({f'p{p}': np.nan for p in percentiles})
+        return statistics
+
+    cumulative = np.cumsum(histogram)
+    statistics['mean'] = float(np.dot(histogram, np.arange(BINS)) / count)
+
+    # Nearest rank percentile
+    for p in percentiles:
+        rank = max(1, int(np.ceil(p / 100 * count)))
+        statistics[f'p{p}'] = int(np.searchsorted(cumulative, rank))
+
+    return statistics
+
+
+class AnalyticsCube:
+    """
+    Track count and popularity statistics by genre, release year and release type
+    """
+
+    def __init__(self):
+        self._cells = {}
+        self._lock = threading.Lock()
+
+        # Cells and data version of every counted artist
+        self._artist_cells = {}
+        self._versions = {}
+
+    def __len__(self):
+        return len(self._cells)
+
+    @classmethod
+    def build(cls, db, workers: int = None, chunk_size: int = 200) -> 'AnalyticsCube':
+        """
+        Build cube of every artist in database and keep it up to date with database
+        :param db: ArtistDb or SqliteArtistDb object
+        :param workers: Number of worker process, number of CPU by default
+        :param chunk_size: Number of artist read by worker at a time
+        :return: Cube of whole catalog
+        """
+
+        cube = cls()
+
+        artist = db.artist_table()
+        genres = dict(zip(artist['artist_id'], artist['genres'].map(artist_genres)))
+
+        # Version is taken before rows are read, so artist committed meanwhile is counted again
+        versions = {artist_id: db.data_version(artist_id) for artist_id in genres}
+
+        # Partition in memory may not be saved yet, aggregate them in this process
+        album_map, track_map = db.in_memory_partitions()
+        in_memory = [artist_id for artist_id in genres if artist_id in album_map]
+        on_disk = [artist_id for artist_id in genres if artist_id not in album_map]
+
+        cells = {}
+
+        if in_memory:
+            cells.update(aggregate(
+                {artist_id: genres[artist_id] for artist_id in in_memory},
+                pd.concat([album_map[artist_id] for artist_id in in_memory], ignore_index=True),
+                pd.concat([track_map[artist_id] for artist_id in in_memory], ignore_index=True)
+            ))
+
+        chunks = [
+            {artist_id: genres[artist_id] for artist_id in on_disk[start:start + chunk_size]}
+            for start in range(0, len(on_disk), chunk_size)
+        ]
+
+        if chunks:
+            loader = db.partition_loader()
+
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                for chunk_cells in executor.map(aggregate_chunk, [loader] * len(chunks), chunks):
+                    cells.update(chunk_cells)
+
+        for artist_id, artist_cells in cells.items():
+            cube.__replace(artist_id, artist_cells, versions[artist_id])
+
+        db.add_commit_listener(lambda artist_id: cube.add_artist(db, artist_id))
+
+        # Artist committed while building
+        for artist_id in db.artist_table()['artist_id'].unique():
+            if cube._versions.get(artist_id) != db.data_version(artist_id):
+                cube.add_artist(db, artist_id)
+
+        return cube
+
+    def __replace(self, artist_id, cells: dict, version: int):
+        """
+        Replace cells of artist, older version than the one already counted is ignored
+        :param artist_id: Spotify artist ID
+        :param cells: Dictionary of cell and popularity histogram of artist
+        :param version: Data version of artist rows that cells is counted from
+        """
+
+        with self._lock:
+            if self._versions.get(artist_id, -1) > version:
+                return
+
+            merge(self._cells, self._artist_cells.get(artist_id, {}), -1)
+            merge(self._cells, cells)
+
+            self._artist_cells[artist_id] = cells
+            self._versions[artist_id] = version
+
+    def add_artist(self, db, artist_id: str):
+        """
+        Count rows of committed artist, used as commit listener of database
+        Artist that is already counted has its old cells replaced.
+        :param db: Database that artist got committed into
+        :param artist_id: Spotify artist ID
+        """
+
+        version = db.data_version(artist_id)
+
+        artist = db.artist_table()
+        genre_value = artist.loc[artist['artist_id'] == artist_id, 'genres']
+        genres = {artist_id: artist_genres(genre_value.iloc[0] if len(genre_value) else None)}
+
+        album_map, track_map = db.in_memory_partitions()
+
+        if artist_id in album_map:
+            cells = aggregate(genres, album_map[artist_id], track_map[artist_id])
+        else:
+            cells = aggregate_chunk(db.partition_loader(), genres)
+
+        self.__replace(artist_id, cells[artist_id], version)
+
+    def query(
+            self,
+            genre=None,
+            year=None,
+            release_type=None,
+            by=('year',),
+            percentiles=(25, 50, 75, 90)
+    ) -> pd.DataFrame:
+        """
+        Return statistics of track in cells that match filter grouped by dimension
+        :param genre: Genre or list of genre to include, every genre when None
+        :param year: Year, list of year or (first, last) range tuple, every year when None
+        :param release_type: 'album' or 'single', both when None
+        :param by: Dimension to group by, any of 'genre', 'year', 'type',
+        track of artist with many genre is counted once unless grouped by genre
+        :param percentiles: Popularity percentile to compute
+        :return: Dataframe indexed by group with count, mean and percentile column
+        """
+
+        def accept(value, condition):
+            if condition is None:
+                return True
+            if isinstance(condition, tuple):
+                return condition[0] <= value <= condition[1]
+            if isinstance(condition, (list, set)):
+                return value in condition
+            return value == condition
+
+        groups = {}
+
+        with self._lock:
+            for (genres, *key), histogram in self._cells.items():
+                if not (accept(key[0], year) and accept(key[1], release_type)):
+                    continue
+
+                matched = [value for value in genres if accept(value, genre)]
+
+                if not matched:
+                    continue
+
+                # Track is counted in each of its genre only when grouped by genre
+                for value in matched if 'genre' in by else matched[:1]:
+                    values = dict(zip(DIMENSIONS, (value, *key)))
+                    group = tuple(values[dimension] for dimension in by)
+                    groups[group] = groups.get(group, 0) + histogram
+
+        rows = [
+            {**dict(zip(by, group)), **histogram_statistics(histogram, percentiles)}
+            for group, histogram in groups.items()
+        ]
+
+        columns = list(by) + ['count', 'mean'] + [f'p{p}' for p in percentiles]
+        result = pd.DataFrame(rows, columns=columns)
+
+        return result.sort_values(list(by)).set_index(list(by)) if by else result
+
+
+def main():
+    """
+    Build cube of csv database and print query result
+    """
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--artist-csv', default='csv/artist.csv')
+    parser.add_argument('--album-dir', default='csv/album')
+    parser.add_argument('--track-dir', default='csv/track')
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--by', nargs='*', default=['year'], choices=DIMENSIONS)
+    parser.add_argument('--genre')
+    parser.add_argument('--type', choices=['album', 'single'])
+    args = parser.parse_args()
+
+    db = ArtistDb(None, args.artist_csv, args.album_dir, args.track_dir)
+
+    start = time.perf_counter()
+    cube = AnalyticsCube.build(db, args.workers)
+    built = time.perf_counter() - start
+
+    start = time.perf_counter()
+    result = cube.query(genre=args.genre, release_type=args.type, by=tuple(args.by))
+    queried = time.perf_counter() - start
+
+    print(result.to_string())
+    print(f'{len(cube)} cells built in {built:.2f}s, queried in {queried * 1000:.1f} ms')
+
+
+if __name__ == '__main__':
+    main()
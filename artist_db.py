@@ -2,132 +2,697 @@
 Model part of MVC design pattern
 Module for artist discography database and spotipy library
 """
+import ast
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from types import MappingProxyType
+from typing import Mapping, NamedTuple
 import numpy as np
 import spotipy
 import pandas as pd
+from batcher import BatchDispatcher
+from tracing import current_span, trace_client, traced
+
+# Maximum number of ID in one albums and tracks request of Spotify Web API
+ALBUM_BATCH_SIZE = 20
+TRACK_BATCH_SIZE = 50
+
+ARTIST_COLUMNS = [
+    'artist_name',
+    'artist_id',
+    'genres',
+    'followers',
+    'popularity',
+    'img_url',
+    'external_url',
+]
+
+ALBUM_COLUMNS = [
+    'artist_id',
+    'external_url',
+    'img_url',
+    'album_name',
+    'album_id',
+    'release_date',
+    'release_date_precision',
+    'total_tracks',
+    'type',
+    'popularity'
+]
+
+TRACK_COLUMNS = [
+    'artist_id',
+    'album_id',
+    'track_id',
+    'track_name',
+    'popularity',
+    'duration_ms'
+]
+
+ARTIST_DTYPES = {
+    'followers': 'int64',
+    'popularity': 'int8',
+}
+
+ALBUM_DTYPES = {
+    'total_tracks': 'int16',
+    'popularity': 'int8'
+}
+
+TRACK_DTYPES = {
+    'popularity': 'int8',
+    'duration_ms': 'int32'
+}
+
+# Primary key of each table, the same album or track can belong to many artist
+ARTIST_KEY = ['artist_id']
+ALBUM_KEY = ['album_id', 'artist_id']
+TRACK_KEY = ['track_id', 'artist_id']
+
+
+def read_table(file_name: str, correct_column: list, dtypes: dict) -> pd.DataFrame:
+    """
+    Read csv table, check its column and set datatype for each column
+    :param file_name: Name of csv file to read
+    :param correct_column: List of column name that csv file must have
+    :param dtypes: Dictionary of column name and its datatype
+    :return: Dataframe of csv file content
+    """
+
+    table = pd.read_csv(file_name)
+
+    if len(table.columns) != len(correct_column):
+        raise ValueError(f"{file_name} doesn't have correct number of column")
+
+    if any(table.columns != np.array(correct_column)):
+        raise ValueError(f"{file_name} columns doesn't have correct columns name")
+
+    return table.astype(dtypes, copy=True)
+
+
+def parse_genres(value) -> list:
+    """
+    Return list of genre of artist
+    Genre is a list for artist added in this session and its text form when read from csv file.
+    :param value: Genre list or its text form
+    :return: List of genre, empty list when artist has no genre
+    """
+
+    if isinstance(value, str):
+        try:
+            value = ast.literal_eval(value)
+        except (ValueError, SyntaxError):
+            value = [value]
+
+    if not isinstance(value, (list, tuple)):
+        return []
+
+    return list(value)
+
+
+def row_hashes(table: pd.DataFrame) -> np.ndarray:
+    """
+    Return hash of every row, equal row get equal hash
+    Value is hashed by its text so genre list and its csv text form get the same hash.
+    :param table: Dataframe to hash
+    :return: Array of row hash
+    """
+    return pd.util.hash_pandas_object(table.astype(str), index=False).to_numpy()
+
+
+def deduplicate(table: pd.DataFrame, key: list) -> pd.DataFrame:
+    """
+    Keep only the last row of each primary key
+    :param table: Dataframe that may have many row with the same key
+    :param key: List of primary key column
+    :return: Dataframe with unique key
+    """
+    return table.drop_duplicates(subset=key, keep='last', ignore_index=True)
+
+
+def upsert(table: pd.DataFrame, rows: pd.DataFrame, key: list) -> pd.DataFrame:
+    """
+    Insert rows into table, row whose key is already in table replace the old row
+    :param table: Existing rows
+    :param rows: New rows
+    :param key: List of primary key column
+    :return: Dataframe with unique key
+    """
+
+    rows = deduplicate(rows, key)
+
+    replaced = pd.MultiIndex.from_frame(table[key]).isin(pd.MultiIndex.from_frame(rows[key]))
+
+    return pd.concat([table.loc[~replaced], rows], ignore_index=True)
+
+
+def contains_rows(table: pd.DataFrame, rows: pd.DataFrame) -> bool:
+    """
+    Check that every row is already in table with the same value
+    :param table: Existing rows
+    :param rows: New rows with the same column
+    :return: True when upserting rows does not change table
+    """
+    return bool(np.isin(row_hashes(rows), row_hashes(table)).all())
+
+
+def partition_file_name(partition_dir: str, artist_id: str) -> str:
+    """
+    Return name of csv file that keep partition of given artist
+    :param partition_dir: Directory that contain every partition of a table
+    :param artist_id: Spotify artist ID
+    :return: Path to artist partition csv file
+    """
+    return os.path.join(partition_dir, f'{artist_id}.csv')
+
+
+def read_partition(
+        partition_dir: str,
+        artist_id: str,
+        correct_column: list,
+        dtypes: dict
+) -> pd.DataFrame:
+    """
+    Read album or track partition of artist, artist without partition file get empty table
+    :param partition_dir: Directory that contain every partition of a table
+    :param artist_id: Spotify artist ID
+    :param correct_column: List of column name that csv file must have
+    :param dtypes: Dictionary of column name and its datatype
+    :return: Dataframe of artist partition
+    """
+
+    file_name = partition_file_name(partition_dir, artist_id)
+
+    if not os.path.exists(file_name):
+        return pd.DataFrame(columns=correct_column).astype(dtypes)
+
+    return read_table(file_name, correct_column, dtypes)
+
+
+def write_csv(table: pd.DataFrame, file_name: str):
+    """
+    Write table into csv file atomically
+    Table is written into temporary file in the same directory then renamed over file,
+    so file always has either old or new content even if writing got interrupted.
+    :param table: Dataframe to write
+    :param file_name: Name of csv file
+    """
+
+    descriptor, temp_name = tempfile.mkstemp(
+        dir=os.path.dirname(os.path.abspath(file_name)),
+        suffix='.tmp'
+    )
+
+    try:
+        with os.fdopen(descriptor, 'w', newline='', encoding='utf-8') as file:
+            table.to_csv(file, index=False)
+        os.replace(temp_name, file_name)
+    except OSError:
+        if os.path.exists(temp_name):
+            os.remove(temp_name)
+        raise
+
+
+def partition_csv(table_csv_file_name: str, partition_dir: str):
+    """
+    Split whole table csv file (old single file layout) into per artist partition
+    :param table_csv_file_name: Name of album or track csv file that contain every artist
+    :param partition_dir: Directory to write partition csv file into
+    """
+
+    table = pd.read_csv(table_csv_file_name)
+
+    os.makedirs(partition_dir, exist_ok=True)
+
+    for artist_id, partition in table.groupby('artist_id', sort=False):
+        partition.to_csv(partition_file_name(partition_dir, artist_id), index=False)
+
+
+def migrate_legacy_csv(partition_dir: str) -> bool:
+    """
+    Split single table csv file of older version (csv/album.csv next to csv/album)
+    into partition directory, when partition directory does not exist yet.
+    Partition is written into temporary directory first and renamed into place,
+    so interrupted migration is done again on next start.
+    :param partition_dir: Directory of album or track partition
+    :return: True if legacy file got migrated
+    """
+
+    legacy_file_name = os.path.normpath(partition_dir) + '.csv'
+
+    if os.path.exists(partition_dir) or not os.path.exists(legacy_file_name):
+        return False
+
+    temporary_dir = tempfile.mkdtemp(dir=os.path.dirname(os.path.abspath(partition_dir)))
+    partition_csv(legacy_file_name, temporary_dir)
+    os.replace(temporary_dir, partition_dir)
+
+    return True
+
+
+def artist_row(artist_detail: dict) -> dict:
+    """
+    Convert Spotify artist detail into artist table row
+    :param artist_detail: Artist object of Spotify Web API
+    :return: Dictionary of ARTIST_COLUMNS
+    """
+
+    try:
+        img_url = artist_detail['images'][0]['url']
+    except IndexError:
+        img_url = None
+
+    return {
+        'artist_name': artist_detail['name'],
+        'artist_id': artist_detail['id'],
+        'genres': artist_detail['genres'],
+        'followers': artist_detail['followers']['total'],
+        'popularity': artist_detail['popularity'],
+        'img_url': img_url,
+        'external_url': artist_detail['external_urls']['spotify'],
+    }
+
+
+def album_row(album_detail: dict, artist_id: str) -> dict:
+    """
+    Convert Spotify album detail into album table row
+    :param album_detail: Album object of Spotify Web API
+    :param artist_id: Spotify artist id
+    :return: Dictionary of ALBUM_COLUMNS
+    """
+
+    try:
+        img_url = album_detail['images'][0]['url']
+    except IndexError:
+        img_url = None
+
+    release_date = np.datetime64(album_detail['release_date'], "D")
+
+    return {
+        'artist_id': artist_id,
+        'external_url': album_detail['external_urls']['spotify'],
+        'img_url': img_url,
+        'album_name': album_detail['name'],
+        'album_id': album_detail['id'],
+        'release_date': str(release_date),
+        'release_date_precision': 'day',
+        'total_tracks': album_detail['total_tracks'],
+        # 'type' of album object is always 'album', release type is in 'album_type'
+        'type': album_detail['album_type'],
+        'popularity': album_detail['popularity']
+    }
+
+
+def track_row(track_detail: dict, artist_id: str) -> dict:
+    """
+    Convert Spotify track detail into track table row
+    :param track_detail: Track object of Spotify Web API
+    :param artist_id: Spotify artist id
+    :return: Dictionary of TRACK_COLUMNS
+    """
+    return {
+        'artist_id': artist_id,
+        'album_id': track_detail['album']['id'],
+        'track_id': track_detail['id'],
+        'track_name': track_detail['name'],
+        'popularity': track_detail['popularity'],
+        'duration_ms': track_detail['duration_ms']
+    }
+
+
+def artist_frames(artist: dict, album_rows: list, track_rows: list):
+    """
+    Build artist, album and track dataframe of newly added artist
+    :param artist: Artist row
+    :param album_rows: List of album row
+    :param track_rows: List of track row
+    :return: Tuple of artist, album and track dataframe
+    """
+    # Album that is listed as both album and single, or track listed twice keep one row
+    return (
+        pd.DataFrame([artist], columns=ARTIST_COLUMNS).astype(ARTIST_DTYPES),
+        deduplicate(pd.DataFrame(album_rows, columns=ALBUM_COLUMNS).astype(ALBUM_DTYPES), ALBUM_KEY),
+        deduplicate(pd.DataFrame(track_rows, columns=TRACK_COLUMNS).astype(TRACK_DTYPES), TRACK_KEY)
+    )
+
+
+class CsvPartitionLoader:
+    """
+    Picklable reader of album and track partition, used by worker process
+    """
+
+    def __init__(self, album_partition_dir: str, track_partition_dir: str):
+        """
+        :param album_partition_dir: Directory that contain album csv file of each artist
+        :param track_partition_dir: Directory that contain track csv file of each artist
+        """
+        self.album_dir = album_partition_dir
+        self.track_dir = track_partition_dir
+
+    def load(self, artist_ids: list):
+        """
+        Read album and track partition of every given artist
+        :param artist_ids: List of Spotify artist ID
+        :return: Tuple of album and track dataframe of every artist combined
+        """
+
+        album = [read_partition(self.album_dir, artist_id, ALBUM_COLUMNS, ALBUM_DTYPES)
+                 for artist_id in artist_ids]
+        track = [read_partition(self.track_dir, artist_id, TRACK_COLUMNS, TRACK_DTYPES)
+                 for artist_id in artist_ids]
+
+        return (
+            pd.concat(album, ignore_index=True) if album else pd.DataFrame(columns=ALBUM_COLUMNS),
+            pd.concat(track, ignore_index=True) if track else pd.DataFrame(columns=TRACK_COLUMNS)
+        )
+
+
+class Snapshot(NamedTuple):
+    """
+    Consistent view of every table at one point in time.
+    Dataframe in a snapshot is never modified, writer publish a new snapshot instead.
+    """
+
+    artist: pd.DataFrame
+    album: Mapping[str, pd.DataFrame]
+    track: Mapping[str, pd.DataFrame]
 
 
 class ArtistDb:
     """
     Class for working with artist discography data csv file
     by utilizing pandas dataframe and spotipy library
+
+    Artist table is a small manifest that is loaded eagerly.
+    Album and track tables are partitioned by artist_id into one csv file per artist
+    and each partition is read only when that artist got selected.
+
+    Any number of thread can add artist at the same time. Spotify data is gathered
+    without holding any lock, then whole artist is committed under a lock by
+    publishing a new snapshot. Reader take the current snapshot and never wait for writer.
+
+    With memory budget, partition of least recently selected artist is dropped from memory
+    (written to csv file first if unsaved) once loaded partition use more than budget,
+    and read again when that artist get selected.
     """
 
     def __init__(
             self,
             sp: 'spotipy.Spotify',
             artist_csv_filename: str,
-            album_csv_file_name: str,
-            track_csv_file_name: str
+            album_partition_dir: str,
+            track_partition_dir: str,
+            memory_budget: int = None
     ):
         """
         Create instance of artist database
         :param sp: Spotify object from spotipy library for gather data from Spotify web API.
         :param artist_csv_filename: Name of csv file that contain data about each artist.
-        :param album_csv_file_name: Name of csv file that contain data about each album.
-        :param track_csv_file_name: Name of csv file that contain data about each track.
+        :param album_partition_dir: Directory that contain album csv file of each artist.
+        :param track_partition_dir: Directory that contain track csv file of each artist.
+        :param memory_budget: Byte of album and track partition kept in memory, no limit when None.
         """
 
-        self._sp = sp
-        self._artist = pd.read_csv(artist_csv_filename)
-        self._album = pd.read_csv(album_csv_file_name)
-        self._track = pd.read_csv(track_csv_file_name)
+        self._set_up_spotify(sp)
+        self._set_up_commit_tracking()
+        self._set_up_working_set(memory_budget)
+
+        self._artist_filename = artist_csv_filename
+        self._album_dir = album_partition_dir
+        self._track_dir = track_partition_dir
 
-        self.__set_up_data(artist_csv_filename, album_csv_file_name, track_csv_file_name)
+        # Catalog of older version keep every artist in one album and track csv file
+        migrate_legacy_csv(album_partition_dir)
+        migrate_legacy_csv(track_partition_dir)
+
+        # Artist table with album and track partition of loaded artist keyed by artist_id
+        self._snapshot = Snapshot(
+            read_table(artist_csv_filename, ARTIST_COLUMNS, ARTIST_DTYPES),
+            MappingProxyType({}),
+            MappingProxyType({})
+        )
 
-    def __set_up_data(self, artist_file_name, album_file_name, track_file_name):
+        # Artist that got added since the last time csv file got written,
+        # and artist being written by update_csv
+        self._dirty = set()
+        self._saving = set()
+
+        # Writer hold write lock while publishing snapshot, save lock keep update_csv in order
+        self._write_lock = threading.Lock()
+        self._save_lock = threading.Lock()
+
+    def _set_up_spotify(self, sp):
         """
-        Check dataframe column and set datatype for each column
+        Keep Spotify object and create batch dispatcher for album and track lookup
+        :param sp: Spotify object from spotipy library
         """
 
-        artist_correct_column = np.array(
-            [
-                'artist_name',
-                'artist_id',
-                'genres',
-                'followers',
-                'popularity',
-                'img_url',
-                'external_url',
-            ]
+        # Every Spotify call is timed with its response size when tracing is on
+        self._sp = trace_client(sp)
+
+        # Album and track ID of every artist being added at the same time
+        # are combined into request of API maximum size
+        self._album_batcher = BatchDispatcher(
+            lambda album_ids: self._sp.albums(album_ids, market='TH')['albums'],
+            ALBUM_BATCH_SIZE
+        )
+        self._track_batcher = BatchDispatcher(
+            lambda track_ids: self._sp.tracks(track_ids, market='TH')['tracks'],
+            TRACK_BATCH_SIZE
         )
 
-        # Validate artist csv table
-        if len(self._artist.columns) != len(artist_correct_column):
-            raise ValueError(f"{artist_file_name} doesn't have correct number of column")
+    def _set_up_commit_tracking(self):
+        """
+        Keep data version of each artist and function called after artist got committed
+        """
 
-        if any(self._artist.columns != artist_correct_column):
-            raise ValueError(f"{artist_file_name} columns doesn't have correct columns name")
+        # Number of time rows of each artist got changed, artist not in dictionary is version 0
+        self._versions = {}
+        self._commit_listeners = []
 
-        # Set datatype for each column
-        self._artist = self._artist.astype(
-            {
-                'followers': 'int64',
-                'popularity': 'int8',
-            },
-            copy=True
-        )
+    def add_commit_listener(self, listener):
+        """
+        Call listener with artist ID every time rows of artist got committed
+        Listener is called on the thread that added artist, after write lock is released.
+        :param listener: Function that take artist ID
+        """
+        self._commit_listeners.append(listener)
 
-        album_correct_column = np.array(
-            [
-                'artist_id',
-                'external_url',
-                'img_url',
-                'album_name',
-                'album_id',
-                'release_date',
-                'release_date_precision',
-                'total_tracks',
-                'type',
-                'popularity'
-            ]
-        )
+    def data_version(self, artist_id) -> int:
+        """
+        Return version of artist rows, changed every time they got committed
+        :param artist_id: Spotify artist ID
+        :return: Version number
+        """
+        return self._versions.get(artist_id, 0)
 
-        # Validate album csv table
-        if len(self._album.columns) != len(album_correct_column):
-            raise ValueError(f"{album_file_name} doesn't have correct number of column")
+    def _bump_version(self, artist_id):
+        """
+        Change version of artist, caller must hold write lock
+        """
+        self._versions[artist_id] = self._versions.get(artist_id, 0) + 1
 
-        if any(self._album.columns != album_correct_column):
-            raise ValueError(f"{album_file_name} columns doesn't have correct columns name")
+    def _notify_commit(self, artist_id):
+        """
+        Call every commit listener with artist ID
+        """
+        for listener in self._commit_listeners:
+            listener(artist_id)
 
-        # Set datatypes for each column
-        self._album = self._album.astype(
-            {
-                'total_tracks': 'int16',
-                'popularity': 'int8'
-            },
-            copy=True
-        )
+    def _set_up_working_set(self, memory_budget):
+        """
+        Keep byte and use order of loaded partition and counter of evicted and reloaded partition
+        :param memory_budget: Byte of partition kept in memory, no limit when None
+        """
 
-        self._album['release_date'].astype('datetime64[ns]')
-
-        track_correct_column = np.array(
-            [
-                'artist_id',
-                'album_id',
-                'track_id',
-                'track_name',
-                'popularity',
-                'duration_ms'
-            ]
-        )
+        self.memory_budget = memory_budget
 
-        # Validate track csv table
-        if len(self._track.columns) != len(track_correct_column):
-            raise ValueError(f"{track_file_name} doesn't have correct number of column")
+        # Byte of each loaded partition from least to most recently used
+        self._recent = OrderedDict()
+        self._recent_lock = threading.Lock()
 
-        if any(self._track.columns != track_correct_column):
-            raise ValueError(f"{artist_file_name} columns doesn't have correct columns name")
+        # Artist whose partition got evicted and is not loaded again yet
+        self._evicted = set()
 
-        # set datatype for each column
-        self._track = self._track.astype(
-            {
-                'popularity': 'int8',
-                'duration_ms': 'int32'
-            },
-            copy=True
-        )
+        self.evictions = 0
+        self.reloads = 0
+
+    def __touch(self, artist_ids):
+        """
+        Mark partition of artist as the most recently used
+        """
+
+        with self._recent_lock:
+            for artist_id in artist_ids:
+                if artist_id in self._recent:
+                    self._recent.move_to_end(artist_id)
+
+    def __track_partition(self, artist_id, album_df, track_df):
+        """
+        Keep byte of newly loaded or committed partition as the most recently used
+        """
+
+        size = int(album_df.memory_usage(deep=True).sum() + track_df.memory_usage(deep=True).sum())
+
+        with self._recent_lock:
+            self._recent[artist_id] = size
+            self._recent.move_to_end(artist_id)
+
+    def __evict(self, keep=()):
+        """
+        Evict least recently used partition until loaded partition fit in memory budget
+        :param keep: Artist ID that must stay loaded, partition that is being used
+        """
+
+        if self.memory_budget is None:
+            return
+
+        with self._recent_lock:
+            total = sum(self._recent.values())
+            victims = []
+
+            for artist_id, size in self._recent.items():
+                if total <= self.memory_budget:
+                    break
+
+                if artist_id not in keep:
+                    victims.append(artist_id)
+                    total -= size
+
+        # Save hold save lock for a while, partition is evicted by a later call instead of waiting
+        if not victims or not self._save_lock.acquire(blocking=False):
+            return
+
+        try:
+            for artist_id in victims:
+                self.__evict_partition(artist_id)
+        finally:
+            self._save_lock.release()
+
+    def __evict_partition(self, artist_id):
+        """
+        Drop partition of artist from memory, unsaved partition is written to csv file first
+        Artist stay in artist table so its partition is read again when needed.
+        Caller must hold save lock, so update_csv is not writing and artist that is not dirty is on disk.
+        """
+
+        snapshot = self._snapshot
+        album_df = snapshot.album.get(artist_id)
+        track_df = snapshot.track.get(artist_id)
+
+        if album_df is not None and artist_id in self._dirty:
+            try:
+                os.makedirs(self._album_dir, exist_ok=True)
+                os.makedirs(self._track_dir, exist_ok=True)
+                write_csv(album_df, partition_file_name(self._album_dir, artist_id))
+                write_csv(track_df, partition_file_name(self._track_dir, artist_id))
+            except OSError:
+                # Partition that cannot be written stay in memory
+                return
+
+        with self._write_lock:
+            snapshot = self._snapshot
+
+            # Other thread committed new rows of this artist meanwhile
+            if snapshot.album.get(artist_id) is not album_df:
+                return
+
+            if album_df is not None:
+                self._snapshot = snapshot._replace(
+                    album=MappingProxyType({key: value for key, value in snapshot.album.items() if key != artist_id}),
+                    track=MappingProxyType({key: value for key, value in snapshot.track.items() if key != artist_id})
+                )
+
+        with self._recent_lock:
+            self._recent.pop(artist_id, None)
+
+            if album_df is not None:
+                self._evicted.add(artist_id)
+                self.evictions += 1
+
+    def snapshot(self) -> Snapshot:
+        """
+        Return current snapshot of database
+        :return: Snapshot of artist table and loaded album and track partition
+        """
+        return self._snapshot
+
+    def memory_usage(self) -> dict:
+        """
+        Return deep memory usage of every table by column
+        Album and track column is summed over every loaded partition.
+        :return: Dictionary of tables (table name to column name to byte), partitions (number of loaded artist)
+        and working_set (memory budget, byte of loaded partition, number of eviction and reload)
+        """
+
+        snapshot = self._snapshot
+
+        tables = {'artist': snapshot.artist.memory_usage(deep=True).astype(int).to_dict()}
 
+        for name, partitions in (('album', snapshot.album), ('track', snapshot.track)):
+            columns = {}
+
+            for table in partitions.values():
+                for column, size in table.memory_usage(deep=True).items():
+                    columns[column] = columns.get(column, 0) + int(size)
+
+            tables[name] = columns
+
+        return {'tables': tables, 'partitions': len(snapshot.album), 'working_set': self.working_set()}
+
+    def working_set(self) -> dict:
+        """
+        Return byte of loaded partition as tracked for memory budget, cheap enough to call after every selection
+        :return: Dictionary of memory budget, byte of loaded partition, number of eviction and reload
+        """
+
+        with self._recent_lock:
+            return {
+                'budget': self.memory_budget,
+                'bytes': sum(self._recent.values()),
+                'evictions': self.evictions,
+                'reloads': self.reloads,
+            }
+
+    def artist_table(self) -> pd.DataFrame:
+        """
+        Return artist table of every artist in database
+        """
+        return self._snapshot.artist
+
+    def in_memory_partitions(self):
+        """
+        Return album and track partition that is in memory, including artist not saved yet
+        :return: Tuple of mapping of artist ID to album dataframe and to track dataframe
+        """
+
+        snapshot = self._snapshot
+        return snapshot.album, snapshot.track
+
+    def partition_loader(self) -> CsvPartitionLoader:
+        """
+        Return picklable loader that read saved partition in another process
+        """
+        return CsvPartitionLoader(self._album_dir, self._track_dir)
+
+    def has_unsaved(self) -> bool:
+        """
+        Check that any artist got added since the last time csv file got written
+        """
+        return bool(self._dirty or self._saving)
+
+    def has_artist(self, artist_id) -> bool:
+        """
+        Check that artist is already in database
+        :param artist_id: Spotify artist ID
+        :return: True if artist is in artist table
+        """
+        return artist_id in self._snapshot.artist['artist_id'].values
+
+    @traced('db.search')
     def search(self, query):
         """
         Search artist name by use query as a keyword
@@ -144,31 +709,19 @@ class ArtistDb:
 
         return [(artist['name'], artist['genres'], artist['id']) for artist in result]
 
-    def add_artist(self, artist_id):
+    @traced('db.add_artist')
+    def add_artist(self, artist_id, refresh: bool = False):
         """
         Add artist to dataframe
         :param artist_id: Spotify artist ID
+        :param refresh: Fetch artist that is already in database again and upsert its rows
         """
 
-        if artist_id in self._artist['artist_id'].values:
+        if not refresh and self.has_artist(artist_id):
             return
 
-        artist_detail = self._sp.artist(artist_id)
+        row = artist_row(self._sp.artist(artist_id))
 
-        try:
-            img_url = artist_detail['images'][0]['url']
-        except IndexError:
-            img_url = None
-
-        self._artist.loc[len(self._artist)] = {
-            'artist_name': artist_detail['name'],
-            'artist_id': artist_detail['id'],
-            'genres': artist_detail['genres'],
-            'followers': artist_detail['followers']['total'],
-            'popularity': artist_detail['popularity'],
-            'img_url': img_url,
-            'external_url': artist_detail['external_urls']['spotify'],
-        }
         artist_album = self._sp.artist_albums(
             artist_id,
             album_type='album',
@@ -183,101 +736,266 @@ class ArtistDb:
         )['items']
         album_list += [album['id'] for album in artist_single]
 
-        self.__add_album(album_list, artist_id)
+        album_rows, track_rows = self.__add_album(album_list, artist_id)
+
+        self._store_artist(*artist_frames(row, album_rows, track_rows))
 
     def __add_album(self, album_list, artist_id):
         """
-        Add album to dataframe
+        Gather album detail of artist
         :param album_list: List of spotify album id
         :param artist_id: Spotify artist id
+        :return: Tuple of list of album row and list of track row
         """
 
-        def add_album(album_id_list):
+        album_rows = []
+        track_list = []
 
-            if not album_id_list:
-                return
+        for album_detail in self._album_batcher.fetch(album_list):
+            album_rows.append(album_row(album_detail, artist_id))
+            track_list += [track['id'] for track in album_detail['tracks']['items']]
+
+        return album_rows, self.__add_track(track_list, artist_id)
+
+    def __add_track(self, track_list, artist_id):
+        """
+        Gather track detail of artist
+        :param track_list: List of spotify track id
+        :param artist_id: Spotify artist id
+        :return: List of track row
+        """
 
-            all_album = self._sp.albums(album_id_list, market='TH')['albums']
+        return [
+            track_row(track_detail, artist_id)
+            for track_detail in self._track_batcher.fetch(track_list)
+        ]
 
-            track_list = []
+    @traced('db.store_artist')
+    def _store_artist(self, artist_df, album_df, track_df):
+        """
+        Commit artist with their album and track as a new snapshot
+        Artist that is already in database get its rows upserted by primary key,
+        nothing is committed when every row is already there with the same value.
+        :param artist_df: Dataframe with single row of artist detail
+        :param album_df: Dataframe of every album of artist
+        :param track_df: Dataframe of every track of artist
+        """
 
-            for album_detail in all_album:
+        artist_id = artist_df.iloc[0]['artist_id']
 
-                try:
-                    img_url = album_detail['images'][0]['url']
-                except IndexError:
-                    img_url = None
+        current_span().set(artist_id=artist_id, albums=len(album_df), tracks=len(track_df))
 
-                release_date = np.datetime64(album_detail['release_date'], "D")
+        while True:
 
-                self._album.loc[len(self._album)] = {
-                    'artist_id': artist_id,
-                    'external_url': album_detail['external_urls']['spotify'],
-                    'img_url': img_url,
-                    'album_name': album_detail['name'],
-                    'album_id': album_detail['id'],
-                    'release_date': release_date,
-                    'release_date_precision': 'day',
-                    'total_tracks': album_detail['total_tracks'],
-                    'type': album_detail['type'],
-                    'popularity': album_detail['popularity']
-                }
+            # Existing rows are needed to upsert into
+            if self.has_artist(artist_id) and artist_id not in self._snapshot.album:
+                self.__load_partition(artist_id)
 
-                track_list += [track['id'] for track in album_detail['tracks']['items']]
+            with self._write_lock:
 
-            self.__add_track(track_list, artist_id)
+                snapshot = self._snapshot
 
-        album_id = album_list
+                if artist_id in snapshot.album:
+                    old_album = snapshot.album[artist_id]
+                    old_track = snapshot.track[artist_id]
+                    old_artist = snapshot.artist.loc[snapshot.artist['artist_id'] == artist_id]
 
-        limit = 20
+                    # Other thread already committed the same rows while we are fetching
+                    if contains_rows(old_artist, artist_df) and contains_rows(old_album, album_df) \
+                            and contains_rows(old_track, track_df):
+                        return
 
-        while len(album_id) > limit:
-            add_album(album_id[0:limit])
-            album_id = album_id[limit:]
+                    artist_table = upsert(snapshot.artist, artist_df, ARTIST_KEY)
+                    album_df = upsert(old_album, album_df, ALBUM_KEY)
+                    track_df = upsert(old_track, track_df, TRACK_KEY)
+                elif artist_id in snapshot.artist['artist_id'].values:
+                    # Partition got evicted after it was loaded, load it again
+                    continue
+                else:
+                    artist_table = pd.concat([snapshot.artist, artist_df], ignore_index=True)
 
-        add_album(album_id)
+                self._snapshot = Snapshot(
+                    artist_table,
+                    MappingProxyType({**snapshot.album, artist_id: album_df}),
+                    MappingProxyType({**snapshot.track, artist_id: track_df})
+                )
 
-    def __add_track(self, track_list, artist_id):
+                self._dirty.add(artist_id)
+                self._bump_version(artist_id)
+
+            break
+
+        self.__track_partition(artist_id, album_df, track_df)
+        self.__evict(keep={artist_id})
+
+        self._notify_commit(artist_id)
+
+    @traced('db.load_partition')
+    def __load_partition(self, artist_id):
         """
-        Add track to dataframe
-        :param track_list: List of spotify track id
-        :param artist_id: Spotify artist id
+        Read album and track partition of artist from csv file
+        :param artist_id: Spotify artist ID
+        :return: Tuple of album and track dataframe of artist
         """
 
-        def add_track(track_id_list):
+        album_df = read_partition(self._album_dir, artist_id, ALBUM_COLUMNS, ALBUM_DTYPES)
+        track_df = read_partition(self._track_dir, artist_id, TRACK_COLUMNS, TRACK_DTYPES)
+
+        current_span().set(artist_id=artist_id, albums=len(album_df), tracks=len(track_df))
+
+        with self._write_lock:
+
+            snapshot = self._snapshot
+
+            if artist_id in snapshot.album:
+                return snapshot.album[artist_id], snapshot.track[artist_id]
+
+            self._snapshot = snapshot._replace(
+                album=MappingProxyType({**snapshot.album, artist_id: album_df}),
+                track=MappingProxyType({**snapshot.track, artist_id: track_df})
+            )
 
-            all_track = self._sp.tracks(track_id_list, market='TH')['tracks']
+        with self._recent_lock:
+            if artist_id in self._evicted:
+                self._evicted.discard(artist_id)
+                self.reloads += 1
 
-            for track_detail in all_track:
+        self.__track_partition(artist_id, album_df, track_df)
 
-                self._track.loc[len(self._track)] = {
-                    'artist_id': artist_id,
-                    'album_id': track_detail['album']['id'],
-                    'track_id': track_detail['id'],
-                    'track_name': track_detail['name'],
-                    'popularity': track_detail['popularity'],
-                    'duration_ms': track_detail['duration_ms']
-                }
+        return album_df, track_df
 
-        track_id = track_list
+    def __partition(self, artist_id):
+        """
+        Return album and track partition of artist, partition not in memory is loaded
+        :param artist_id: Spotify artist ID
+        :return: Tuple of album and track dataframe of artist
+        """
 
-        limit = 50
+        snapshot = self._snapshot
 
-        while len(track_id) > limit:
+        if artist_id not in snapshot.album:
+            return self.__load_partition(artist_id)
 
-            add_track(track_id[0:limit])
-            track_id = track_id[limit:]
+        self.__touch([artist_id])
 
-        add_track(track_id)
+        return snapshot.album[artist_id], snapshot.track[artist_id]
 
+    @traced('db.update_csv')
     def update_csv(self):
         """
         Update csv file
+        Write partition of every artist that got added since last update, then artist manifest.
+        Writing is done from a snapshot so adding artist is not blocked meanwhile,
+        and every file is replaced atomically so interrupted update never leave broken file.
         """
-        self._artist.to_csv('csv/artist.csv', index=False)
-        self._album.to_csv('csv/album.csv', index=False)
-        self._track.to_csv('csv/track.csv', index=False)
 
+        with self._save_lock:
+
+            with self._write_lock:
+                snapshot = self._snapshot
+                dirty = self._dirty
+                self._dirty = set()
+
+                # Still unsaved until every file is written
+                self._saving = dirty
+
+            current_span().set(partitions=len(dirty))
+
+            try:
+                os.makedirs(self._album_dir, exist_ok=True)
+                os.makedirs(self._track_dir, exist_ok=True)
+
+                for artist_id in dirty:
+
+                    # Evicted partition is already written before it is dropped from memory
+                    if artist_id not in snapshot.album:
+                        continue
+
+                    write_csv(snapshot.album[artist_id], partition_file_name(self._album_dir, artist_id))
+                    write_csv(snapshot.track[artist_id], partition_file_name(self._track_dir, artist_id))
+
+                # Manifest is written last so artist in it always has its partition on disk
+                write_csv(snapshot.artist, self._artist_filename)
+            except OSError:
+                # Keep unsaved artist for next update
+                with self._write_lock:
+                    self._dirty |= dirty
+                raise
+            finally:
+                with self._write_lock:
+                    self._saving = set()
+
+    @traced('db.compact')
+    def compact(self) -> dict:
+        """
+        Remove duplicate rows by primary key from artist table and every partition,
+        including partition csv file that is not loaded, then save database
+        :return: Dictionary of table name and number of row removed
+        """
+
+        removed = {'artist': 0, 'album': 0, 'track': 0}
+        changed = []
+
+        with self._save_lock:
+
+            for artist_id in self._snapshot.artist['artist_id'].unique():
+
+                snapshot = self._snapshot
+                loaded = snapshot.album.get(artist_id)
+
+                if loaded is not None:
+                    album_df = loaded
+                    track_df = snapshot.track[artist_id]
+                else:
+                    album_df = read_partition(self._album_dir, artist_id, ALBUM_COLUMNS, ALBUM_DTYPES)
+                    track_df = read_partition(self._track_dir, artist_id, TRACK_COLUMNS, TRACK_DTYPES)
+
+                album_unique = deduplicate(album_df, ALBUM_KEY)
+                track_unique = deduplicate(track_df, TRACK_KEY)
+
+                if len(album_unique) == len(album_df) and len(track_unique) == len(track_df):
+                    continue
+
+                with self._write_lock:
+                    snapshot = self._snapshot
+
+                    # Other thread upserted this artist meanwhile
+                    if snapshot.album.get(artist_id) is not loaded:
+                        continue
+
+                    # Deduplicated partition is kept in memory until it is saved
+                    self._snapshot = snapshot._replace(
+                        album=MappingProxyType({**snapshot.album, artist_id: album_unique}),
+                        track=MappingProxyType({**snapshot.track, artist_id: track_unique})
+                    )
+
+                    self._dirty.add(artist_id)
+                    self._bump_version(artist_id)
+
+                # Partition read from disk is now loaded and count toward memory budget
+                self.__track_partition(artist_id, album_unique, track_unique)
+
+                removed['album'] += len(album_df) - len(album_unique)
+                removed['track'] += len(track_df) - len(track_unique)
+                changed.append(artist_id)
+
+            with self._write_lock:
+                snapshot = self._snapshot
+                artist_unique = deduplicate(snapshot.artist, ARTIST_KEY)
+                removed['artist'] = len(snapshot.artist) - len(artist_unique)
+                self._snapshot = snapshot._replace(artist=artist_unique)
+
+        current_span().set(artists=len(changed), **removed)
+
+        for artist_id in changed:
+            self._notify_commit(artist_id)
+
+        self.update_csv()
+        self.__evict()
+
+        return removed
+
+    @traced('db.get_selected_artist')
     def get_selected_artist(self, artist_id):
         """
         Return Selected artist object
@@ -285,15 +1003,57 @@ class ArtistDb:
         :return: Selected artist object with selected artist information
         """
 
-        if artist_id not in self._artist['artist_id'].values:
+        if not self.has_artist(artist_id):
             self.add_artist(artist_id)
 
-        artist_df = self._artist.loc[self._artist.artist_id == artist_id]
-        album_df = self._album.loc[self._album.artist_id == artist_id]
-        track_df = self._track.loc[self._track.artist_id == artist_id]
+        album_df, track_df = self.__partition(artist_id)
+        self.__evict(keep={artist_id})
+
+        snapshot = self._snapshot
+
+        artist_df = snapshot.artist.loc[snapshot.artist.artist_id == artist_id]
+
+        current_span().set(artist_id=artist_id, albums=len(album_df), tracks=len(track_df))
 
         return SelectedArtist(artist_df, album_df, track_df)
 
+    def _add_missing(self, artist_ids):
+        """
+        Add every artist that is not in database yet at the same time,
+        so their album and track lookup share batched request
+        :param artist_ids: List of Spotify artist ID
+        """
+
+        missing = [artist_id for artist_id in artist_ids if not self.has_artist(artist_id)]
+
+        if missing:
+            with ThreadPoolExecutor(max_workers=min(8, len(missing))) as executor:
+                list(executor.map(self.add_artist, missing))
+
+    @traced('db.get_artists')
+    def get_artists(self, artist_ids):
+        """
+        Return rows of many artist, artist not in database get added
+        :param artist_ids: List of Spotify artist ID
+        :return: Tuple of artist, album and track dataframe of every artist
+        """
+
+        self._add_missing(artist_ids)
+
+        albums, tracks = zip(*[self.__partition(artist_id) for artist_id in artist_ids])
+        self.__evict(keep=set(artist_ids))
+
+        snapshot = self._snapshot
+
+        artist_df = snapshot.artist.loc[snapshot.artist.artist_id.isin(artist_ids)]
+        album_df = pd.concat(albums, ignore_index=True)
+        track_df = pd.concat(tracks, ignore_index=True)
+
+        current_span().set(artists=len(artist_ids), tracks=len(track_df))
+
+        return artist_df, album_df, track_df
+
+    @traced('db.get_top_tracks')
     def get_top_tracks(self, artist_id):
         """
         Return list of artist top 10 track
@@ -305,6 +1065,7 @@ class ArtistDb:
         except spotipy.SpotifyException:
             return None
 
+    @traced('db.get_related_artist')
     def get_related_artist(self, artist_id):
         """
         Return list of artist's relate artist
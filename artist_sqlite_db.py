@@ -0,0 +1,369 @@
+"""
+Model part of MVC design pattern
+SQLite storage backend for artist discography database
+"""
+import sqlite3
+import threading
+from contextlib import closing
+from types import MappingProxyType
+import pandas as pd
+from artist_db import (
+    ArtistDb,
+    SelectedArtist,
+    Snapshot,
+    ARTIST_COLUMNS,
+    ALBUM_COLUMNS,
+    TRACK_COLUMNS,
+    ARTIST_DTYPES,
+    ALBUM_DTYPES,
+    TRACK_DTYPES,
+    ARTIST_KEY,
+    ALBUM_KEY,
+    TRACK_KEY,
+    migrate_legacy_csv,
+    read_table,
+    read_partition,
+)
+from tracing import current_span, traced
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS artist (
+    artist_name TEXT,
+    artist_id TEXT PRIMARY KEY,
+    genres TEXT,
+    followers INTEGER,
+    popularity INTEGER,
+    img_url TEXT,
+    external_url TEXT
+);
+
+CREATE TABLE IF NOT EXISTS album (
+    artist_id TEXT NOT NULL REFERENCES artist(artist_id),
+    external_url TEXT,
+    img_url TEXT,
+    album_name TEXT,
+    album_id TEXT NOT NULL,
+    release_date TEXT,
+    release_date_precision TEXT,
+    total_tracks INTEGER,
+    type TEXT,
+    popularity INTEGER,
+    PRIMARY KEY (album_id, artist_id)
+);
+
+CREATE INDEX IF NOT EXISTS album_artist_id ON album(artist_id);
+
+CREATE TABLE IF NOT EXISTS track (
+    artist_id TEXT NOT NULL REFERENCES artist(artist_id),
+    album_id TEXT NOT NULL,
+    track_id TEXT NOT NULL,
+    track_name TEXT,
+    popularity INTEGER,
+    duration_ms INTEGER,
+    PRIMARY KEY (track_id, artist_id)
+);
+
+CREATE INDEX IF NOT EXISTS track_artist_id ON track(artist_id);
+CREATE INDEX IF NOT EXISTS track_album_id ON track(album_id);
+"""
+
+
+class SqlitePartitionLoader:
+    """
+    Picklable reader of album and track rows, used by worker process
+    """
+
+    def __init__(self, db_filename: str):
+        """
+        :param db_filename: Name of SQLite database file
+        """
+        self.db_filename = db_filename
+
+    def load(self, artist_ids: list):
+        """
+        Query album and track rows of every given artist
+        :param artist_ids: List of Spotify artist ID
+        :return: Tuple of album and track dataframe of every artist combined
+        """
+
+        placeholder = ', '.join('?' * len(artist_ids))
+
+        with closing(sqlite3.connect(self.db_filename)) as connection:
+            return tuple(
+                pd.read_sql_query(
+                    f'SELECT {", ".join(columns)} FROM {table_name} '
+                    f'WHERE artist_id IN ({placeholder})',
+                    connection,
+                    params=list(artist_ids)
+                ).astype(dtypes)
+                for table_name, columns, dtypes in (
+                    ('album', ALBUM_COLUMNS, ALBUM_DTYPES),
+                    ('track', TRACK_COLUMNS, TRACK_DTYPES),
+                )
+            )
+
+
+class SqliteArtistDb(ArtistDb):
+    """
+    Artist discography database that keep data in SQLite database file
+    instead of csv file. Every artist is committed in its own transaction
+    when it got added so there is nothing left to write on exit.
+
+    Each thread use its own connection. Writer commit one artist at a time under a lock
+    and reader see a consistent snapshot of database through write ahead log.
+    """
+
+    def __init__(self, sp, db_filename: str):
+        """
+        Create instance of SQLite artist database
+        :param sp: Spotify object from spotipy library for gather data from Spotify web API.
+        :param db_filename: Name of SQLite database file, created if not exist.
+        """
+
+        # Csv file loading in ArtistDb constructor is not used by this backend
+        self._set_up_spotify(sp)
+        self._set_up_commit_tracking()
+        self._set_up_working_set(None)
+        self._db_filename = db_filename
+
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+
+        # Write ahead log keep per artist commit cheap and let reader run while writing
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.executescript(SCHEMA)
+
+    @property
+    def _connection(self) -> sqlite3.Connection:
+        """
+        SQLite connection of current thread
+        """
+
+        connection = getattr(self._local, 'connection', None)
+
+        if connection is None:
+            connection = sqlite3.connect(self._db_filename)
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self._local.connection = connection
+
+        return connection
+
+    def has_artist(self, artist_id) -> bool:
+        """
+        Check that artist is already in database
+        :param artist_id: Spotify artist ID
+        :return: True if artist is in artist table
+        """
+
+        row = self._connection.execute(
+            'SELECT 1 FROM artist WHERE artist_id = ?',
+            (artist_id,)
+        ).fetchone()
+
+        return row is not None
+
+    @traced('db.store_artist')
+    def _store_artist(self, artist_df, album_df, track_df):
+        """
+        Upsert artist with their album and track in a single transaction
+        Nothing is committed when every row is already there with the same value.
+        :param artist_df: Dataframe with single row of artist detail
+        :param album_df: Dataframe of every album of artist
+        :param track_df: Dataframe of every track of artist
+        """
+
+        artist_df = artist_df.assign(genres=artist_df['genres'].astype(str))
+        artist_id = artist_df.iloc[0]['artist_id']
+
+        current_span().set(albums=len(album_df), tracks=len(track_df))
+
+        with self._write_lock, self._connection:
+            changes = self._connection.total_changes
+
+            self.__upsert(artist_df, 'artist', ARTIST_COLUMNS, ARTIST_KEY)
+            self.__upsert(album_df, 'album', ALBUM_COLUMNS, ALBUM_KEY)
+            self.__upsert(track_df, 'track', TRACK_COLUMNS, TRACK_KEY)
+
+            # Other thread already committed the same rows while we are fetching
+            if self._connection.total_changes == changes:
+                return
+
+            self._bump_version(artist_id)
+
+        self._notify_commit(artist_id)
+
+    def __upsert(self, table_df, table_name, columns, key):
+        """
+        Insert rows of dataframe into table, row with existing primary key is updated
+        only when any value is different so unchanged row is not counted as change
+        :param table_df: Dataframe to insert
+        :param table_name: Name of SQLite table
+        :param columns: Column of table
+        :param key: Primary key column of table
+        """
+
+        placeholder = ', '.join('?' * len(columns))
+        values = [column for column in columns if column not in key]
+
+        self._connection.executemany(
+            f'INSERT INTO {table_name} ({", ".join(columns)}) VALUES ({placeholder}) '
+            f'ON CONFLICT ({", ".join(key)}) DO UPDATE SET '
+            f'{", ".join(f"{column} = excluded.{column}" for column in values)} '
+            f'WHERE {" OR ".join(f"{column} IS NOT excluded.{column}" for column in values)}',
+            # Split dict convert numpy scalar into python value, SQLite store NaN as NULL
+            table_df[columns].to_dict('split')['data']
+        )
+
+    def __select(self, table_name, columns, dtypes, artist_id):
+        """
+        Query every row of artist from table
+        :param table_name: Name of SQLite table
+        :param columns: Column of table
+        :param dtypes: Dictionary of column name and its datatype
+        :param artist_id: Spotify artist ID
+        :return: Dataframe of query result
+        """
+
+        return pd.read_sql_query(
+            f'SELECT {", ".join(columns)} FROM {table_name} WHERE artist_id = ?',
+            self._connection,
+            params=(artist_id,)
+        ).astype(dtypes)
+
+    def import_csv(
+            self,
+            artist_csv_filename: str,
+            album_partition_dir: str,
+            track_partition_dir: str
+    ):
+        """
+        Import artist from csv database into SQLite database
+        :param artist_csv_filename: Name of csv file that contain data about each artist.
+        :param album_partition_dir: Directory that contain album csv file of each artist.
+        :param track_partition_dir: Directory that contain track csv file of each artist.
+        """
+
+        migrate_legacy_csv(album_partition_dir)
+        migrate_legacy_csv(track_partition_dir)
+
+        artist = read_table(artist_csv_filename, ARTIST_COLUMNS, ARTIST_DTYPES)
+
+        for index in range(len(artist)):
+            artist_df = artist.iloc[index:index + 1]
+            artist_id = artist_df.iloc[0]['artist_id']
+
+            album_df = read_partition(
+                album_partition_dir, artist_id, ALBUM_COLUMNS, ALBUM_DTYPES
+            )
+            track_df = read_partition(
+                track_partition_dir, artist_id, TRACK_COLUMNS, TRACK_DTYPES
+            )
+
+            self._store_artist(artist_df, album_df, track_df)
+
+    @traced('db.get_artists')
+    def get_artists(self, artist_ids):
+        """
+        Return rows of many artist, artist not in database get added
+        :param artist_ids: List of Spotify artist ID
+        :return: Tuple of artist, album and track dataframe of every artist
+        """
+
+        self._add_missing(artist_ids)
+
+        artist_df = pd.read_sql_query(
+            f'SELECT {", ".join(ARTIST_COLUMNS)} FROM artist '
+            f'WHERE artist_id IN ({", ".join("?" * len(artist_ids))})',
+            self._connection,
+            params=list(artist_ids)
+        ).astype(ARTIST_DTYPES)
+
+        album_df, track_df = self.partition_loader().load(artist_ids)
+
+        current_span().set(artists=len(artist_ids), tracks=len(track_df))
+
+        return artist_df, album_df, track_df
+
+    def artist_table(self) -> pd.DataFrame:
+        """
+        Return artist table of every artist in database
+        """
+
+        return pd.read_sql_query(
+            f'SELECT {", ".join(ARTIST_COLUMNS)} FROM artist',
+            self._connection
+        ).astype(ARTIST_DTYPES)
+
+    def snapshot(self) -> Snapshot:
+        """
+        Return artist table read from database file, no partition is kept in memory
+        :return: Snapshot of artist table and two empty mapping
+        """
+        return Snapshot(self.artist_table(), MappingProxyType({}), MappingProxyType({}))
+
+    def in_memory_partitions(self):
+        """
+        Every artist is read from database file
+        :return: Tuple of two empty mapping
+        """
+        return {}, {}
+
+    def partition_loader(self) -> SqlitePartitionLoader:
+        """
+        Return picklable loader that read artist rows in another process
+        """
+        return SqlitePartitionLoader(self._db_filename)
+
+    def memory_usage(self) -> dict:
+        """
+        Table is kept in database file, only page cache of SQLite stay in memory
+        :return: Dictionary of empty tables, partitions and working set
+        """
+        return {
+            'tables': {'artist': {}, 'album': {}, 'track': {}},
+            'partitions': 0,
+            'working_set': self.working_set(),
+        }
+
+    def has_unsaved(self) -> bool:
+        """
+        Every artist is already committed when it got added
+        """
+        return False
+
+    def update_csv(self):
+        """
+        Every artist is already committed when it got added
+        """
+
+    def compact(self) -> dict:
+        """
+        Primary key of every table already keep rows unique
+        :return: Dictionary of table name and zero row removed
+        """
+        return {'artist': 0, 'album': 0, 'track': 0}
+
+    @traced('db.get_selected_artist')
+    def get_selected_artist(self, artist_id):
+        """
+        Return Selected artist object
+        :param artist_id: Spotify artist_id
+        :return: Selected artist object with selected artist information
+        """
+
+        if not self.has_artist(artist_id):
+            self.add_artist(artist_id)
+
+        # Read every table in one transaction to get consistent snapshot
+        self._connection.execute('BEGIN')
+
+        try:
+            artist_df = self.__select('artist', ARTIST_COLUMNS, ARTIST_DTYPES, artist_id)
+            album_df = self.__select('album', ALBUM_COLUMNS, ALBUM_DTYPES, artist_id)
+            track_df = self.__select('track', TRACK_COLUMNS, TRACK_DTYPES, artist_id)
+        finally:
+            self._connection.commit()
+
+        current_span().set(artist_id=artist_id, albums=len(album_df), tracks=len(track_df))
+
+        return SelectedArtist(artist_df, album_df, track_df)
@@ -0,0 +1,424 @@
+"""
+Asynchronous access to artist discography database
+
+AsyncArtistDb send Spotify request of many artist concurrently on one event loop
+and commit every artist into the same ArtistDb or SqliteArtistDb object,
+so rows added here is seen by blocking API and saved by its update_csv.
+Spotify request is sent by aiohttp, which is optional. Given request scheduler of the
+blocking client, request wait for the same token bucket and back off together with every thread.
+
+Usage:
+    sp = create_spotify()
+    async with AsyncArtistDb(db, AsyncSpotify(SpotifyClientCredentials(), scheduler=sp.scheduler)) as adb:
+        await adb.add_artists(artist_ids)
+"""
+import asyncio
+import spotipy
+from scheduler import current_priority
+from artist_db import (
+    ALBUM_BATCH_SIZE,
+    TRACK_BATCH_SIZE,
+    album_row,
+    artist_frames,
+    artist_row,
+    track_row,
+)
+
+API_PREFIX = 'https://api.spotify.com/v1/'
+
+
+class AsyncSpotify:
+    """
+    Asynchronous Spotify Web API client with the same method as spotipy.Spotify used by ArtistDb
+    """
+
+    def __init__(
+            self,
+            auth_manager=None,
+            auth: str = None,
+            prefix: str = API_PREFIX,
+            max_connections: int = 16,
+            retries: int = 3,
+            scheduler=None
+    ):
+        """
+        :param auth_manager: spotipy auth manager that give access token
+        :param auth: Access token, used instead of auth manager
+        :param prefix: URL prefix of Web API, stand-in server prefix for local test
+        :param max_connections: Maximum number of connection open at the same time
+        :param retries: Number of retry of request that failed with server error,
+                        and of throttled request when there is no scheduler
+        :param scheduler: RequestScheduler shared with blocking client, request is not paced when None
+        """
+
+        self._auth_manager = auth_manager
+        self._auth = auth
+        self.prefix = prefix
+        self.max_connections = max_connections
+        self.retries = retries
+        self.scheduler = scheduler
+
+        self._session = None
+
+        # Number of request sent
+        self.requests = 0
+
+    async def close(self):
+        """
+        Close every open connection
+        """
+
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def _token(self):
+        """
+        Return access token, auth manager may block so it is called on worker thread
+        """
+
+        if self._auth is not None or self._auth_manager is None:
+            return self._auth
+
+        return await asyncio.to_thread(self._auth_manager.get_access_token, as_dict=False)
+
+    async def _get(self, path: str, **params):
+        """
+        Send GET request and return decoded JSON
+        Request that got 429 wait for Retry-After and is sent again, at most retries time.
+        :param path: Path after URL prefix
+        :param params: Query parameter, parameter with None value is left out
+        :return: Decoded response
+        """
+
+        if self._session is None:
+            try:
+                import aiohttp
+            except ImportError as error:
+                raise ImportError('AsyncSpotify need aiohttp, install it with pip install aiohttp') from error
+
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.max_connections)
+            )
+
+        url = self.prefix + path
+        params = {name: str(value) for name, value in params.items() if value is not None}
+
+        token = await self._token()
+        headers = {'Authorization': f'Bearer {token}'} if token else {}
+
+        attempt = 0
+        throttled = 0
+        max_throttled = self.scheduler.max_retries if self.scheduler is not None else self.retries
+
+        while True:
+            if self.scheduler is not None:
+                await self.scheduler.acquire_async(current_priority())
+
+            # Wait for retry after response is released, so connection is not held while sleeping
+            async with self._session.get(url, params=params, headers=headers) as response:
+                self.requests += 1
+
+                if response.status == 429 and throttled < max_throttled:
+                    retry_headers = dict(response.headers)
+                elif response.status >= 500 and attempt < self.retries:
+                    retry_headers = None
+                elif response.status >= 400:
+                    raise spotipy.SpotifyException(
+                        response.status,
+                        -1,
+                        f'{response.url}:\n {await response.text()}',
+                        headers=dict(response.headers)
+                    )
+                else:
+                    return await response.json()
+
+            if retry_headers is not None:
+                await self.__throttle(retry_headers, throttled)
+                throttled += 1
+            else:
+                attempt += 1
+                await asyncio.sleep(0.3 * 2 ** attempt)
+
+    async def __throttle(self, headers, attempt):
+        """
+        Wait for Retry-After of throttled request, every thread and coroutine of scheduler wait with it
+        """
+
+        if self.scheduler is not None:
+            # Next acquire wait until throttle is over
+            self.scheduler.throttle(self.scheduler.retry_after(headers, attempt))
+            return
+
+        try:
+            retry_after = float(headers.get('Retry-After', 2 ** attempt))
+        except ValueError:
+            retry_after = 2 ** attempt
+
+        await asyncio.sleep(retry_after)
+
+    async def search(self, q, limit=10, offset=0, type='artist', market=None):
+        return await self._get('search', q=q, limit=limit, offset=offset, type=type, market=market)
+
+    async def artist(self, artist_id):
+        return await self._get(f'artists/{artist_id}')
+
+    async def artist_albums(self, artist_id, album_type=None, country=None, limit=20, offset=0):
+        return await self._get(
+            f'artists/{artist_id}/albums',
+            include_groups=album_type,
+            country=country,
+            limit=limit,
+            offset=offset
+        )
+
+    async def albums(self, albums, market=None):
+        return await self._get('albums/', ids=','.join(albums), market=market)
+
+    async def tracks(self, tracks, market=None):
+        return await self._get('tracks/', ids=','.join(tracks), market=market)
+
+    async def artist_top_tracks(self, artist_id, country='US'):
+        return await self._get(f'artists/{artist_id}/top-tracks', country=country)
+
+    async def artist_related_artists(self, artist_id):
+        return await self._get(f'artists/{artist_id}/related-artists')
+
+
+class AsyncBatchDispatcher:
+    """
+    Collect ID lookup from every coroutine into request of up to batch_size ID
+    """
+
+    def __init__(self, fetch, batch_size: int, max_wait: float = 0.01):
+        """
+        :param fetch: Coroutine function that take list of ID and return list of detail in the same order
+        :param batch_size: Maximum number of ID in one request
+        :param max_wait: Second that partial batch wait for ID from other coroutine before sent
+        """
+
+        self._fetch = fetch
+        self.batch_size = batch_size
+        self.max_wait = max_wait
+
+        # Waiting ID and future of every ID that is waiting or being fetched
+        self._pending = []
+        self._futures = {}
+
+        self._timer = None
+        self._tasks = set()
+
+        # Number of request sent and ID fetched
+        self.requests = 0
+        self.fetched = 0
+
+    async def fetch(self, ids: list) -> list:
+        """
+        Return detail of every ID, ID asked by other coroutine at the same time is fetched once
+        :param ids: List of ID
+        :return: List of detail in the same order as ids
+        """
+
+        loop = asyncio.get_running_loop()
+        futures = []
+
+        for item_id in ids:
+            future = self._futures.get(item_id)
+
+            if future is None:
+                future = loop.create_future()
+                self._futures[item_id] = future
+                self._pending.append(item_id)
+
+            futures.append(future)
+
+        # Full batch is sent right away, partial batch wait for the timer
+        self._send_batches(full_only=True)
+
+        if self._pending and self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._send_batches)
+
+        return list(await asyncio.gather(*futures))
+
+    def _send_batches(self, full_only: bool = False):
+        """
+        Start fetch task of pending ID
+        :param full_only: Leave partial batch pending
+        """
+
+        if not full_only and self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        while self._pending and (len(self._pending) >= self.batch_size or not full_only):
+            batch = self._pending[:self.batch_size]
+            del self._pending[:self.batch_size]
+
+            task = asyncio.ensure_future(self._send(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _send(self, ids: list):
+        """
+        Fetch batch and hand result to each future
+        :param ids: List of ID
+        """
+
+        results = None
+        failure = None
+
+        try:
+            results = await self._fetch(ids)
+        except Exception as error:  # noqa: BLE001, error is handed to every waiting coroutine
+            failure = error
+
+        self.requests += 1
+        self.fetched += len(ids)
+
+        for index, item_id in enumerate(ids):
+            future = self._futures.pop(item_id)
+
+            if future.done():
+                continue
+
+            if failure is not None:
+                future.set_exception(failure)
+            else:
+                future.set_result(results[index])
+
+
+class AsyncArtistDb:
+    """
+    Asynchronous version of ArtistDb method that call Spotify Web API
+
+    Tables and storage belong to the blocking database object, only Spotify request
+    is sent on event loop. Committing and reading partition run on worker thread
+    so event loop is never blocked by lock or disk.
+    """
+
+    def __init__(self, db, sp: AsyncSpotify):
+        """
+        :param db: ArtistDb or SqliteArtistDb object that keep tables
+        :param sp: Asynchronous Spotify client
+        """
+
+        self._db = db
+        self._sp = sp
+
+        self._album_batcher = AsyncBatchDispatcher(self.__fetch_albums, ALBUM_BATCH_SIZE)
+        self._track_batcher = AsyncBatchDispatcher(self.__fetch_tracks, TRACK_BATCH_SIZE)
+
+        # Task of every artist being added, so artist asked by many coroutine is fetched once
+        self._adding = {}
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self._sp.close()
+
+    async def __fetch_albums(self, album_ids):
+        return (await self._sp.albums(album_ids, market='TH'))['albums']
+
+    async def __fetch_tracks(self, track_ids):
+        return (await self._sp.tracks(track_ids, market='TH'))['tracks']
+
+    async def search(self, query):
+        """
+        Search artist name by use query as a keyword
+        :param query: Search keyword
+        :return: List of tuple of artist name, genre, id
+        """
+
+        result = (await self._sp.search(query, limit=20, type='artist', market='TH'))['artists']['items']
+
+        return [(artist['name'], artist['genres'], artist['id']) for artist in result]
+
+    async def add_artist(self, artist_id):
+        """
+        Add artist to database
+        :param artist_id: Spotify artist ID
+        """
+
+        # Lookup of SqliteArtistDb is a blocking query
+        if await asyncio.to_thread(self._db.has_artist, artist_id):
+            return
+
+        task = self._adding.get(artist_id)
+
+        if task is None:
+            task = asyncio.ensure_future(self.__add_artist(artist_id))
+            self._adding[artist_id] = task
+            task.add_done_callback(lambda _: self._adding.pop(artist_id, None))
+
+        # Caller that got cancelled does not cancel fetch of other caller
+        await asyncio.shield(task)
+
+    async def add_artists(self, artist_ids):
+        """
+        Add every artist at the same time, their album and track lookup share batched request
+        :param artist_ids: List of Spotify artist ID
+        """
+        await asyncio.gather(*(self.add_artist(artist_id) for artist_id in artist_ids))
+
+    async def __add_artist(self, artist_id):
+        """
+        Gather artist detail, album and track from Spotify then commit them
+        :param artist_id: Spotify artist ID
+        """
+
+        artist_detail, artist_album, artist_single = await asyncio.gather(
+            self._sp.artist(artist_id),
+            self._sp.artist_albums(artist_id, album_type='album', country='TH'),
+            self._sp.artist_albums(artist_id, album_type='single', country='TH'),
+        )
+
+        album_list = [album['id'] for album in artist_album['items'] + artist_single['items']]
+
+        album_rows = []
+        track_list = []
+
+        for album_detail in await self._album_batcher.fetch(album_list):
+            album_rows.append(album_row(album_detail, artist_id))
+            track_list += [track['id'] for track in album_detail['tracks']['items']]
+
+        track_rows = [
+            track_row(track_detail, artist_id)
+            for track_detail in await self._track_batcher.fetch(track_list)
+        ]
+
+        await asyncio.to_thread(
+            self._db._store_artist,
+            *artist_frames(artist_row(artist_detail), album_rows, track_rows)
+        )
+
+    async def get_selected_artist(self, artist_id):
+        """
+        Return Selected artist object, artist not in database get added
+        :param artist_id: Spotify artist_id
+        :return: Selected artist object with selected artist information
+        """
+
+        await self.add_artist(artist_id)
+
+        return await asyncio.to_thread(self._db.get_selected_artist, artist_id)
+
+    async def get_top_tracks(self, artist_id):
+        """
+        Return list of artist top 10 track
+        :param artist_id: Spotify artist ID
+        :return: list of artist top 10 track
+        """
+        try:
+            return (await self._sp.artist_top_tracks(artist_id, country='TH'))['tracks']
+        except spotipy.SpotifyException:
+            return None
+
+    async def get_related_artist(self, artist_id):
+        """
+        Return list of artist's relate artist
+        :param artist_id: Spotify artist ID
+        :return: list of artist's relate artist
+        """
+        relate = (await self._sp.artist_related_artists(artist_id))['artists']
+        return [(artist['name'], artist['genres'], artist['id']) for artist in relate]
@@ -0,0 +1,219 @@
+"""
+Batch coalescer for Spotify lookup by list of ID (albums, tracks)
+
+ID requested by every thread is collected into one queue and sent in request
+filled up to API maximum, then each result is handed back to the thread that asked for it.
+There is no dispatcher thread, waiting caller send batch by itself.
+
+ID waiting for caller of different priority is sent at the highest one. Batch refused
+by call budget of the sending thread is put back for every other caller of its ID,
+only the caller whose budget refused it get BudgetExceeded.
+"""
+import itertools
+import threading
+import time
+from concurrent.futures import Future
+from scheduler import BudgetExceeded, current_priority, priority
+
+
+class BatchDispatcher:
+    """
+    Collect ID lookup from every thread into request of up to batch_size ID
+    """
+
+    def __init__(self, fetch, batch_size: int, max_wait: float = 0.01):
+        """
+        :param fetch: Function that take list of ID and return list of detail in the same order
+        :param batch_size: Maximum number of ID in one request
+        :param max_wait: Second that partial batch wait for ID from other thread before sent
+        """
+
+        self._fetch = fetch
+        self.batch_size = batch_size
+        self.max_wait = max_wait
+
+        self._condition = threading.Condition()
+        self._sequence = itertools.count()
+
+        # Waiting ID as (priority, sequence, ID, time requested)
+        self._pending = []
+
+        # Future of every ID that is waiting or being fetched
+        self._futures = {}
+
+        # Priority of every caller waiting for each ID
+        self._waiters = {}
+
+        # ID of batch being fetched right now
+        self._sending = set()
+
+        # Number of request sent and ID fetched
+        self.requests = 0
+        self.fetched = 0
+
+    def fetch(self, ids: list) -> list:
+        """
+        Return detail of every ID, ID asked by other thread at the same time is fetched once
+        :param ids: List of ID
+        :return: List of detail in the same order as ids
+        """
+
+        level = current_priority()
+
+        with self._condition:
+            futures = []
+
+            for item_id in ids:
+                future = self._futures.get(item_id)
+
+                if future is None:
+                    future = Future()
+                    self._futures[item_id] = future
+                    self._waiters[item_id] = [level]
+                    self._pending.append((level, next(self._sequence), item_id, time.monotonic()))
+                else:
+                    self._waiters[item_id].append(level)
+                    self.__update_level(item_id)
+
+                futures.append(future)
+
+            self._condition.notify_all()
+
+        try:
+            while not all(future.done() for future in futures):
+                batch = self._take_batch(futures)
+
+                if batch:
+                    self._send(batch)
+        except BudgetExceeded:
+            self.__leave(ids, level)
+            raise
+
+        return [future.result() for future in futures]
+
+    def __update_level(self, item_id):
+        """
+        Set priority of pending ID to the highest priority of its waiting caller,
+        condition lock must be held
+        """
+
+        level = min(self._waiters[item_id])
+
+        for index, entry in enumerate(self._pending):
+            if entry[2] == item_id:
+                if entry[0] != level:
+                    self._pending[index] = (level, *entry[1:])
+                return
+
+    def __leave(self, ids, level):
+        """
+        Stop waiting for ID of caller whose budget got used up or cancelled,
+        pending ID that nobody else wait for is dropped, ID being fetched is left to its sender
+        :param ids: ID the caller waited for
+        :param level: Priority of caller
+        """
+
+        with self._condition:
+            for item_id in ids:
+                future = self._futures.get(item_id)
+
+                if future is None or future.done():
+                    continue
+
+                waiters = self._waiters[item_id]
+                waiters.remove(level)
+
+                if item_id in self._sending:
+                    continue
+
+                if waiters:
+                    self.__update_level(item_id)
+                    continue
+
+                self._pending = [entry for entry in self._pending if entry[2] != item_id]
+                del self._futures[item_id]
+                del self._waiters[item_id]
+                future.set_exception(BudgetExceeded('no caller left'))
+
+            self._condition.notify_all()
+
+    def _take_batch(self, futures):
+        """
+        Wait until a batch is ready to be sent by this thread or every future is done
+        :param futures: Future that calling thread wait for
+        :return: List of pending entry to send, empty list when every future is done
+        """
+
+        with self._condition:
+
+            while True:
+
+                if all(future.done() for future in futures):
+                    return []
+
+                if self._pending:
+                    oldest = min(entry[3] for entry in self._pending)
+                    wait = oldest + self.max_wait - time.monotonic()
+
+                    if len(self._pending) >= self.batch_size or wait <= 0:
+                        self._pending.sort()
+                        batch = self._pending[:self.batch_size]
+                        del self._pending[:self.batch_size]
+                        self._sending.update(entry[2] for entry in batch)
+                        return batch
+
+                    self._condition.wait(wait)
+                else:
+                    self._condition.wait()
+
+    def _send(self, batch):
+        """
+        Fetch batch and hand result to each future
+        :param batch: List of pending entry
+        """
+
+        ids = [entry[2] for entry in batch]
+        results = None
+        failure = None
+
+        try:
+            with priority(min(entry[0] for entry in batch)):
+                results = self._fetch(ids)
+        except BudgetExceeded:
+            # No result for this batch, other caller of these ID may still send them
+            with self._condition:
+                self._sending.difference_update(ids)
+
+                for entry in batch:
+                    waiters = self._waiters.get(entry[2])
+
+                    if waiters:
+                        self._pending.append((min(waiters), *entry[1:]))
+                    elif waiters is not None:
+                        # Every caller of ID left while it was being fetched
+                        del self._waiters[entry[2]]
+                        self._futures.pop(entry[2]).set_exception(BudgetExceeded('no caller left'))
+
+                self._condition.notify_all()
+            raise
+        except Exception as error:  # noqa: BLE001, error is handed to every waiting thread
+            failure = error
+
+        with self._condition:
+            self.requests += 1
+            self.fetched += len(ids)
+            self._sending.difference_update(ids)
+
+            for index, item_id in enumerate(ids):
+                future = self._futures.pop(item_id, None)
+                self._waiters.pop(item_id, None)
+
+                if future is None:
+                    continue
+
+                if failure is not None:
+                    future.set_exception(failure)
+                else:
+                    future.set_result(results[index])
+
+            self._condition.notify_all()
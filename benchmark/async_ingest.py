@@ -0,0 +1,158 @@
+"""
+Concurrent ingestion through blocking thread pool and through event loop
+
+Both run real HTTP request against local stand-in server with latency.
+Blocking ArtistDb use one thread per artist being added, AsyncArtistDb add every
+artist at the same time on one thread. With --rate both go through request scheduler
+against stand-in server that answer 429 over --rate-limit call per second.
+
+Usage: python benchmark/async_ingest.py [--artists 200] [--threads 8] [--latency 0.05] [--rate 40 --rate-limit 50]
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import threading
+import time
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+import requests  # noqa: E402
+import spotipy  # noqa: E402
+from artist_db import ArtistDb  # noqa: E402
+from async_artist_db import AsyncArtistDb, AsyncSpotify  # noqa: E402
+from fake_spotify import FakeSpotify, artist_id_of  # noqa: E402
+from scheduler import RequestScheduler, ScheduledSpotify  # noqa: E402
+from stand_in_server import StandInServer  # noqa: E402
+from storage_backend import create_csv_db  # noqa: E402
+
+
+def client_threads() -> int:
+    """
+    Return number of thread that is not handling stand-in server connection
+    """
+    return sum('process_request_thread' not in thread.name for thread in threading.enumerate())
+
+
+def ingest_threads(server, directory, artist_ids, threads, scheduler=None):
+    """
+    Add every artist with blocking database from thread pool
+    :param scheduler: Request scheduler of every call, None to send without pacing
+    :return: Tuple of elapsed second, request count and peak thread count
+    """
+
+    # Plain session does not retry, so 429 is left to scheduler the same as the application
+    sp = spotipy.Spotify(auth='stand-in', requests_session=requests.Session() if scheduler else True)
+    sp.prefix = server.prefix
+
+    db = ArtistDb(ScheduledSpotify(sp, scheduler) if scheduler else sp, *create_csv_db(directory))
+    before = server.stats['requests']
+    peak = client_threads()
+
+    start = time.perf_counter()
+
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        futures = [executor.submit(db.add_artist, artist_id) for artist_id in artist_ids]
+        peak = max(peak, client_threads())
+
+        for future in futures:
+            future.result()
+
+    elapsed = time.perf_counter() - start
+
+    assert len(db.artist_table()) == len(artist_ids)
+
+    return elapsed, server.stats['requests'] - before, peak
+
+
+async def ingest_async(server, directory, artist_ids, connections, scheduler=None):
+    """
+    Add every artist with asynchronous database on event loop
+    :param scheduler: Request scheduler of every call, None to send without pacing
+    :return: Tuple of elapsed second, request count and peak thread count
+    """
+
+    db = ArtistDb(None, *create_csv_db(directory))
+    before = server.stats['requests']
+
+    start = time.perf_counter()
+
+    sp = AsyncSpotify(prefix=server.prefix, max_connections=connections, scheduler=scheduler)
+
+    async with AsyncArtistDb(db, sp) as adb:
+        ingest = asyncio.ensure_future(adb.add_artists(artist_ids))
+        peak = client_threads()
+
+        while not ingest.done():
+            peak = max(peak, client_threads())
+            await asyncio.sleep(0.01)
+
+        await ingest
+
+    elapsed = time.perf_counter() - start
+
+    assert len(db.artist_table()) == len(artist_ids)
+
+    return elapsed, server.stats['requests'] - before, peak
+
+
+def main():
+    """
+    Ingest the same artist both way and print time and request count
+    """
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--artists', type=int, default=200)
+    parser.add_argument('--threads', type=int, default=8, help='Thread of blocking database')
+    parser.add_argument('--connections', type=int, default=32, help='Connection of asynchronous client')
+    parser.add_argument('--latency', type=float, default=0.05, help='Second of stand-in server response')
+    parser.add_argument('--rate', type=float, help='Request per second of scheduler, no scheduler when not given')
+    parser.add_argument('--rate-limit', type=int, help='Call per second that stand-in server allow')
+    args = parser.parse_args()
+
+    warnings.simplefilter('ignore', DeprecationWarning)
+
+    artist_ids = [artist_id_of(index) for index in range(args.artists)]
+
+    def scheduler():
+        return RequestScheduler(rate=args.rate, burst=int(args.rate)) if args.rate else None
+
+    server = StandInServer(FakeSpotify(latency=args.latency, rate_limit=args.rate_limit))
+    server.start()
+
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            os.mkdir(os.path.join(directory, 'threads'))
+            os.mkdir(os.path.join(directory, 'async'))
+
+            with contextlib.redirect_stdout(io.StringIO()):
+                threaded = ingest_threads(
+                    server, os.path.join(directory, 'threads'), artist_ids, args.threads, scheduler()
+                )
+                asynchronous = asyncio.run(
+                    ingest_async(server, os.path.join(directory, 'async'), artist_ids, args.connections, scheduler())
+                )
+    finally:
+        server.stop()
+
+    for name, (elapsed, requests, peak) in (
+            (f'{args.threads} threads', threaded),
+            ('event loop', asynchronous),
+    ):
+        print(
+            f'{name}: {args.artists} artists in {elapsed:.2f}s '
+            f'({args.artists / elapsed:.1f} artists/s), {requests} requests, {peak} threads'
+        )
+
+    if server.stats['status_429']:
+        print(f"stand-in server answered {server.stats['status_429']} requests with 429")
+
+
+if __name__ == '__main__':
+    main()
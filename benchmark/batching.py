@@ -0,0 +1,82 @@
+"""
+Measure round trip per ingested track with batch coalescing across concurrent ingestion
+
+Usage: python benchmark/batching.py [--artists 40] [--workers 1 8]
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import threading
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+from artist_db import ArtistDb  # noqa: E402
+from fake_spotify import FakeSpotify, artist_id_of  # noqa: E402
+from storage_backend import create_csv_db  # noqa: E402
+
+
+def run(artists, workers, latency):
+    """
+    Ingest artists with number of worker thread
+    :return: Dictionary of call count and elapsed time
+    """
+
+    # Artist with partly filled last album and track request
+    sp = FakeSpotify(albums_per_artist=7, singles_per_artist=4, tracks_per_album=9, latency=latency)
+
+    with tempfile.TemporaryDirectory() as directory:
+        db = ArtistDb(sp, *create_csv_db(directory))
+
+        def worker(offset):
+            for index in range(offset, artists, workers):
+                db.add_artist(artist_id_of(index))
+
+        threads = [threading.Thread(target=worker, args=(k,)) for k in range(workers)]
+
+        start = time.perf_counter()
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        elapsed = time.perf_counter() - start
+
+        tracks = sum(len(track) for track in db.snapshot().track.values())
+
+    return {
+        'workers': workers,
+        'elapsed': elapsed,
+        'tracks': tracks,
+        'albums_calls': sp.calls['albums'],
+        'tracks_calls': sp.calls['tracks'],
+        'calls_per_track': sum(sp.calls.values()) / tracks,
+    }
+
+
+def main():
+    """
+    Compare number of request with different number of concurrent ingestion
+    """
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--artists', type=int, default=40, help='Number of artist to ingest')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 8])
+    parser.add_argument('--latency', type=float, default=0.02, help='Fake Spotify latency')
+    args = parser.parse_args()
+
+    for workers in args.workers:
+        result = run(args.artists, workers, args.latency)
+        print(f"{result['workers']:>3} workers: {result['albums_calls']} albums and "
+              f"{result['tracks_calls']} tracks requests for {result['tracks']} tracks, "
+              f"{result['calls_per_track']:.4f} requests per track, {result['elapsed']:.2f}s")
+
+
+if __name__ == '__main__':
+    main()
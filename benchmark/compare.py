@@ -0,0 +1,58 @@
+"""
+Compare two benchmark result written by benchmark/run.py
+
+Usage: python benchmark/compare.py BASE.json NEW.json [--threshold 0.1]
+Exit with non-zero status when any benchmark got slower than threshold.
+"""
+import argparse
+import json
+import sys
+
+
+def main():
+    """
+    Print median of each benchmark side by side and flag regression
+    """
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('base', help='Result of base commit')
+    parser.add_argument('new', help='Result of new commit')
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help='Relative slowdown that count as regression')
+    args = parser.parse_args()
+
+    with open(args.base, encoding='utf-8') as file:
+        base = json.load(file)
+
+    with open(args.new, encoding='utf-8') as file:
+        new = json.load(file)
+
+    if base['parameters'] != new['parameters']:
+        print(f"warning: parameters differ {base['parameters']} != {new['parameters']}")
+
+    print(f"{'benchmark':<28}{'base ms':>12}{'new ms':>12}{'change':>10}")
+
+    regressions = []
+
+    for name, result in new['results'].items():
+        if name not in base['results']:
+            print(f"{name:<28}{'-':>12}{result['median'] * 1000:12.2f}")
+            continue
+
+        base_median = base['results'][name]['median']
+        change = result['median'] / base_median - 1
+
+        flag = ''
+        if change > args.threshold:
+            flag = '  REGRESSION'
+            regressions.append(name)
+
+        print(f"{name:<28}{base_median * 1000:12.2f}{result['median'] * 1000:12.2f}"
+              f"{change:+10.1%}{flag}")
+
+    if regressions:
+        sys.exit(f"{len(regressions)} regression: {', '.join(regressions)}")
+
+
+if __name__ == '__main__':
+    main()
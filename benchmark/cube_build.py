@@ -0,0 +1,50 @@
+"""
+Analytics cube build time by number of worker process and query latency
+
+Usage: python benchmark/cube_build.py [--tracks 100000] [--workers 1 2 4]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+from analytics_cube import AnalyticsCube  # noqa: E402
+from artist_db import ArtistDb  # noqa: E402
+from synthetic_catalog import generate_catalog  # noqa: E402
+
+
+def main():
+    """
+    Build cube of synthetic catalog with each number of worker
+    """
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--tracks', type=int, default=100_000)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, os.cpu_count()])
+    parser.add_argument('--queries', type=int, default=100)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        paths = generate_catalog(directory, args.tracks)
+
+        for workers in args.workers:
+            db = ArtistDb(None, *paths)
+
+            start = time.perf_counter()
+            cube = AnalyticsCube.build(db, workers)
+            print(f'{workers} workers: {len(cube)} cells built in {time.perf_counter() - start:.2f}s')
+
+        start = time.perf_counter()
+
+        for _ in range(args.queries):
+            cube.query(by=('year', 'type'))
+
+        print(f'query by year and type: {(time.perf_counter() - start) / args.queries * 1000:.2f} ms')
+
+
+if __name__ == '__main__':
+    main()
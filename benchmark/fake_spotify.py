@@ -0,0 +1,210 @@
+"""
+Deterministic in-process stand-in for spotipy.Spotify
+
+Every artist, album and track detail is generated from its ID
+so the same ID always give the same response without network access.
+"""
+import threading
+import time
+import zlib
+from collections import Counter, deque
+import spotipy
+
+
+def artist_id_of(index: int) -> str:
+    """
+    Return artist ID of n-th artist in fake catalog
+    :param index: Artist number
+    :return: Fake artist ID
+    """
+    return f'ar{index:08d}'
+
+
+class FakeSpotify:
+    """
+    Fake Spotify client that implement every spotipy.Spotify method used by ArtistDb
+    """
+
+    GENRES = ['rock', 'pop', 'jazz', 'djent', 'indie', 'metal', 'folk', 'electronic']
+
+    def __init__(
+            self,
+            albums_per_artist: int = 10,
+            singles_per_artist: int = 5,
+            tracks_per_album: int = 10,
+            latency: float = 0.0,
+            rate_limit: int = None
+    ):
+        """
+        :param albums_per_artist: Number of album of each artist
+        :param singles_per_artist: Number of single of each artist
+        :param tracks_per_album: Number of track in each album, single has one track
+        :param latency: Second to sleep in every call to simulate network round trip
+        :param rate_limit: Number of call allowed in any one second window,
+                           call over the limit raise 429 SpotifyException with Retry-After
+        """
+
+        self.albums_per_artist = albums_per_artist
+        self.singles_per_artist = singles_per_artist
+        self.tracks_per_album = tracks_per_album
+        self.latency = latency
+        self.rate_limit = rate_limit
+
+        # Number of call of each method, throttled call is counted as 'throttled'
+        self.calls = Counter()
+
+        # Time of accepted call in the last second
+        self._window = deque()
+        self._lock = threading.Lock()
+
+    def _call(self, method):
+        """
+        Count call, enforce rate limit and simulate latency
+        :param method: Name of called method
+        """
+
+        with self._lock:
+            now = time.monotonic()
+
+            if self.rate_limit:
+                while self._window and self._window[0] <= now - 1:
+                    self._window.popleft()
+
+                if len(self._window) >= self.rate_limit:
+                    self.calls['throttled'] += 1
+                    raise spotipy.SpotifyException(
+                        429,
+                        -1,
+                        'API rate limit exceeded',
+                        headers={'Retry-After': f'{self._window[0] + 1 - now:.3f}'}
+                    )
+
+                self._window.append(now)
+
+            self.calls[method] += 1
+
+        if self.latency:
+            time.sleep(self.latency)
+
+    @staticmethod
+    def _number(item_id: str, modulo: int) -> int:
+        """
+        Deterministic number from ID
+        """
+        return zlib.crc32(item_id.encode()) % modulo
+
+    def _artist(self, artist_id):
+        """
+        Artist detail of artist ID
+        """
+        return {
+            'id': artist_id,
+            'name': f'Artist {artist_id}',
+            'genres': [
+                self.GENRES[self._number(artist_id, len(self.GENRES))],
+                self.GENRES[self._number(artist_id[::-1], len(self.GENRES))],
+            ],
+            'followers': {'total': self._number(artist_id, 1_000_000)},
+            'popularity': self._number(artist_id, 100),
+            'images': [{'url': f'https://example.com/{artist_id}.jpg'}],
+            'external_urls': {'spotify': f'https://open.spotify.com/artist/{artist_id}'},
+        }
+
+    def _album(self, album_id):
+        """
+        Album detail of album ID
+        """
+        # Album ID is artist ID, album type letter and number
+        album_type = 'album' if album_id[10] == 'a' else 'single'
+        total_tracks = self.tracks_per_album if album_type == 'album' else 1
+        year = 1980 + self._number(album_id, 45)
+
+        return {
+            'id': album_id,
+            'name': f'Album {album_id}',
+            'type': 'album',
+            'album_type': album_type,
+            'release_date': f'{year}-{1 + self._number(album_id, 12):02d}-01',
+            'total_tracks': total_tracks,
+            'popularity': self._number(album_id, 100),
+            'images': [{'url': f'https://example.com/{album_id}.jpg'}],
+            'external_urls': {'spotify': f'https://open.spotify.com/album/{album_id}'},
+            'tracks': {'items': [{'id': f'{album_id}t{k:03d}'} for k in range(total_tracks)]},
+        }
+
+    def _track(self, track_id):
+        """
+        Track detail of track ID
+        """
+        return {
+            'id': track_id,
+            'name': f'Track {track_id}',
+            'album': {'id': track_id[:15], 'album_type': 'album'},
+            'popularity': self._number(track_id, 100),
+            'duration_ms': 120_000 + self._number(track_id, 240_000),
+        }
+
+    def search(self, q, limit=10, offset=0, type='artist', market=None):
+        """
+        Search return artist starting from number derived from query
+        """
+        self._call('search')
+        number = self._number(q, 100_000)
+        return {'artists': {'items': [
+            self._artist(artist_id_of(number + k)) for k in range(offset, offset + limit)
+        ]}}
+
+    def artist(self, artist_id):
+        """
+        Same as spotipy.Spotify.artist
+        """
+        self._call('artist')
+        return self._artist(artist_id)
+
+    def artist_albums(self, artist_id, album_type=None, country=None, limit=20, offset=0):
+        """
+        Same as spotipy.Spotify.artist_albums
+        """
+        self._call('artist_albums')
+        if album_type == 'single':
+            ids = [f'{artist_id}s{k:04d}' for k in range(self.singles_per_artist)]
+        else:
+            ids = [f'{artist_id}a{k:04d}' for k in range(self.albums_per_artist)]
+        return {'items': [{'id': album_id} for album_id in ids[offset:offset + limit]]}
+
+    def albums(self, albums, market=None):
+        """
+        Same as spotipy.Spotify.albums
+        """
+        if len(albums) > 20:
+            raise ValueError('Too many album ID in one request')
+        self._call('albums')
+        return {'albums': [self._album(album_id) for album_id in albums]}
+
+    def tracks(self, tracks, market=None):
+        """
+        Same as spotipy.Spotify.tracks
+        """
+        if len(tracks) > 50:
+            raise ValueError('Too many track ID in one request')
+        self._call('tracks')
+        return {'tracks': [self._track(track_id) for track_id in tracks]}
+
+    def artist_top_tracks(self, artist_id, country='US'):
+        """
+        Same as spotipy.Spotify.artist_top_tracks
+        """
+        self._call('artist_top_tracks')
+        album_ids = [f'{artist_id}a{k:04d}' for k in range(self.albums_per_artist)]
+        return {'tracks': [
+            self._track(f'{album_ids[k % len(album_ids)]}t{k:03d}')
+            for k in range(10)
+        ] if album_ids else []}
+
+    def artist_related_artists(self, artist_id):
+        """
+        Same as spotipy.Spotify.artist_related_artists
+        """
+        self._call('artist_related_artists')
+        number = int(artist_id[2:])
+        return {'artists': [self._artist(artist_id_of(number + k)) for k in range(1, 21)]}
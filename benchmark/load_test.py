@@ -0,0 +1,166 @@
+"""
+Load test of local HTTP service with many concurrent client
+
+Service run in process on synthetic catalog and fake Spotify client with latency.
+Every client keep one connection open and send mix of artist detail, statistics,
+search and related artist request. Part of artist is not in catalog, so the first
+request of it fetch artist from fake Spotify.
+
+Usage: python benchmark/load_test.py [--clients 16] [--requests 200] [--cache-size 1024]
+"""
+import argparse
+import contextlib
+import http.client
+import io
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+from artist_db import ArtistDb  # noqa: E402
+from fake_spotify import FakeSpotify, artist_id_of  # noqa: E402
+from server import ArtistServer, ArtistService  # noqa: E402
+from synthetic_catalog import generate_catalog  # noqa: E402
+
+
+def request_paths(rand: random.Random, artists: int, new_artists: int, count: int) -> list:
+    """
+    Return path of request sent by one client
+    :param rand: Random generator of client
+    :param artists: Number of artist in catalog
+    :param new_artists: Number of artist that is not in catalog
+    :param count: Number of request
+    :return: List of path
+    """
+
+    # Few artist get most request
+    weights = [1 / (rank + 1) for rank in range(artists + new_artists)]
+    population = range(artists + new_artists)
+
+    paths = []
+
+    for _ in range(count):
+        kind = rand.random()
+
+        if kind < 0.5:
+            paths.append(f'/artist/{artist_id_of(rand.choices(population, weights)[0])}')
+        elif kind < 0.7:
+            ids = {artist_id_of(index) for index in rand.choices(population, weights, k=3)}
+            paths.append(f'/statistics?ids={",".join(sorted(ids))}')
+        elif kind < 0.85:
+            paths.append(f'/search?q=artist+{rand.randrange(20)}')
+        else:
+            paths.append(f'/artist/{artist_id_of(rand.choices(population, weights)[0])}/related')
+
+    return paths
+
+
+def run_client(host, port, paths, latencies, errors):
+    """
+    Send every request over one connection and record latency
+    """
+
+    connection = http.client.HTTPConnection(host, port)
+
+    for path in paths:
+        start = time.perf_counter()
+
+        connection.request('GET', path)
+        response = connection.getresponse()
+        response.read()
+
+        latencies.append(time.perf_counter() - start)
+
+        if response.status != 200:
+            errors.append((path, response.status))
+
+    connection.close()
+
+
+def main():
+    """
+    Run load test and print throughput and latency
+    """
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--requests', type=int, default=200, help='Request sent by each client')
+    parser.add_argument('--tracks', type=int, default=20_000, help='Track in synthetic catalog')
+    parser.add_argument('--new-artists', type=int, default=20, help='Artist that is not in catalog')
+    parser.add_argument('--latency', type=float, default=0.05, help='Second of fake Spotify call')
+    parser.add_argument('--cache-size', type=int, default=1024, help='0 to disable answer cache')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        paths = generate_catalog(directory, args.tracks)
+
+        sp = FakeSpotify(latency=args.latency)
+        db = ArtistDb(sp, *paths)
+        artists = len(db.artist_table())
+
+        server = ArtistServer(ArtistService(db, args.cache_size), port=0)
+        server.start()
+
+        host, port = server.server_address[:2]
+
+        client_paths = [
+            request_paths(random.Random(client), artists, args.new_artists, args.requests)
+            for client in range(args.clients)
+        ]
+
+        latencies = []
+        errors = []
+
+        threads = [
+            threading.Thread(target=run_client, args=(host, port, client_path, latencies, errors))
+            for client_path in client_paths
+        ]
+
+        # SelectedArtist and add_artist print progress
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+
+            for thread in threads:
+                thread.start()
+
+            for thread in threads:
+                thread.join()
+
+            elapsed = time.perf_counter() - start
+
+        connection = http.client.HTTPConnection(host, port)
+        connection.request('GET', '/stats')
+        stats = json.loads(connection.getresponse().read())
+        connection.close()
+
+        server.stop()
+
+    latency_ms = np.array(latencies) * 1000
+
+    print(f'{len(latencies)} requests from {args.clients} clients in {elapsed:.2f}s')
+    print(f'throughput: {len(latencies) / elapsed:.1f} req/s')
+    print(
+        f'latency: p50 {np.percentile(latency_ms, 50):.1f} ms, '
+        f'p99 {np.percentile(latency_ms, 99):.1f} ms, max {latency_ms.max():.1f} ms'
+    )
+    print(
+        f'cache: {stats["cache_hits"]} hits, {stats["cache_misses"]} misses, '
+        f'{stats["coalesced"]} coalesced'
+    )
+    print(f'spotify calls: {dict(sp.calls)}')
+
+    if errors:
+        print(f'{len(errors)} failed requests, first: {errors[0]}')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+"""
+Selection latency of browsing through related artist with and without prefetch
+
+Simulated user select an artist, read for a while, then select one of its first few
+related artist. Spotify call go through request scheduler so prefetch run at background
+priority with call budget, the same as in the application.
+
+Usage: python benchmark/prefetch.py [--steps 20] [--read 2.0] [--top 3] [--budget 60]
+"""
+import argparse
+import contextlib
+import io
+import os
+import random
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+from artist_db import ArtistDb  # noqa: E402
+from fake_spotify import FakeSpotify, artist_id_of  # noqa: E402
+from prefetch import Prefetcher  # noqa: E402
+from scheduler import RequestScheduler, ScheduledSpotify  # noqa: E402
+from storage_backend import create_csv_db  # noqa: E402
+
+
+def browse(directory, args, top_n):
+    """
+    Run one browsing session
+    :param top_n: Number of related artist to prefetch, 0 to turn prefetch off
+    :return: Tuple of list of selection second, Spotify call count and prefetch stats
+    """
+
+    sp = FakeSpotify(latency=args.latency)
+    scheduler = RequestScheduler(rate=args.rate, burst=int(args.rate))
+    db = ArtistDb(ScheduledSpotify(sp, scheduler), *create_csv_db(directory))
+    prefetcher = Prefetcher(db, top_n, args.budget) if top_n else None
+
+    rand = random.Random(0)
+    artist_id = artist_id_of(1000)
+    latencies = []
+
+    for _ in range(args.steps):
+        start = time.perf_counter()
+
+        if prefetcher:
+            prefetcher.selected(artist_id)
+
+        db.get_selected_artist(artist_id)
+        related = [related_id for _, _, related_id in db.get_related_artist(artist_id)]
+
+        latencies.append(time.perf_counter() - start)
+
+        if prefetcher:
+            prefetcher.prefetch(related)
+
+        # User read selected artist, then pick one of the first related artist
+        time.sleep(args.read)
+        artist_id = related[rand.randrange(args.choices)]
+
+    if prefetcher:
+        prefetcher.wait()
+
+    return latencies, sum(sp.calls.values()), prefetcher.stats if prefetcher else {}
+
+
+def main():
+    """
+    Browse the same path with and without prefetch and print selection latency
+    """
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--steps', type=int, default=20)
+    parser.add_argument('--read', type=float, default=2.0, help='Second user read each artist')
+    parser.add_argument('--top', type=int, default=3, help='Related artist to prefetch')
+    parser.add_argument('--choices', type=int, default=3, help='User pick one of this many related artist')
+    parser.add_argument('--budget', type=int, default=60, help='Spotify call per selection')
+    parser.add_argument('--latency', type=float, default=0.1, help='Second of fake Spotify call')
+    parser.add_argument('--rate', type=float, default=10.0, help='Spotify call per second of scheduler')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        results = {}
+
+        for name, top_n in (('no prefetch', 0), (f'prefetch top {args.top}', args.top)):
+            run_dir = os.path.join(directory, str(top_n))
+            os.mkdir(run_dir)
+
+            with contextlib.redirect_stdout(io.StringIO()):
+                results[name] = browse(run_dir, args, top_n)
+
+    for name, (latencies, calls, stats) in results.items():
+        latency_ms = np.array(latencies) * 1000
+
+        print(
+            f'{name}: selection mean {latency_ms.mean():.0f} ms, p50 {np.percentile(latency_ms, 50):.0f} ms, '
+            f'max {latency_ms.max():.0f} ms, {calls} Spotify calls {stats}'
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+"""
+Regression check of prefetch that leave batch dispatcher while its ID is being sent
+
+Prefetch thread is sending a batch of its own ID when another thread take the rest of its ID
+into a batch and start sending them. Budget of prefetch get cancelled, so its send is refused
+and it stop waiting while the other send is still in flight. The other thread must still get
+its result and the dispatcher must be left empty. Every step is ordered by event, so the
+same interleaving happen on every run. Exit with non-zero status when any check failed.
+
+Usage: python benchmark/prefetch_race.py
+"""
+import os
+import sys
+import threading
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+from batcher import BatchDispatcher  # noqa: E402
+from scheduler import (  # noqa: E402
+    BACKGROUND, INTERACTIVE, BudgetExceeded, CallBudget, RequestScheduler, call_budget, priority
+)
+
+# Longest second any step may take before it count as hang
+TIMEOUT = 5
+
+
+def main():
+    """
+    Run the interleaving once and print what each thread got
+    """
+
+    scheduler = RequestScheduler(rate=1000, burst=1000)
+    budget = CallBudget(100)
+
+    # Sending thread signal its batch is being fetched and wait to be released
+    sending = {'prefetch': threading.Event(), 'select': threading.Event()}
+    release = {'prefetch': threading.Event(), 'select': threading.Event()}
+
+    def fetch(ids):
+        name = threading.current_thread().name
+        sending[name].set()
+        release[name].wait(TIMEOUT)
+        return scheduler.call(lambda: [f'detail of {item_id}' for item_id in ids])
+
+    dispatcher = BatchDispatcher(fetch, batch_size=3, max_wait=TIMEOUT)
+    results = {}
+
+    def run(name, level, ids, thread_budget=None):
+        with priority(level), call_budget(thread_budget):
+            try:
+                results[name] = dispatcher.fetch(ids)
+            except Exception as error:  # noqa: BLE001, error is the result being checked
+                results[name] = error
+
+    # Prefetch take its first three ID as full batch and send them, the other three stay pending
+    prefetch = threading.Thread(
+        target=run,
+        args=('prefetch', BACKGROUND, ['w1', 'w2', 'w3', 'x1', 'x2', 'z1'], budget),
+        name='prefetch'
+    )
+    prefetch.start()
+    sending['prefetch'].wait(TIMEOUT)
+
+    # Selection take its own ID and two of prefetch ID into the next batch
+    select = threading.Thread(target=run, args=('select', INTERACTIVE, ['y1']), name='select')
+    select.start()
+    sending['select'].wait(TIMEOUT)
+
+    # Prefetch get refused and stop waiting while x1 and x2 are being sent by selection
+    budget.cancel()
+    release['prefetch'].set()
+    prefetch.join(TIMEOUT)
+
+    release['select'].set()
+    select.join(TIMEOUT)
+
+    failures = []
+
+    if prefetch.is_alive() or select.is_alive():
+        failures.append('thread did not finish')
+
+    if not isinstance(results.get('prefetch'), BudgetExceeded):
+        failures.append(f"prefetch got {results.get('prefetch')!r} instead of BudgetExceeded")
+
+    if results.get('select') != ['detail of y1']:
+        failures.append(f"selection got {results.get('select')!r}")
+
+    # Nothing is left waiting or being sent
+    with dispatcher._condition:
+        left = (dispatcher._pending, dispatcher._futures, dispatcher._waiters, dispatcher._sending)
+
+    if any(left):
+        failures.append(f'dispatcher is not empty: {left}')
+
+    for name, result in results.items():
+        print(f'{name}: {result!r}')
+
+    for failure in failures:
+        print('FAIL', failure)
+
+    if failures:
+        sys.exit(f'{len(failures)} failures')
+
+    print('OK')
+
+
+if __name__ == '__main__':
+    main()
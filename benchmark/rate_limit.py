@@ -0,0 +1,108 @@
+"""
+Check request scheduler against fake Spotify client that answer 429
+
+Background thread ingest many artist while interactive thread keep searching and
+selecting artist. Fake client throttle call over its rate limit with Retry-After.
+Exit with non-zero status when any call failed or data is incomplete.
+
+Usage: python benchmark/rate_limit.py [--limit 20] [--rate 40] [--artists 30]
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+from artist_db import ArtistDb  # noqa: E402
+from scheduler import RequestScheduler, ScheduledSpotify, priority, BACKGROUND  # noqa: E402
+from fake_spotify import FakeSpotify, artist_id_of  # noqa: E402
+from storage_backend import create_csv_db  # noqa: E402
+
+
+def main():
+    """
+    Run background ingestion and interactive request together and report scheduler metrics
+    """
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--limit', type=int, default=20, help='Fake client call per second limit')
+    parser.add_argument('--rate', type=float, default=40, help='Scheduler request per second')
+    parser.add_argument('--artists', type=int, default=30, help='Number of artist to ingest')
+    parser.add_argument('--workers', type=int, default=4, help='Number of background thread')
+    args = parser.parse_args()
+
+    sp = FakeSpotify(latency=0.005, rate_limit=args.limit)
+    scheduler = RequestScheduler(rate=args.rate, burst=int(args.rate))
+
+    failures = []
+    interactive_latency = []
+    background_done = threading.Event()
+
+    with tempfile.TemporaryDirectory() as directory:
+        db = ArtistDb(ScheduledSpotify(sp, scheduler), *create_csv_db(directory))
+
+        def background(worker):
+            with priority(BACKGROUND):
+                for index in range(worker, args.artists, args.workers):
+                    try:
+                        db.add_artist(artist_id_of(index))
+                    except Exception as error:  # noqa: BLE001
+                        failures.append(f'{artist_id_of(index)}: {error!r}')
+
+        def interactive():
+            index = 0
+            while not background_done.is_set():
+                start = time.perf_counter()
+                try:
+                    db.search(f'query {index}')
+                    db.get_selected_artist(artist_id_of(10_000 + index))
+                except Exception as error:  # noqa: BLE001
+                    failures.append(f'interactive: {error!r}')
+                interactive_latency.append(time.perf_counter() - start)
+                index += 1
+                time.sleep(0.2)
+
+        threads = [threading.Thread(target=background, args=(k,)) for k in range(args.workers)]
+        user = threading.Thread(target=interactive)
+
+        start = time.perf_counter()
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            user.start()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            background_done.set()
+            user.join()
+
+        elapsed = time.perf_counter() - start
+
+        for index in range(args.artists):
+            if not db.has_artist(artist_id_of(index)):
+                failures.append(f'{artist_id_of(index)} was not ingested')
+
+    metrics = scheduler.metrics()
+
+    print(json.dumps(metrics, indent=2))
+    print(f'{args.artists} artists in {elapsed:.2f}s, fake client throttled '
+          f"{sp.calls['throttled']} calls, {len(interactive_latency)} interactive selections, "
+          f'worst {max(interactive_latency, default=0):.2f}s')
+
+    if failures:
+        for failure in failures[:20]:
+            print('FAIL', failure)
+        sys.exit(f'{len(failures)} failures')
+
+    print('OK')
+
+
+if __name__ == '__main__':
+    main()
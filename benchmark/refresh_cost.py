@@ -0,0 +1,94 @@
+"""
+Measure network cost of refreshing artist through HTTP cache
+
+Artist is ingested through real spotipy.Spotify client against local stand-in server
+once with empty cache and once more with warm cache (stale, so every request is revalidated).
+
+Usage: python benchmark/refresh_cost.py [--artists 20] [--max-age 0]
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+import warnings
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+import spotipy  # noqa: E402
+from artist_db import ArtistDb  # noqa: E402
+from http_cache import CachingSession, DiskCacheStore  # noqa: E402
+from fake_spotify import FakeSpotify, artist_id_of  # noqa: E402
+from stand_in_server import StandInServer  # noqa: E402
+from storage_backend import create_csv_db  # noqa: E402
+
+
+def ingest(server, cache_dir, db_dir, artist_ids):
+    """
+    Ingest every artist into new database through caching session
+    :return: Dictionary of request count, byte count and elapsed time
+    """
+
+    session = CachingSession(DiskCacheStore(cache_dir))
+
+    sp = spotipy.Spotify(auth='stand-in', requests_session=session)
+    sp.prefix = server.prefix
+
+    db = ArtistDb(sp, *create_csv_db(db_dir))
+
+    before = dict(server.stats)
+    start = time.perf_counter()
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        for artist_id in artist_ids:
+            db.get_selected_artist(artist_id)
+
+    return {
+        'elapsed': time.perf_counter() - start,
+        'requests': server.stats['requests'] - before.get('requests', 0),
+        'not_modified': server.stats['not_modified'] - before.get('not_modified', 0),
+        'body_bytes': server.stats['body_bytes'] - before.get('body_bytes', 0),
+        **session.stats,
+    }
+
+
+def main():
+    """
+    Run cold and warm ingestion and print their cost
+    """
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--artists', type=int, default=20, help='Number of artist to ingest')
+    parser.add_argument('--max-age', type=int, default=0, help='Cache-Control max-age of server')
+    args = parser.parse_args()
+
+    warnings.simplefilter('ignore', DeprecationWarning)
+
+    artist_ids = [artist_id_of(index) for index in range(args.artists)]
+
+    server = StandInServer(FakeSpotify(), max_age=args.max_age)
+    server.start()
+
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            cache_dir = os.path.join(directory, 'cache')
+
+            os.mkdir(os.path.join(directory, 'cold'))
+            os.mkdir(os.path.join(directory, 'warm'))
+
+            cold = ingest(server, cache_dir, os.path.join(directory, 'cold'), artist_ids)
+            warm = ingest(server, cache_dir, os.path.join(directory, 'warm'), artist_ids)
+    finally:
+        server.stop()
+
+    for name, result in (('cold', cold), ('warm', warm)):
+        print(f"{name}: {result['requests']} requests, {result['not_modified']} not modified, "
+              f"{result['body_bytes']:,} body bytes, {result.get('hit', 0)} cache hits "
+              f"in {result['elapsed']:.2f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,341 @@
+"""
+Benchmark suite of More like this hot path
+
+Every benchmark run against a synthetic catalog and deterministic fake Spotify client
+with configurable latency. Tk benchmark (show_disco, show_data_analyze) need a display,
+they are skipped on headless machine unless run with xvfb-run.
+Result is written as json so two commit can be compared with benchmark/compare.py.
+
+Usage: python benchmark/run.py [--tracks 10000] [--latency 0.0] [--output result.json]
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+from artist_db import ArtistDb  # noqa: E402
+from fake_spotify import FakeSpotify, artist_id_of  # noqa: E402
+from synthetic_catalog import generate_catalog  # noqa: E402
+
+# Artist number of artist that is not in catalog, used for ingestion benchmark
+NEW_ARTIST = 10_000_000
+
+
+def measure(function, repeat, setup=None):
+    """
+    Run function repeatedly and return timing statistic
+    :param function: Function to measure, take result of setup as argument if setup is given
+    :param repeat: Number of run
+    :param setup: Function called before every run and not measured
+    :return: Dictionary of median, min, max and every run in second
+    """
+
+    runs = []
+
+    for run in range(repeat):
+        argument = setup(run) if setup else None
+
+        start = time.perf_counter()
+
+        if setup:
+            function(argument)
+        else:
+            function()
+
+        runs.append(time.perf_counter() - start)
+
+    return {
+        'median': statistics.median(runs),
+        'min': min(runs),
+        'max': max(runs),
+        'runs': runs,
+    }
+
+
+class Suite:
+    """
+    Benchmark of ArtistDb and Controller against synthetic catalog
+    """
+
+    def __init__(self, scratch_dir, paths, latency, repeat, selections):
+        """
+        :param scratch_dir: Directory to keep copy of artist manifest
+        :param paths: Artist csv file name, album and track directory of catalog
+        :param latency: Fake Spotify latency in second
+        :param repeat: Number of run of each benchmark
+        :param selections: Number of artist selected in selection benchmark
+        """
+
+        self.scratch_dir = scratch_dir
+        self.paths = paths
+        self.latency = latency
+        self.repeat = repeat
+        self.selections = selections
+
+    def sp(self):
+        """
+        Return new fake Spotify client
+        """
+        return FakeSpotify(latency=self.latency)
+
+    def open_db(self, artist_file_name=None):
+        """
+        Open database from catalog
+        :param artist_file_name: Use copy of artist manifest instead of catalog one
+        """
+        return ArtistDb(self.sp(), artist_file_name or self.paths[0], *self.paths[1:])
+
+    def manifest_copy(self, run):
+        """
+        Copy artist manifest so writing database doesn't change catalog
+        """
+
+        file_name = os.path.join(self.scratch_dir, f'artist_run{run}.csv')
+        shutil.copyfile(self.paths[0], file_name)
+
+        return file_name
+
+    def catalog_artists(self, db):
+        """
+        Return ID of artist to select, spread over the whole catalog
+        """
+
+        artist_ids = db.snapshot().artist['artist_id']
+        step = max(1, len(artist_ids) // self.selections)
+
+        return list(artist_ids[::step][:self.selections])
+
+    def new_artists(self, run, count):
+        """
+        Return ID of artist that is not in catalog, different in every run
+        """
+        start = NEW_ARTIST + run * count
+        return [artist_id_of(index) for index in range(start, start + count)]
+
+    def bench_init(self):
+        """
+        ArtistDb.__init__ loading
+        """
+        return measure(self.open_db, self.repeat)
+
+    def bench_add_artist(self):
+        """
+        ArtistDb.add_artist ingestion of 5 artist
+        """
+
+        def setup(run):
+            return self.open_db(self.manifest_copy(run)), self.new_artists(run, 5)
+
+        def add(argument):
+            db, artist_ids = argument
+            for artist_id in artist_ids:
+                db.add_artist(artist_id)
+
+        return measure(add, self.repeat, setup)
+
+    def bench_get_selected_artist_cold(self):
+        """
+        ArtistDb.get_selected_artist of artist whose partition is not loaded
+        """
+
+        def setup(_):
+            db = self.open_db()
+            return db, self.catalog_artists(db)
+
+        def select(argument):
+            db, artist_ids = argument
+            for artist_id in artist_ids:
+                db.get_selected_artist(artist_id)
+
+        return measure(select, self.repeat, setup)
+
+    def bench_get_selected_artist_warm(self):
+        """
+        ArtistDb.get_selected_artist of artist whose partition is already loaded
+        """
+
+        db = self.open_db()
+        artist_ids = self.catalog_artists(db)
+
+        def select():
+            for artist_id in artist_ids:
+                db.get_selected_artist(artist_id)
+
+        select()
+
+        return measure(select, self.repeat)
+
+    def bench_update_csv(self):
+        """
+        ArtistDb.update_csv after 5 artist got added
+        """
+
+        def setup(run):
+            db = self.open_db(self.manifest_copy(run))
+            for artist_id in self.new_artists(run + self.repeat, 5):
+                db.add_artist(artist_id)
+            return db
+
+        return measure(lambda db: db.update_csv(), self.repeat, setup)
+
+    def bench_controller(self):
+        """
+        Controller.show_disco and Controller.show_data_analyze with and without cached figure, need display
+        :return: Dictionary of result of every benchmark
+        """
+
+        from gui import GUI
+        from controller import Controller
+
+        # Controller load blank profile picture from relative path
+        os.chdir(REPO_DIR)
+
+        db = self.open_db()
+        artist_id = self.catalog_artists(db)[0]
+
+        ui = GUI()
+        ui.set_controller(Controller(ui, db))
+        ui.controller.selected_artist = db.get_selected_artist(artist_id)
+
+        def run(function):
+            def call(*_):
+                function()
+                ui.update()
+            return call
+
+        def uncached(_):
+            # Drop cached figure so every run render graph again
+            ui.controller.figure_cache.invalidate(artist_id)
+
+        try:
+            return {
+                'show_disco': measure(run(ui.controller.show_disco), self.repeat),
+                'show_data_analyze': measure(run(ui.controller.show_data_analyze), self.repeat, uncached),
+                'show_data_analyze_cached': measure(run(ui.controller.show_data_analyze), self.repeat),
+            }
+        finally:
+            ui.destroy()
+
+    def run(self, tk):
+        """
+        Run every benchmark
+        :param tk: Run Tk benchmark
+        :return: Dictionary of benchmark name and its result
+        """
+
+        results = {}
+
+        for name in (
+                'init',
+                'add_artist',
+                'get_selected_artist_cold',
+                'get_selected_artist_warm',
+                'update_csv',
+        ):
+            results[name] = getattr(self, f'bench_{name}')()
+            print(f"{name:<28}{results[name]['median'] * 1000:10.2f} ms", file=sys.stderr)
+
+        if tk:
+            for name, result in self.bench_controller().items():
+                results[name] = result
+                print(f"{name:<28}{result['median'] * 1000:10.2f} ms", file=sys.stderr)
+        else:
+            print('show_disco, show_data_analyze skipped, no display', file=sys.stderr)
+
+        return results
+
+
+def git_commit():
+    """
+    Return commit hash of working tree or None
+    """
+
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', 'HEAD'],
+            cwd=REPO_DIR,
+            capture_output=True,
+            text=True,
+            check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    """
+    Generate catalog, run suite and write result
+    """
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--tracks', type=int, default=10_000, help='Number of track in catalog')
+    parser.add_argument('--latency', type=float, default=0.0, help='Fake Spotify latency in second')
+    parser.add_argument('--repeat', type=int, default=5, help='Number of run of each benchmark')
+    parser.add_argument('--selections', type=int, default=20, help='Artist selected per run')
+    parser.add_argument('--catalog', help='Reuse catalog directory instead of generating one, '
+                             'partition of ingested artist is written into it')
+    parser.add_argument('--tk', choices=['auto', 'yes', 'no'], default='auto',
+                        help='Run Tk benchmark, auto run it when display is available')
+    parser.add_argument('--output', help='Write result as json to this file, stdout by default')
+    args = parser.parse_args()
+
+    if args.tk == 'auto':
+        tk = bool(os.environ.get('DISPLAY')) or not sys.platform.startswith('linux')
+    else:
+        tk = args.tk == 'yes'
+
+    with tempfile.TemporaryDirectory() as directory:
+
+        if args.catalog:
+            catalog_dir = args.catalog
+            paths = (
+                os.path.join(catalog_dir, 'artist.csv'),
+                os.path.join(catalog_dir, 'album'),
+                os.path.join(catalog_dir, 'track'),
+            )
+        else:
+            catalog_dir = directory
+            start = time.perf_counter()
+            paths = generate_catalog(catalog_dir, args.tracks)
+            print(f'catalog of {args.tracks} tracks generated in '
+                  f'{time.perf_counter() - start:.1f}s', file=sys.stderr)
+
+        suite = Suite(directory, paths, args.latency, args.repeat, args.selections)
+
+        # SelectedArtist print every selected artist
+        with contextlib.redirect_stdout(io.StringIO()):
+            results = suite.run(tk)
+
+    report = {
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'parameters': {
+            'tracks': args.tracks,
+            'latency': args.latency,
+            'repeat': args.repeat,
+            'selections': args.selections,
+        },
+        'results': results,
+    }
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump(report, file, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+
+
+if __name__ == '__main__':
+    main()
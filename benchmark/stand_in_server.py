@@ -0,0 +1,178 @@
+"""
+Local HTTP stand-in for Spotify Web API
+
+Serve FakeSpotify data on the same path as Spotify Web API so that real
+spotipy.Spotify client (or any HTTP client) can be pointed at it.
+Every response has ETag and Cache-Control header and If-None-Match is answered with 304.
+SpotifyException raised by fake client, such as 429 of rate limit, is sent as error response.
+
+Usage:
+    server = StandInServer(FakeSpotify(), max_age=0)
+    server.start()
+    sp = spotipy.Spotify(auth='stand-in')
+    sp.prefix = server.prefix
+"""
+import hashlib
+import json
+import re
+import threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+import spotipy
+
+# Path pattern and function that answer it from fake client and query parameter
+ROUTES = [
+    (re.compile(r'^/v1/search$'), lambda sp, query: sp.search(
+        query['q'],
+        limit=int(query.get('limit', 10)),
+        offset=int(query.get('offset', 0)),
+        type=query.get('type', 'artist'),
+        market=query.get('market')
+    )),
+    (re.compile(r'^/v1/artists/(\w+)$'), lambda sp, query, artist_id: sp.artist(artist_id)),
+    (re.compile(r'^/v1/artists/(\w+)/albums$'), lambda sp, query, artist_id: sp.artist_albums(
+        artist_id,
+        album_type=query.get('include_groups'),
+        country=query.get('country'),
+        limit=int(query.get('limit', 20)),
+        offset=int(query.get('offset', 0))
+    )),
+    (re.compile(r'^/v1/artists/(\w+)/top-tracks$'), lambda sp, query, artist_id: sp.artist_top_tracks(
+        artist_id,
+        country=query.get('country')
+    )),
+    (re.compile(r'^/v1/artists/(\w+)/related-artists$'),
+     lambda sp, query, artist_id: sp.artist_related_artists(artist_id)),
+    (re.compile(r'^/v1/albums/?$'), lambda sp, query: sp.albums(
+        query['ids'].split(','),
+        market=query.get('market')
+    )),
+    (re.compile(r'^/v1/tracks/?$'), lambda sp, query: sp.tracks(
+        query['ids'].split(','),
+        market=query.get('market')
+    )),
+]
+
+
+class StandInServer(ThreadingHTTPServer):
+    """
+    Threaded HTTP server that answer Spotify Web API request from fake client
+    """
+
+    daemon_threads = True
+
+    def __init__(self, sp, max_age: int = 0, port: int = 0):
+        """
+        :param sp: Fake Spotify object that generate response
+        :param max_age: Cache-Control max-age of every response in second
+        :param port: Port to listen on localhost, random free port by default
+        """
+
+        super().__init__(('127.0.0.1', port), StandInHandler)
+
+        self.sp = sp
+        self.max_age = max_age
+
+        # Number of request, 304 response and body byte sent
+        self.stats = Counter()
+        self._stats_lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def prefix(self) -> str:
+        """
+        URL prefix to use as spotipy.Spotify prefix
+        """
+        return f'http://127.0.0.1:{self.server_address[1]}/v1/'
+
+    def count(self, name, value=1):
+        """
+        Add value to statistic
+        """
+        with self._stats_lock:
+            self.stats[name] += value
+
+    def start(self):
+        """
+        Serve request on background thread
+        """
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """
+        Stop serving and close socket
+        """
+        self.shutdown()
+        self.server_close()
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """
+    Handle one request of stand-in server
+    """
+
+    server: StandInServer
+
+    def log_message(self, format, *args):
+        """
+        Keep benchmark output clean
+        """
+
+    def send_json(self, status, body: bytes, headers=()):
+        """
+        Send response with json body
+        """
+
+        self.send_response(status)
+
+        for name, value in headers:
+            self.send_header(name, value)
+
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+        self.server.count('body_bytes', len(body))
+
+    def do_GET(self):
+        """
+        Answer GET request from fake client
+        """
+
+        self.server.count('requests')
+
+        url = urlparse(self.path)
+        query = {name: values[-1] for name, values in parse_qs(url.query).items()}
+
+        for pattern, handler in ROUTES:
+            match = pattern.match(url.path)
+
+            if match:
+                break
+        else:
+            self.send_json(404, json.dumps({'error': {'status': 404, 'message': 'Not found'}}).encode())
+            return
+
+        try:
+            body = json.dumps(handler(self.server.sp, query, *match.groups())).encode()
+        except spotipy.SpotifyException as error:
+            self.server.count(f'status_{error.http_status}')
+            self.send_json(
+                error.http_status,
+                json.dumps({'error': {'status': error.http_status, 'message': error.msg}}).encode(),
+                list((error.headers or {}).items())
+            )
+            return
+        etag = f'"{hashlib.sha1(body).hexdigest()}"'
+
+        cache_headers = [('ETag', etag), ('Cache-Control', f'max-age={self.server.max_age}')]
+
+        if self.headers.get('If-None-Match') == etag:
+            self.server.count('not_modified')
+            self.send_json(304, b'', cache_headers)
+            return
+
+        self.send_json(200, body, cache_headers)
@@ -0,0 +1,113 @@
+"""
+Measure time to first window of More like this
+
+Each run start a fresh python process that build the GUI the same way as main.py
+and report time until the window got drawn and time until artist database is ready.
+Tk need a display, run with xvfb-run on headless machine.
+
+Usage: python benchmark/startup_time.py [--runs 10] [--output startup.json]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Code run in child process, print result as json
+PROBE = """
+import json
+import os
+import time
+start = time.perf_counter()
+
+# Wall clock is the only clock shared with parent process
+interpreter = time.time() - float(os.environ['MLT_LAUNCHED'])
+
+import main
+
+ui = main.build_ui()
+ui.update()
+first_window = time.perf_counter() - start
+
+while ui.controller is None:
+    ui.update()
+    time.sleep(0.001)
+ready = time.perf_counter() - start
+
+ui.destroy()
+print(json.dumps({
+    'first_window': first_window,
+    'ready': ready,
+    'interpreter': interpreter,
+    'first_window_total': interpreter + first_window,
+}))
+"""
+
+
+def run_once():
+    """
+    Start one child process and measure its startup
+    :return: Dictionary of measured time in second
+    """
+
+    # Client credentials are only checked when request is sent
+    env = dict(os.environ)
+    env.setdefault('SPOTIPY_CLIENT_ID', 'benchmark')
+    env.setdefault('SPOTIPY_CLIENT_SECRET', 'benchmark')
+
+    # Interpreter startup is measured in child from launch time, so process exit is not counted
+    env['MLT_LAUNCHED'] = repr(time.time())
+
+    output = subprocess.run(
+        [sys.executable, '-c', PROBE],
+        cwd=REPO_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True
+    ).stdout
+
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    """
+    Run startup measurement and print summary
+    """
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--runs', type=int, default=10, help='Number of process to start')
+    parser.add_argument('--output', help='Write result as json to this file')
+    args = parser.parse_args()
+
+    if sys.platform.startswith('linux') and not os.environ.get('DISPLAY'):
+        sys.exit('No display found, run with xvfb-run')
+
+    # First run warm up file system cache and .pyc file
+    run_once()
+    runs = [run_once() for _ in range(args.runs)]
+
+    summary = {
+        key: {
+            'median': statistics.median(run[key] for run in runs),
+            'min': min(run[key] for run in runs),
+            'max': max(run[key] for run in runs),
+        }
+        for key in runs[0]
+    }
+
+    for key, value in summary.items():
+        print(f"{key:<20} median {value['median'] * 1000:8.1f} ms  "
+              f"min {value['min'] * 1000:8.1f} ms  max {value['max'] * 1000:8.1f} ms")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump({'runs': runs, 'summary': summary}, file, indent=2)
+
+
+if __name__ == '__main__':
+    main()
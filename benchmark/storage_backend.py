@@ -0,0 +1,137 @@
+"""
+Compare csv and SQLite storage backend of ArtistDb on load, lookup and ingest
+
+Usage: python benchmark/storage_backend.py [--artists 200] [--output storage.json]
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+from artist_db import ArtistDb, ARTIST_COLUMNS  # noqa: E402
+from artist_sqlite_db import SqliteArtistDb  # noqa: E402
+from fake_spotify import FakeSpotify, artist_id_of  # noqa: E402
+
+
+def timed(function):
+    """
+    Run function and return its result with elapsed time
+    :param function: Function without argument
+    :return: Tuple of function result and elapsed second
+    """
+    start = time.perf_counter()
+    result = function()
+    return result, time.perf_counter() - start
+
+
+def create_csv_db(directory):
+    """
+    Create empty csv database in directory
+    :param directory: Directory to keep csv file
+    :return: Tuple of argument for ArtistDb constructor except Spotify object
+    """
+
+    artist_file_name = os.path.join(directory, 'artist.csv')
+
+    with open(artist_file_name, 'w', encoding='utf-8') as file:
+        file.write(','.join(ARTIST_COLUMNS) + '\n')
+
+    return artist_file_name, os.path.join(directory, 'album'), os.path.join(directory, 'track')
+
+
+def ingest(db, artist_ids):
+    """
+    Add every artist into database
+    """
+    for artist_id in artist_ids:
+        db.add_artist(artist_id)
+
+
+def lookup(db, artist_ids):
+    """
+    Get selected artist of every artist
+    """
+    for artist_id in artist_ids:
+        db.get_selected_artist(artist_id)
+
+
+def benchmark_csv(directory, sp, artist_ids):
+    """
+    Measure csv backend
+    :return: Dictionary of elapsed second of each operation
+    """
+
+    paths = create_csv_db(directory)
+
+    result = {}
+
+    db = ArtistDb(sp, *paths)
+    _, result['ingest'] = timed(lambda: ingest(db, artist_ids))
+    _, result['save'] = timed(db.update_csv)
+
+    db, result['load'] = timed(lambda: ArtistDb(sp, *paths))
+    _, result['lookup_cold'] = timed(lambda: lookup(db, artist_ids))
+    _, result['lookup_warm'] = timed(lambda: lookup(db, artist_ids))
+
+    return result, paths
+
+
+def benchmark_sqlite(directory, sp, artist_ids, csv_paths):
+    """
+    Measure SQLite backend
+    :return: Dictionary of elapsed second of each operation
+    """
+
+    result = {}
+
+    db_filename = os.path.join(directory, 'artist.db')
+
+    db = SqliteArtistDb(sp, db_filename)
+    _, result['ingest'] = timed(lambda: ingest(db, artist_ids))
+    _, result['save'] = timed(db.update_csv)
+
+    db, result['load'] = timed(lambda: SqliteArtistDb(sp, db_filename))
+    _, result['lookup_cold'] = timed(lambda: lookup(db, artist_ids))
+    _, result['lookup_warm'] = timed(lambda: lookup(db, artist_ids))
+
+    imported = SqliteArtistDb(sp, os.path.join(directory, 'imported.db'))
+    _, result['import_csv'] = timed(lambda: imported.import_csv(*csv_paths))
+
+    return result
+
+
+def main():
+    """
+    Run benchmark and print result
+    """
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--artists', type=int, default=200, help='Number of artist to ingest')
+    parser.add_argument('--output', help='Write result as json to this file')
+    args = parser.parse_args()
+
+    artist_ids = [artist_id_of(index) for index in range(args.artists)]
+
+    with tempfile.TemporaryDirectory() as directory:
+        csv_result, csv_paths = benchmark_csv(directory, FakeSpotify(), artist_ids)
+        sqlite_result = benchmark_sqlite(directory, FakeSpotify(), artist_ids, csv_paths)
+
+    result = {'artists': args.artists, 'csv': csv_result, 'sqlite': sqlite_result}
+
+    print(f"{'operation':<12}{'csv':>12}{'sqlite':>12}")
+    for operation in sqlite_result:
+        csv_time = f"{csv_result[operation] * 1000:10.1f}ms" if operation in csv_result else ''
+        print(f"{operation:<12}{csv_time:>12}{sqlite_result[operation] * 1000:10.1f}ms")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump(result, file, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,230 @@
+"""
+Stress test of concurrent ingestion into ArtistDb
+
+Several writer thread add overlapping set of artist while reader thread keep
+checking that every snapshot they see is consistent and saver thread keep
+writing database to disk. Csv backend is run again with memory budget, so partition
+keep getting evicted and reloaded while saving. Exit with non-zero status when any check failed.
+
+Usage: python benchmark/stress_ingest.py [--backend csv|sqlite] [--artists 100] [--writers 8] [--budget 60]
+"""
+import argparse
+import contextlib
+import io
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+from artist_db import ArtistDb  # noqa: E402
+from artist_sqlite_db import SqliteArtistDb  # noqa: E402
+from fake_spotify import FakeSpotify, artist_id_of  # noqa: E402
+from storage_backend import create_csv_db  # noqa: E402
+
+
+class StressTest:
+    """
+    Run writer, reader and saver thread against one database and collect failure
+    """
+
+    def __init__(self, open_db, sp: FakeSpotify, artist_ids, writers, readers):
+        """
+        :param open_db: Function that open database from disk
+        :param sp: Fake Spotify object
+        :param artist_ids: Artist to ingest
+        :param writers: Number of writer thread
+        :param readers: Number of reader thread
+        """
+
+        self.open_db = open_db
+        self.db = open_db()
+        self.artist_ids = artist_ids
+        self.writers = writers
+        self.readers = readers
+
+        self.expected_album = sp.albums_per_artist + sp.singles_per_artist
+        self.expected_track = sp.albums_per_artist * sp.tracks_per_album + sp.singles_per_artist
+
+        self.failures = []
+        self.reads = 0
+        self.saves = 0
+        self.done = threading.Event()
+
+    def fail(self, message):
+        """
+        Record failure
+        """
+        self.failures.append(message)
+
+    def check_selected(self, selected):
+        """
+        Check that selected artist has every album and track
+        """
+
+        if len(selected.album) != self.expected_album:
+            self.fail(f'{selected.id} has {len(selected.album)} album')
+
+        if len(selected.track) != self.expected_track:
+            self.fail(f'{selected.id} has {len(selected.track)} track')
+
+        if (selected.album['artist_id'] != selected.id).any():
+            self.fail(f'{selected.id} has album of other artist')
+
+    def check_snapshot(self, snapshot):
+        """
+        Check that every loaded partition belong to an artist in the same snapshot
+        """
+
+        artist_ids = snapshot.artist['artist_id']
+
+        if artist_ids.duplicated().any():
+            self.fail('Artist table has duplicated artist')
+
+        for artist_id in snapshot.album:
+            if artist_id not in artist_ids.values:
+                self.fail(f'Partition of {artist_id} is visible before artist')
+
+            if artist_id not in snapshot.track:
+                self.fail(f'Album of {artist_id} is visible without track')
+
+    def writer(self, seed):
+        """
+        Add every artist in random order
+        """
+
+        artist_ids = list(self.artist_ids)
+        random.Random(seed).shuffle(artist_ids)
+
+        for artist_id in artist_ids:
+            self.check_selected(self.db.get_selected_artist(artist_id))
+
+    def reader(self, seed):
+        """
+        Keep reading artist that is already in database until writer finish
+        """
+
+        rand = random.Random(seed)
+
+        while not self.done.is_set():
+
+            self.check_snapshot(self.db.snapshot())
+
+            artist_id = rand.choice(self.artist_ids)
+
+            if self.db.has_artist(artist_id):
+                self.check_selected(self.db.get_selected_artist(artist_id))
+                self.reads += 1
+
+    def saver(self):
+        """
+        Keep saving database until writer finish
+        """
+
+        while not self.done.is_set():
+            self.db.update_csv()
+            self.saves += 1
+            time.sleep(0.01)
+
+    def run(self):
+        """
+        Run every thread and check database that is read back from disk
+        """
+
+        writer_threads = [
+            threading.Thread(target=self.writer, args=(seed,)) for seed in range(self.writers)
+        ]
+        other_threads = [
+            threading.Thread(target=self.reader, args=(seed,)) for seed in range(self.readers)
+        ]
+        other_threads.append(threading.Thread(target=self.saver))
+
+        for thread in writer_threads + other_threads:
+            thread.start()
+
+        for thread in writer_threads:
+            thread.join()
+
+        self.done.set()
+
+        for thread in other_threads:
+            thread.join()
+
+        self.db.update_csv()
+
+        reloaded = self.open_db()
+
+        for artist_id in self.artist_ids:
+            if not reloaded.has_artist(artist_id):
+                self.fail(f'{artist_id} is missing after reload')
+            else:
+                self.check_selected(reloaded.get_selected_artist(artist_id))
+
+
+def main():
+    """
+    Run stress test and report result
+    """
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--backend', choices=['csv', 'sqlite'], default='csv')
+    parser.add_argument('--artists', type=int, default=100, help='Number of artist to ingest')
+    parser.add_argument('--writers', type=int, default=8, help='Number of writer thread')
+    parser.add_argument('--readers', type=int, default=4, help='Number of reader thread')
+    parser.add_argument('--latency', type=float, default=0.001, help='Fake Spotify latency')
+    parser.add_argument('--budget', type=float, default=60,
+                        help='Kilobyte of memory budget of second csv run, 0 to skip it')
+    args = parser.parse_args()
+
+    artist_ids = [artist_id_of(index) for index in range(args.artists)]
+    budgets = [None] + ([int(args.budget * 1000)] if args.backend == 'csv' and args.budget else [])
+    failures = 0
+
+    for budget in budgets:
+        sp = FakeSpotify(latency=args.latency)
+
+        with tempfile.TemporaryDirectory() as directory:
+
+            if args.backend == 'csv':
+                paths = create_csv_db(directory)
+
+                def open_db():
+                    return ArtistDb(sp, *paths, budget)
+            else:
+                def open_db():
+                    return SqliteArtistDb(sp, os.path.join(directory, 'artist.db'))
+
+            test = StressTest(open_db, sp, artist_ids, args.writers, args.readers)
+
+            start = time.perf_counter()
+
+            # SelectedArtist print every selected artist
+            with contextlib.redirect_stdout(io.StringIO()):
+                test.run()
+
+            elapsed = time.perf_counter() - start
+
+        working_set = test.db.memory_usage()['working_set']
+
+        print(f'{args.backend}' + (f' budget {budget} B' if budget else '') + f': {args.artists} artists, '
+              f'{args.writers} writers, {test.reads} reads, {test.saves} saves in {elapsed:.2f}s, '
+              f"{sp.calls['artist']} artist fetched, "
+              f"{working_set['evictions']} evictions, {working_set['reloads']} reloads")
+
+        for failure in test.failures[:20]:
+            print('FAIL', failure)
+
+        failures += len(test.failures)
+
+    if failures:
+        sys.exit(f'{failures} failures')
+
+    print('OK')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,132 @@
+"""
+Generate synthetic csv catalog in the same layout as csv/ directory
+
+Artist, album and track use the same ID scheme as FakeSpotify so catalog artist
+can also be fetched from fake client.
+
+Usage: python benchmark/synthetic_catalog.py DIRECTORY [--tracks 100000]
+"""
+import argparse
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+from artist_db import ARTIST_COLUMNS, partition_file_name  # noqa: E402
+from fake_spotify import FakeSpotify, artist_id_of  # noqa: E402
+
+
+def generate_catalog(
+        directory: str,
+        tracks: int,
+        albums_per_artist: int = 10,
+        tracks_per_album: int = 10,
+        seed: int = 0
+):
+    """
+    Write synthetic catalog into directory
+    :param directory: Directory to write artist.csv, album/ and track/ into
+    :param tracks: Total number of track in catalog
+    :param albums_per_artist: Number of album of each artist
+    :param tracks_per_album: Number of track in each album
+    :param seed: Seed of random popularity and duration
+    :return: Tuple of artist csv file name, album directory and track directory
+    """
+
+    rand = np.random.default_rng(seed)
+
+    tracks_per_artist = albums_per_artist * tracks_per_album
+    n_artist = max(1, -(-tracks // tracks_per_artist))
+
+    artist_ids = np.array([artist_id_of(index) for index in range(n_artist)])
+
+    artist = pd.DataFrame({
+        'artist_name': [f'Artist {artist_id}' for artist_id in artist_ids],
+        'artist_id': artist_ids,
+        'genres': [
+            str([FakeSpotify.GENRES[k % len(FakeSpotify.GENRES)]])
+            for k in rand.integers(0, len(FakeSpotify.GENRES), n_artist)
+        ],
+        'followers': rand.integers(0, 1_000_000, n_artist),
+        'popularity': rand.integers(0, 100, n_artist),
+        'img_url': [f'https://example.com/{artist_id}.jpg' for artist_id in artist_ids],
+        'external_url': [f'https://open.spotify.com/artist/{artist_id}' for artist_id in artist_ids],
+    }, columns=ARTIST_COLUMNS)
+
+    album_numbers = np.tile(np.arange(albums_per_artist), n_artist)
+    album_artist = np.repeat(artist_ids, albums_per_artist)
+    album_type = np.where(rand.random(len(album_artist)) < 0.7, 'album', 'single')
+
+    # Type letter in album ID is the same as FakeSpotify
+    album_ids = np.char.add(
+        np.char.add(album_artist.astype(str), np.where(album_type == 'album', 'a', 's')),
+        np.char.zfill(album_numbers.astype(str), 4)
+    )
+    years = rand.integers(1980, 2025, len(album_ids))
+
+    album = pd.DataFrame({
+        'artist_id': album_artist,
+        'external_url': np.char.add('https://open.spotify.com/album/', album_ids),
+        'img_url': np.char.add('https://example.com/', album_ids),
+        'album_name': np.char.add('Album ', album_ids),
+        'album_id': album_ids,
+        'release_date': [f'{year}-01-01' for year in years],
+        'release_date_precision': 'day',
+        'total_tracks': tracks_per_album,
+        'type': album_type,
+        'popularity': rand.integers(0, 100, len(album_ids)),
+    })
+
+    track_numbers = np.tile(np.arange(tracks_per_album), len(album_ids))
+    track_album = np.repeat(album_ids, tracks_per_album)
+    track_ids = np.char.add(
+        np.char.add(track_album.astype(str), 't'),
+        np.char.zfill(track_numbers.astype(str), 3)
+    )
+
+    track = pd.DataFrame({
+        'artist_id': np.repeat(album_artist, tracks_per_album),
+        'album_id': track_album,
+        'track_id': track_ids,
+        'track_name': np.char.add('Track ', track_ids),
+        'popularity': rand.integers(0, 100, len(track_ids)),
+        'duration_ms': rand.integers(120_000, 360_000, len(track_ids)),
+    })
+
+    artist_file_name = os.path.join(directory, 'artist.csv')
+    album_dir = os.path.join(directory, 'album')
+    track_dir = os.path.join(directory, 'track')
+
+    os.makedirs(album_dir, exist_ok=True)
+    os.makedirs(track_dir, exist_ok=True)
+
+    artist.to_csv(artist_file_name, index=False)
+
+    for table, partition_dir in ((album, album_dir), (track, track_dir)):
+        for artist_id, partition in table.groupby('artist_id', sort=False):
+            partition.to_csv(partition_file_name(partition_dir, artist_id), index=False)
+
+    return artist_file_name, album_dir, track_dir
+
+
+def main():
+    """
+    Generate catalog from command line
+    """
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('directory', help='Directory to write catalog into')
+    parser.add_argument('--tracks', type=int, default=100_000, help='Total number of track')
+    parser.add_argument('--albums-per-artist', type=int, default=10)
+    parser.add_argument('--tracks-per-album', type=int, default=10)
+    args = parser.parse_args()
+
+    generate_catalog(args.directory, args.tracks, args.albums_per_artist, args.tracks_per_album)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+"""
+Memory and selection latency of ArtistDb with and without memory budget
+
+Simulated session select artist from synthetic catalog, a few popular artist much more
+often than the rest, and add new artist from fake Spotify now and then. Without budget
+every selected partition stay in memory, with budget cold partition is evicted and read
+again from csv file when it get selected.
+
+Usage: python benchmark/working_set.py [--tracks 100000] [--selections 2000] [--budget 0.5]
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+from artist_db import ArtistDb  # noqa: E402
+from fake_spotify import FakeSpotify, artist_id_of  # noqa: E402
+from synthetic_catalog import generate_catalog  # noqa: E402
+
+
+def session(catalog, args, budget):
+    """
+    Run one selection session on catalog
+    :param catalog: Tuple of artist csv file name, album directory and track directory
+    :param budget: Byte of partition kept in memory, None for no limit
+    :return: Tuple of list of selection second, peak working set byte and memory usage of database
+    """
+
+    db = ArtistDb(FakeSpotify(latency=0), *catalog, budget)
+
+    n_artist = len(db.artist_table())
+    rand = np.random.default_rng(0)
+
+    # Zipf distributed selection, the first artist is the most popular
+    selections = np.minimum(rand.zipf(args.skew, args.selections), n_artist) - 1
+
+    latencies = []
+    peak = 0
+    added = 0
+
+    for step, index in enumerate(selections):
+
+        if args.add_every and step % args.add_every == 0:
+            db.add_artist(artist_id_of(n_artist + added))
+            added += 1
+
+        start = time.perf_counter()
+        db.get_selected_artist(artist_id_of(index))
+        latencies.append(time.perf_counter() - start)
+
+        peak = max(peak, db.working_set()['bytes'])
+
+    db.update_csv()
+
+    return latencies, peak, db.memory_usage()
+
+
+def main():
+    """
+    Run the same session with and without memory budget and print memory and latency
+    """
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--tracks', type=int, default=100_000, help='Total number of track in catalog')
+    parser.add_argument('--selections', type=int, default=2000)
+    parser.add_argument('--skew', type=float, default=1.3, help='Zipf exponent of artist selection')
+    parser.add_argument('--add-every', type=int, default=50, help='Add new artist every this many selection')
+    parser.add_argument('--budget', type=float, default=0.5, help='Megabyte of partition kept in memory')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        results = {}
+
+        for name, budget in (('no budget', None), (f'budget {args.budget} MB', int(args.budget * 1024 * 1024))):
+            run_dir = os.path.join(directory, name.replace(' ', '_'))
+            os.mkdir(run_dir)
+            catalog = generate_catalog(run_dir, args.tracks)
+
+            # SelectedArtist print every selected artist
+            with contextlib.redirect_stdout(io.StringIO()):
+                results[name] = session(catalog, args, budget)
+
+    for name, (latencies, peak, usage) in results.items():
+        latency_ms = np.array(latencies) * 1000
+        working_set = usage['working_set']
+
+        print(
+            f'{name}: {usage["partitions"]} partition loaded, peak {peak / 1024 / 1024:.1f} MB, '
+            f'{working_set["evictions"]} eviction, {working_set["reloads"]} reload, '
+            f'selection mean {latency_ms.mean():.2f} ms, p50 {np.percentile(latency_ms, 50):.2f} ms, '
+            f'p99 {np.percentile(latency_ms, 99):.2f} ms'
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,30 @@
+"""
+Remove duplicate artist, album and track rows from csv database
+
+Album is unique by album_id and artist_id, track by track_id and artist_id.
+The last row of each key is kept and every changed partition is written back.
+
+Usage: python compact.py [--artist-csv csv/artist.csv] [--album-dir csv/album] [--track-dir csv/track]
+"""
+import argparse
+from artist_db import ArtistDb
+
+
+def main():
+    """
+    Compact csv database from command line
+    """
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--artist-csv', default='csv/artist.csv')
+    parser.add_argument('--album-dir', default='csv/album')
+    parser.add_argument('--track-dir', default='csv/track')
+    args = parser.parse_args()
+
+    removed = ArtistDb(None, args.artist_csv, args.album_dir, args.track_dir).compact()
+
+    print(', '.join(f'{count} duplicate {table} rows removed' for table, count in removed.items()))
+
+
+if __name__ == '__main__':
+    main()
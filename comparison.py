@@ -0,0 +1,79 @@
+"""
+Statistics of many artist computed in one grouped pass over their tracks
+"""
+import numpy as np
+import pandas as pd
+
+# Number of bin of popularity histogram, same as histogram of single artist
+HISTOGRAM_BINS = 10
+
+
+def artist_statistics(artist: pd.DataFrame, album: pd.DataFrame, track: pd.DataFrame) -> pd.DataFrame:
+    """
+    Compute statistics shown for single artist for every artist at once
+    :param artist: Artist rows
+    :param album: Album rows of every artist
+    :param track: Track rows of every artist
+    :return: Dataframe indexed by artist_id in the same order as artist with column artist_name,
+    no_album, pop_track, mean, sd, median and corr
+    """
+
+    popularity = track['popularity'].astype('float64')
+    duration = track['duration_ms'].astype('float64')
+
+    grouped = popularity.groupby(track['artist_id'], sort=False)
+
+    # Correlation of popularity and duration from per artist sum
+    sums = pd.DataFrame({
+        'n': 1.0,
+        'x': popularity,
+        'y': duration,
+        'xx': popularity * popularity,
+        'yy': duration * duration,
+        'xy': popularity * duration,
+    }).groupby(track['artist_id'], sort=False).sum()
+
+    covariance = sums['xy'] - sums['x'] * sums['y'] / sums['n']
+    variance_x = sums['xx'] - sums['x'] ** 2 / sums['n']
+    variance_y = sums['yy'] - sums['y'] ** 2 / sums['n']
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        correlation = covariance / np.sqrt(variance_x * variance_y)
+
+    # Most popular track, first one when popularity is equal
+    pop_track = track.loc[grouped.idxmax(), ['artist_id', 'track_name']].set_index('artist_id')
+
+    statistics = pd.DataFrame({
+        'mean': grouped.mean(),
+        'sd': grouped.std(),
+        'median': grouped.median(),
+        'corr': correlation,
+        'pop_track': pop_track['track_name'],
+    })
+
+    statistics['no_album'] = album.groupby('artist_id', sort=False).size()
+
+    result = artist.set_index('artist_id')[['artist_name']].join(statistics)
+    result['no_album'] = result['no_album'].fillna(0).astype(int)
+
+    return result[['artist_name', 'no_album', 'pop_track', 'mean', 'sd', 'median', 'corr']]
+
+
+def popularity_histograms(track: pd.DataFrame, artist_ids: list, bins: int = HISTOGRAM_BINS) -> np.ndarray:
+    """
+    Count track popularity of every artist into bins over 0 - 100
+    :param track: Track rows of every artist
+    :param artist_ids: Artist ID in order of histogram row
+    :param bins: Number of bin
+    :return: Array of shape (number of artist, bins)
+    """
+
+    rows = pd.Categorical(track['artist_id'], categories=artist_ids).codes.astype(np.int64)
+    columns = np.minimum(track['popularity'].to_numpy(dtype=np.int64) * bins // 100, bins - 1)
+
+    known = rows >= 0
+
+    return np.bincount(
+        rows[known] * bins + columns[known],
+        minlength=len(artist_ids) * bins
+    ).reshape(len(artist_ids), bins)
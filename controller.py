@@ -8,6 +8,12 @@ import io
 import pandas as pd
 from PIL import ImageTk, Image
 from artist_db import ArtistDb
+from tracing import current_span, span, traced
+import memory_report
+from figure_cache import FigureCache
+from prefetch import Prefetcher
+from scheduler import BudgetExceeded
+from comparison import artist_statistics, popularity_histograms
 
 
 class Controller:
@@ -26,6 +32,15 @@ class Controller:
 
         self.ui.info.pic['image'] = self.showing_image
 
+        # Rendered figure of recently shown artist, dropped when artist rows change
+        self.figure_cache = FigureCache()
+        self.model.add_commit_listener(self.figure_cache.invalidate)
+
+        # Related artist of shown artist is added in background when MLT_PREFETCH is set
+        self.prefetcher = Prefetcher.from_environment(model)
+        self.related_ids = []
+
+    @traced('search')
     def search(self, query: str):
         """
         Send search request to database
@@ -38,6 +53,8 @@ class Controller:
 
         result = self.model.search(query)
 
+        current_span().set(results=len(result))
+
         # Clear recent result
         self.ui.search.clear_result()
 
@@ -49,17 +66,59 @@ class Controller:
                 values=(result[index][0], ", ".join(result[index][1]), result[index][2])
             )
 
+    @traced('select_artist')
     def select_artist(self, artist_id):
         """
         Handle selected artist
         :param artist_id: spotify artist id
         """
 
-        self.selected_artist = self.model.get_selected_artist(artist_id)
+        # Previous prefetch should not compete with this selection
+        if self.prefetcher:
+            self.prefetcher.selected(artist_id)
+
+        try:
+            self.selected_artist = self.model.get_selected_artist(artist_id)
+        except BudgetExceeded:
+            # Lookup shared with cancelled prefetch failed, fetch again on its own
+            self.selected_artist = self.model.get_selected_artist(artist_id)
 
         self.show_info()
         self.show_data_analyze()
 
+        if self.prefetcher:
+            self.prefetcher.prefetch(self.related_ids)
+
+        # Allocation that grow since previous selection
+        if memory_report.growth:
+            print('\n'.join(memory_report.growth.record(artist_id)))
+
+    @traced('comparison_data')
+    def comparison_data(self, artist_ids: list) -> dict:
+        """
+        Compute statistics and popularity histogram of many artist
+        :param artist_ids: List of Spotify artist ID
+        :return: Dictionary of statistics dataframe and histogram array in the same artist order
+        """
+
+        artist, album, track = self.model.get_artists(artist_ids)
+
+        statistics = artist_statistics(artist, album, track)
+
+        return {
+            'statistics': statistics,
+            'histograms': popularity_histograms(track, list(statistics.index)),
+        }
+
+    @traced('show_comparison')
+    def show_comparison(self, data: dict):
+        """
+        Show comparison window of many artist
+        :param data: Dictionary from comparison_data
+        """
+        self.ui.show_comparison(data['statistics'], data['histograms'])
+
+    @traced('show_info')
     def show_info(self):
         """
         Show artist information
@@ -91,6 +150,7 @@ class Controller:
         self.show_disco()
         self.show_relate_artist()
 
+    @traced('show_disco')
     def show_disco(self):
         """
         Show selected artist discography
@@ -104,6 +164,8 @@ class Controller:
 
         self.ui.info.album.tag_configure('track', background='light grey')
 
+        inserted = 0
+
         # Load every album into treeview
         for i in range(len(all_album)):
             album_iid = self.ui.info.album.insert(
@@ -114,6 +176,7 @@ class Controller:
                     all_album.iloc[i]['album_id']
                 ]
             )
+            inserted += 1
 
             # Get every track in album
             track_in_album = self.selected_artist.track.loc[
@@ -131,7 +194,11 @@ class Controller:
                     ],
                     tags=('track',)
                 )
+                inserted += 1
 
+        current_span().set(albums=len(all_album), inserted=inserted)
+
+    @traced('show_relate_artist')
     def show_relate_artist(self):
         """
         Show selected artist's related artist
@@ -139,6 +206,9 @@ class Controller:
 
         # Get all related artist
         related = self.model.get_related_artist(self.selected_artist.id)
+        self.related_ids = [artist[2] for artist in related]
+
+        current_span().set(inserted=len(related))
 
         # Clear related artist treeview
         self.ui.search.clear_relate()
@@ -151,6 +221,7 @@ class Controller:
                 values=(related[index][0], ", ".join(related[index][1]), related[index][2])
             )
 
+    @traced('get_img')
     def get_img(self, url):
 
         """
@@ -165,67 +236,157 @@ class Controller:
         with urllib.request.urlopen(url) as u:
             raw_data = u.read()
 
+        current_span().set(bytes=len(raw_data))
+
         image = Image.open(io.BytesIO(raw_data))
         image = image.resize((300, 300))
         photo = ImageTk.PhotoImage(image)
 
         return photo
 
+    @traced('show_data_analyze')
     def show_data_analyze(self):
         """
         Show statistics about artist track
+        Plot data and rendered figure of recently shown artist is cached,
+        showing that artist again only copy the cached bitmap onto canvas.
         """
 
         if not self.selected_artist:
             return
 
+        artist_id = self.selected_artist.id
+        version = self.model.data_version(artist_id)
+        canvas = self.ui.data.canvas
+
+        cached = self.figure_cache.get(artist_id, version)
+        data = cached['data'] if cached else self.plot_data()
+
         # Clear all graph
         self.clear_graph()
 
         # Show popularity statistics
-        self.add_statistics()
+        self.add_statistics(data)
 
         # Show every graph
-        self.histogram()
-        self.scatter()
-        self.bar_graph()
-        self.pie_chart()
+        self.histogram(data)
+        self.scatter(data)
+        self.bar_graph(data)
+        self.pie_chart(data)
+
+        size = canvas.get_width_height()
+
+        # Bitmap can only be reused when canvas still has the same size
+        if cached and cached['size'] == size:
+            with span('blit'):
+                canvas.restore_region(cached['bitmap'])
+                canvas.blit(canvas.figure.bbox)
+            return
+
+        with span('draw'):
+            canvas.draw()
 
-        self.ui.data.canvas.draw()
+        self.figure_cache.put(artist_id, version, {
+            'data': data,
+            'size': size,
+            'bitmap': canvas.copy_from_bbox(canvas.figure.bbox),
+            'bitmap_bytes': size[0] * size[1] * 4,
+        })
 
-    def add_statistics(self):
+    @traced('plot_data')
+    def plot_data(self) -> dict:
         """
-        Show artist track statistics
+        Compute every value shown in statistics and graph of selected artist
+        :return: Dictionary of statistics and data of each graph
         """
 
+        track = self.selected_artist.track
+        album = self.selected_artist.album
+
+        data = {
+            'pop_track': None,
+            'no_album': len(album),
+            'mean': track['popularity'].mean(),
+            'sd': track['popularity'].std(),
+            'median': track['popularity'].median(),
+            'corr': track.loc[:, ['popularity', 'duration_ms']].corr().loc['popularity', 'duration_ms'],
+            'track_pop': track['popularity'].to_numpy(),
+            'track_duration': track['duration_ms'].to_numpy() / 1000,
+        }
+
         # Get most popular track
-        if len(self.selected_artist.album) > 0:
-            self.ui.data.add_pop_track(
-                self.selected_artist.track.sort_values(
-                    'popularity', ascending=False
-                ).iloc[0, 3]
-            )
+        if len(album) > 0:
+            data['pop_track'] = track.sort_values('popularity', ascending=False).iloc[0, 3]
 
-        # Add each statistics value
-        self.ui.data.add_no_album(len(self.selected_artist.album))
-        self.ui.data.add_mean(self.selected_artist.track['popularity'].mean())
-        self.ui.data.add_sd(self.selected_artist.track['popularity'].std())
-        self.ui.data.add_median(self.selected_artist.track['popularity'].median())
+        release_date_sorted = album.sort_values('release_date')
+        data['album_name'] = release_date_sorted['album_name'].to_numpy()
+        data['album_pop'] = release_date_sorted['popularity'].to_numpy()
 
-        self.ui.data.add_corr(
-            self.selected_artist.track.loc[:, ['popularity', 'duration_ms']].corr().loc['popularity', 'duration_ms']
-        )
+        data['pie'] = self.top_track_ratio()
+
+        return data
 
-    def histogram(self):
+    def top_track_ratio(self):
         """
-        Show histogram of track popularity distribution
+        Count artist top tracks from each album
+        :return: Tuple of list of count and list of album name or None when there is no top track
+        """
+
+        album_list = self.selected_artist.album.copy().set_index('album_id')['album_name']
+
+        top_tracks = self.model.get_top_tracks(self.selected_artist.id) or []
+
+        try:
+            top_tracks_album_count = \
+                pd.DataFrame([track['album'] for track in top_tracks])\
+                .groupby('id').count()\
+
+        except KeyError:
+            return None
+
+        # Oliver messiaen <-- test case
+
+        # Kept as list so album that is not in discography stay None instead of NaN
+        album_names = [
+            album_list.loc[album_id]
+            if album_id in album_list
+            else None
+            for album_id
+            in top_tracks_album_count.index
+
+        ]
+
+        top_tracks_album_count.rename(columns={'album_type': 'count'}, inplace=True)
+
+        return list(top_tracks_album_count['count']), album_names
+
+    @traced('add_statistics')
+    def add_statistics(self, data: dict):
+        """
+        Show artist track statistics
+        :param data: Plot data from plot_data
         """
 
-        track_pop = self.selected_artist.track['popularity']
+        if data['pop_track'] is not None:
+            self.ui.data.add_pop_track(data['pop_track'])
+
+        # Add each statistics value
+        self.ui.data.add_no_album(data['no_album'])
+        self.ui.data.add_mean(data['mean'])
+        self.ui.data.add_sd(data['sd'])
+        self.ui.data.add_median(data['median'])
+        self.ui.data.add_corr(data['corr'])
+
+    @traced('histogram')
+    def histogram(self, data: dict):
+        """
+        Show histogram of track popularity distribution
+        :param data: Plot data from plot_data
+        """
 
         ax = self.ui.data.ax1
         ax.hist(
-            track_pop,
+            data['track_pop'],
             range=(0, 100),
         )
 
@@ -233,74 +394,55 @@ class Controller:
         ax.set_ylabel('Frequency')
         ax.set_xlabel('Popularity(1 - 100)')
 
-    def scatter(self):
+    @traced('scatter')
+    def scatter(self, data: dict):
         """
         Show scatter chart of correlation between track popularity and track duration
+        :param data: Plot data from plot_data
         """
 
-        track_pop = self.selected_artist.track['popularity']
-        track_duration = self.selected_artist.track['duration_ms']
-
         ax = self.ui.data.ax2
         ax.scatter(
-            x=track_pop,
-            y=track_duration/1000
+            x=data['track_pop'],
+            y=data['track_duration']
         )
 
         ax.set_title("tracks popularity and\nduration correlation")
         ax.set_ylabel('Track duration (second)')
         ax.set_xlabel('Popularity(1 - 100)')
 
-    def bar_graph(self):
+    @traced('bar_graph')
+    def bar_graph(self, data: dict):
         """
         Show bar chart of each album popularity
+        :param data: Plot data from plot_data
         """
 
-        release_date_sorted = self.selected_artist.album.sort_values('release_date')
-
         ax = self.ui.data.ax3
         ax.bar(
-            x=release_date_sorted['album_name'],
-            height=release_date_sorted['popularity']
+            x=data['album_name'],
+            height=data['album_pop']
         )
         ax.tick_params(axis='x', labelrotation=90)
 
         ax.set_title('Discography populartiy \nsort by release date')
 
-    def pie_chart(self):
+    @traced('pie_chart')
+    def pie_chart(self, data: dict):
         """
         Show pie chart of ratio of top track from each album
+        :param data: Plot data from plot_data
         """
 
-        album_list = self.selected_artist.album.copy().set_index('album_id')['album_name']
-
-        top_tracks = self.model.get_top_tracks(self.selected_artist.id)
-
-        try:
-            top_tracks_album_count = \
-                pd.DataFrame([track['album'] for track in top_tracks])\
-                .groupby('id').count()\
-
-        except KeyError:
+        if data['pie'] is None:
             return
 
-        # Oliver messiaen <-- test case
-
-        top_tracks_album_count['album_name'] = [
-            album_list.loc[album_id]
-            if album_id in album_list
-            else None
-            for album_id
-            in top_tracks_album_count.index
-
-        ]
-
-        top_tracks_album_count.rename(columns={'album_type': 'count'}, inplace=True)
+        counts, album_names = data['pie']
 
         ax = self.ui.data.ax4
 
         ax.pie(
-            top_tracks_album_count['count'],
+            counts,
             autopct=lambda pct: int(pct/10),
             # labels=top_tracks_album_count['album_name']
         )
@@ -311,7 +453,7 @@ class Controller:
             )
             if album
             else None
-            for album in top_tracks_album_count['album_name']
+            for album in album_names
         ]
         # "\n".join(wrap(album,20))
         ax.legend(
@@ -0,0 +1,215 @@
+"""
+Streaming export of artist discography to JSON Lines or Arrow IPC stream
+
+Track rows are joined with their album and artist a few artist at a time and yielded in
+chunk of bounded size, so memory use does not grow with catalog size and output can be
+piped into other tool. Arrow export need pyarrow, which is optional.
+
+Usage: python export.py [--format jsonl|arrow] [--artist ID ...] [--output FILE]
+"""
+import argparse
+import sys
+import pandas as pd
+from artist_db import ArtistDb, parse_genres
+
+# Column of exported row, one row per track
+EXPORT_COLUMNS = [
+    'artist_id',
+    'artist_name',
+    'genres',
+    'followers',
+    'artist_popularity',
+    'album_id',
+    'album_name',
+    'release_date',
+    'type',
+    'total_tracks',
+    'album_popularity',
+    'track_id',
+    'track_name',
+    'popularity',
+    'duration_ms',
+]
+
+
+def join_artists(artist: pd.DataFrame, album: pd.DataFrame, track: pd.DataFrame) -> pd.DataFrame:
+    """
+    Join track rows with their album and artist
+    :param artist: Artist rows
+    :param album: Album rows of the same artist
+    :param track: Track rows of the same artist
+    :return: Dataframe of EXPORT_COLUMNS
+    """
+
+    artist = artist[['artist_id', 'artist_name', 'genres', 'followers', 'popularity']].rename(
+        columns={'popularity': 'artist_popularity'}
+    )
+    artist = artist.assign(genres=artist['genres'].map(parse_genres))
+
+    album = album[[
+        'artist_id', 'album_id', 'album_name', 'release_date', 'type', 'total_tracks', 'popularity'
+    ]].rename(columns={'popularity': 'album_popularity'})
+
+    joined = track.merge(album, on=['artist_id', 'album_id'], how='left')\
+        .merge(artist, on='artist_id', how='left')
+
+    return joined[EXPORT_COLUMNS]
+
+
+def iter_chunks(db: ArtistDb, artist_ids=None, chunk_rows: int = 10_000, artists_per_read: int = 50):
+    """
+    Yield joined track rows of artist in chunk
+    Partition is read straight from storage and is not kept by database.
+    :param db: ArtistDb or SqliteArtistDb object
+    :param artist_ids: List of Spotify artist ID to export, every artist when None
+    :param chunk_rows: Maximum number of row in a chunk
+    :param artists_per_read: Number of artist read from storage at a time
+    :return: Generator of dataframe of EXPORT_COLUMNS
+    """
+
+    artist_table = db.artist_table()
+
+    if artist_ids is not None:
+        artist_table = artist_table.loc[artist_table['artist_id'].isin(artist_ids)]
+
+    album_map, track_map = db.in_memory_partitions()
+    loader = db.partition_loader()
+
+    ids = list(artist_table['artist_id'])
+    pending = []
+    pending_rows = 0
+
+    for start in range(0, len(ids), artists_per_read):
+        batch = ids[start:start + artists_per_read]
+
+        # Partition in memory may not be saved yet
+        in_memory = [artist_id for artist_id in batch if artist_id in album_map]
+        on_disk = [artist_id for artist_id in batch if artist_id not in album_map]
+
+        albums = [album_map[artist_id] for artist_id in in_memory]
+        tracks = [track_map[artist_id] for artist_id in in_memory]
+
+        if on_disk:
+            album, track = loader.load(on_disk)
+            albums.append(album)
+            tracks.append(track)
+
+        joined = join_artists(
+            artist_table.loc[artist_table['artist_id'].isin(batch)],
+            pd.concat(albums, ignore_index=True),
+            pd.concat(tracks, ignore_index=True)
+        )
+
+        pending.append(joined)
+        pending_rows += len(joined)
+
+        while pending_rows >= chunk_rows:
+            rows = pd.concat(pending, ignore_index=True)
+            yield rows.iloc[:chunk_rows]
+            pending = [rows.iloc[chunk_rows:]]
+            pending_rows -= chunk_rows
+
+    if pending_rows:
+        yield pd.concat(pending, ignore_index=True)
+
+
+def write_jsonl(chunks, file) -> int:
+    """
+    Write chunk as JSON Lines, one track per line
+    :param chunks: Iterable of dataframe
+    :param file: Text file object
+    :return: Number of row written
+    """
+
+    rows = 0
+
+    for chunk in chunks:
+        file.write(chunk.to_json(orient='records', lines=True, force_ascii=False))
+        rows += len(chunk)
+
+    return rows
+
+
+def write_arrow(chunks, sink) -> int:
+    """
+    Write chunk as Arrow IPC stream
+    :param chunks: Iterable of dataframe
+    :param sink: Binary file object
+    :return: Number of row written
+    """
+
+    try:
+        import pyarrow as pa
+    except ImportError as error:
+        raise ImportError('Arrow export need pyarrow, install it with pip install pyarrow') from error
+
+    schema = pa.schema([
+        ('artist_id', pa.string()),
+        ('artist_name', pa.string()),
+        ('genres', pa.list_(pa.string())),
+        ('followers', pa.int64()),
+        ('artist_popularity', pa.int8()),
+        ('album_id', pa.string()),
+        ('album_name', pa.string()),
+        ('release_date', pa.string()),
+        ('type', pa.string()),
+        ('total_tracks', pa.int16()),
+        ('album_popularity', pa.int8()),
+        ('track_id', pa.string()),
+        ('track_name', pa.string()),
+        ('popularity', pa.int8()),
+        ('duration_ms', pa.int32()),
+    ])
+
+    rows = 0
+
+    with pa.ipc.new_stream(sink, schema) as writer:
+        for chunk in chunks:
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+            rows += len(chunk)
+
+    return rows
+
+
+def main():
+    """
+    Export csv or SQLite database from command line
+    """
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--format', choices=['jsonl', 'arrow'], default='jsonl')
+    parser.add_argument('--artist', nargs='*', help='Artist ID to export, whole catalog by default')
+    parser.add_argument('--output', default='-', help='Output file, stdout by default')
+    parser.add_argument('--chunk-rows', type=int, default=10_000)
+    parser.add_argument('--sqlite', help='Export SQLite database file instead of csv database')
+    parser.add_argument('--artist-csv', default='csv/artist.csv')
+    parser.add_argument('--album-dir', default='csv/album')
+    parser.add_argument('--track-dir', default='csv/track')
+    args = parser.parse_args()
+
+    if args.sqlite:
+        from artist_sqlite_db import SqliteArtistDb
+        db = SqliteArtistDb(None, args.sqlite)
+    else:
+        db = ArtistDb(None, args.artist_csv, args.album_dir, args.track_dir)
+
+    chunks = iter_chunks(db, args.artist, args.chunk_rows)
+
+    if args.format == 'jsonl':
+        if args.output == '-':
+            rows = write_jsonl(chunks, sys.stdout)
+        else:
+            with open(args.output, 'w', encoding='utf-8') as file:
+                rows = write_jsonl(chunks, file)
+    else:
+        if args.output == '-':
+            rows = write_arrow(chunks, sys.stdout.buffer)
+        else:
+            with open(args.output, 'wb') as file:
+                rows = write_arrow(chunks, file)
+
+    print(f'{rows} tracks exported', file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""
+Bounded cache of rendered data analysis figure of recently shown artist
+"""
+import threading
+from collections import OrderedDict
+
+
+class FigureCache:
+    """
+    Least recently used cache of plot data and rendered bitmap keyed by artist ID and data version
+    """
+
+    def __init__(self, capacity: int = 8):
+        """
+        :param capacity: Maximum number of artist kept
+        """
+
+        self.capacity = capacity
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, artist_id: str, version: int):
+        """
+        Return cached entry of artist if it was made from the same data version
+        :param artist_id: Spotify artist ID
+        :param version: Data version of artist rows
+        :return: Cached entry or None
+        """
+
+        with self._lock:
+            cached = self._entries.get(artist_id)
+
+            if cached is None or cached[0] != version:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(artist_id)
+            self.hits += 1
+
+            return cached[1]
+
+    def put(self, artist_id: str, version: int, entry: dict):
+        """
+        Keep entry of artist, least recently used artist is dropped when cache is full
+        :param artist_id: Spotify artist ID
+        :param version: Data version of artist rows that entry was made from
+        :param entry: Dictionary of plot data and rendered bitmap
+        """
+
+        with self._lock:
+            self._entries[artist_id] = (version, entry)
+            self._entries.move_to_end(artist_id)
+
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, artist_id: str):
+        """
+        Drop entry of artist whose rows got changed
+        :param artist_id: Spotify artist ID
+        """
+
+        with self._lock:
+            self._entries.pop(artist_id, None)
+
+    def bitmap_bytes(self) -> int:
+        """
+        Return total size of every cached bitmap
+        """
+
+        with self._lock:
+            return sum(entry.get('bitmap_bytes', 0) for _, entry in self._entries.values())
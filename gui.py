@@ -3,14 +3,14 @@ View part of MVC design pattern
 Take responsibility about rendering GUI
 """
 import tkinter as tk
-from tkinter import ttk
+from tkinter import messagebox, ttk
 from threading import Thread
-import matplotlib
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-from matplotlib.figure import Figure
-from controller import Controller
+from typing import TYPE_CHECKING
+import tracing
 
-matplotlib.use("TkAgg")
+# matplotlib, pandas and Pillow are imported on first use so window can show up immediately
+if TYPE_CHECKING:
+    from controller import Controller
 
 
 class GUI(tk.Tk):
@@ -29,6 +29,9 @@ class GUI(tk.Tk):
             mode='indeterminate',
         )
 
+        # Stage timing of the latest selection, only shown when tracing overlay is on
+        self.trace_status = tk.Label(self, anchor='w', font=('Courier', 9)) if tracing.OVERLAY else None
+
         self.init_component()
 
     def set_controller(self, controller: 'Controller'):
@@ -38,6 +41,62 @@ class GUI(tk.Tk):
         """
         self.controller = controller
 
+        self.data.init_graph()
+        self.search.enable_search_button()
+        self.search.compare_button['state'] = tk.NORMAL
+
+    def load_model(self, loader):
+        """
+        Load model on background thread while window is already showing
+        then create controller when model is ready
+        Error while loading is shown in message box, then window is closed and error is raised again.
+        :param loader: Function that return model object
+        """
+
+        loaded = {}
+
+        def load():
+            try:
+                loaded['model'] = loader()
+            except Exception as error:  # noqa: BLE001, error is shown and raised on Tk thread
+                loaded['error'] = error
+                return
+
+            # Import library that controller and graph need while still in background
+            import controller
+            import matplotlib.backends.backend_tkagg
+
+        def thread_check(running_thread: Thread):
+
+            """
+            Checking that is thread is still running if not create controller
+            """
+
+            if running_thread.is_alive():
+                self.after(10, lambda: thread_check(running_thread))
+                return
+
+            self.finish_progress()
+
+            if 'error' in loaded:
+                error = loaded['error']
+                messagebox.showerror('Cannot load artist database', f'{type(error).__name__}: {error}')
+                self.destroy()
+                raise error
+
+            if 'model' not in loaded:
+                return
+
+            from controller import Controller
+            self.set_controller(Controller(self, loaded['model']))
+
+        self.show_progress()
+
+        thread = Thread(target=load, daemon=True)
+        thread.start()
+
+        thread_check(thread)
+
     def init_component(self):
         """Arrange component"""
 
@@ -52,6 +111,7 @@ class GUI(tk.Tk):
         self.search.search_button.bind('<Button-1>', self.search_handler)
         self.search.detail_button.bind('<Button-1>', self.artist_selected)
         self.search.detail_button2.bind('<Button-1>', self.artist_selected)
+        self.search.compare_button.bind('<Button-1>', self.compare_selected)
 
         self.search.entry.bind('<Return>', self.search_handler)
 
@@ -65,6 +125,9 @@ class GUI(tk.Tk):
         self.data.grid(row=0, column=2, rowspan=3, sticky='news')
         self.grid_columnconfigure(2, weight=2)
 
+        if self.trace_status:
+            self.trace_status.grid(row=3, column=0, columnspan=3, sticky='news')
+
     def show_progress(self):
         """Start progress bar"""
         self.progress.grid(row=2, column=0, columnspan=2, sticky='news')
@@ -78,12 +141,28 @@ class GUI(tk.Tk):
         self.progress.grid_forget()
         self.progress.stop()
 
+    def show_trace_summary(self):
+        """
+        Show stage timing of the latest artist selection in status bar
+        """
+
+        if not self.trace_status:
+            return
+
+        summary = tracing.tracer.summary('select_artist')
+
+        if summary:
+            self.trace_status['text'] = tracing.format_summary(summary)
+
     def search_handler(self, *args):
         """
         Event handler when search button got press
         :param args:
         :return:
         """
+        if self.controller is None:
+            return
+
         self.controller.search(self.search.query.get())
 
     def artist_selected(self, event, *args):
@@ -101,6 +180,10 @@ class GUI(tk.Tk):
                 self.after(10, lambda: thread_check(thread))
             else:
                 self.finish_progress()
+                self.show_trace_summary()
+
+        if self.controller is None:
+            return
 
         # Disabled both button
         self.search.disable_detail_button()
@@ -131,6 +214,62 @@ class GUI(tk.Tk):
         thread_check(thread)
         self.search.enable_detail_button()
 
+    def compare_selected(self, *args):
+        """
+        Event handler when compare button got press
+        Compare every artist selected in both search result and related artist
+        """
+
+        if self.controller is None:
+            return
+
+        artist_ids = []
+
+        for tree in (self.search.result, self.search.relate):
+            for item in tree.selection():
+                artist_id = tree.item(item)['values'][2]
+
+                if artist_id not in artist_ids:
+                    artist_ids.append(artist_id)
+
+        if len(artist_ids) < 2:
+            return
+
+        computed = {}
+
+        def compute():
+            computed['data'] = self.controller.comparison_data(artist_ids)
+
+        def thread_check(running_thread: Thread):
+
+            """
+            Checking that is thread is still running if not show comparison window
+            """
+
+            if running_thread.is_alive():
+                self.after(10, lambda: thread_check(running_thread))
+                return
+
+            self.finish_progress()
+
+            if 'data' in computed:
+                self.controller.show_comparison(computed['data'])
+
+        self.show_progress()
+
+        thread = Thread(target=compute, daemon=True)
+        thread.start()
+
+        thread_check(thread)
+
+    def show_comparison(self, statistics, histograms):
+        """
+        Open window that compare many artist
+        :param statistics: Dataframe of statistics of each artist
+        :param histograms: Popularity histogram of each artist
+        """
+        ComparisonWindow(self, statistics, histograms)
+
     def run(self):
         """
         Run GUI mainloop
@@ -178,6 +317,9 @@ class Searching(tk.Frame):
         # Show detail button
         self.detail_button2 = tk.Button(self, text='Show relate artist detail')
 
+        # Compare every selected artist button
+        self.compare_button = tk.Button(self, text='Compare selected')
+
         self.init_component()
 
     def init_component(self):
@@ -186,6 +328,7 @@ class Searching(tk.Frame):
         self.entry.grid(row=0, column=0, columnspan=2, sticky='news')
 
         self.search_button.grid(row=0, column=2, sticky='news')
+        self.search_button['state'] = tk.DISABLED
 
         self.detail_button.grid(row=0, column=3, sticky='news')
         self.detail_button['state'] = tk.DISABLED
@@ -204,6 +347,9 @@ class Searching(tk.Frame):
         self.detail_button2.grid(row=2, column=3, sticky='news')
         self.detail_button2['state'] = tk.DISABLED
 
+        self.compare_button.grid(row=2, column=2, sticky='news')
+        self.compare_button['state'] = tk.DISABLED
+
         self.relate.grid(row=3, column=0, columnspan=4, sticky='news')
         self.relate['displaycolumns'] = ['name', 'genre']
         self.relate.heading('name', text='Name')
@@ -222,6 +368,12 @@ class Searching(tk.Frame):
         self.grid_columnconfigure(2, weight=1)
         self.grid_columnconfigure(3, weight=1)
 
+    def enable_search_button(self, *args):
+        """
+        Enable search button
+        """
+        self.search_button['state'] = tk.NORMAL
+
     def disable_relate_detail_button(self, *args):
         """
         Disable relate artist detail button
@@ -388,6 +540,25 @@ class DataStoryTelling(tk.Frame):
 
         self.rowconfigure(1, weight=5)
 
+        self.columnconfigure(0, weight=1)
+        self.columnconfigure(1, weight=1)
+        self.columnconfigure(2, weight=1)
+        self.columnconfigure(3, weight=1)
+
+        self.rowconfigure(2, weight=20)
+
+    def init_graph(self):
+        """
+        Create graph canvas
+        matplotlib is imported here instead of module level to keep startup fast
+        """
+
+        import matplotlib
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+        from matplotlib.figure import Figure
+
+        matplotlib.use("TkAgg")
+
         # Laying out graph
 
         fig = Figure()
@@ -402,13 +573,6 @@ class DataStoryTelling(tk.Frame):
         self.canvas_widget = self.canvas.get_tk_widget()
         self.canvas_widget.grid(column=0, row=2, columnspan=4, sticky="news")
 
-        self.columnconfigure(0, weight=1)
-        self.columnconfigure(1, weight=1)
-        self.columnconfigure(2, weight=1)
-        self.columnconfigure(3, weight=1)
-
-        self.rowconfigure(2, weight=20)
-
     def add_pop_track(self, track: str):
         """
         Change popular track label
@@ -451,3 +615,114 @@ class DataStoryTelling(tk.Frame):
         :param corr: Float value of correlation
         """
         self.corr['text'] = f'Correlation with duration: {corr:.2f}'
+
+
+class ComparisonWindow(tk.Toplevel):
+    """Window that show statistics of many artist side by side"""
+
+    COLUMNS = ('artist_name', 'no_album', 'pop_track', 'mean', 'sd', 'median', 'corr')
+
+    HEADINGS = ('Name', 'Albums', 'Most popular track', 'Mean', 'SD', 'Median', 'Corr')
+
+    def __init__(self, root, statistics, histograms):
+        """
+        Comparison window constructor
+        :param root: Master component
+        :param statistics: Dataframe of statistics of each artist
+        :param histograms: Popularity histogram of each artist
+        """
+
+        super().__init__(root)
+
+        self.title('Compare artist')
+
+        self.table = ttk.Treeview(
+            self,
+            columns=self.COLUMNS,
+            show='headings',
+            height=min(len(statistics), 10)
+        )
+
+        self.init_component()
+        self.show_statistics(statistics)
+        self.init_graph(statistics, histograms)
+
+    def init_component(self):
+        """Arrange component"""
+
+        self.table.grid(row=0, column=0, sticky='news')
+
+        for column, heading in zip(self.COLUMNS, self.HEADINGS):
+            self.table.heading(column, text=heading)
+            self.table.column(column, width=200 if column in ('artist_name', 'pop_track') else 70)
+
+        self.rowconfigure(0, weight=1)
+        self.rowconfigure(1, weight=4)
+        self.columnconfigure(0, weight=1)
+
+    def show_statistics(self, statistics):
+        """
+        Load statistics of each artist into table
+        :param statistics: Dataframe of statistics of each artist
+        """
+
+        for row in statistics.itertuples(index=False):
+            self.table.insert(
+                '',
+                tk.END,
+                values=(
+                    row.artist_name,
+                    row.no_album,
+                    row.pop_track,
+                    f'{row.mean:.2f}',
+                    f'{row.sd:.2f}',
+                    f'{row.median:.2f}',
+                    f'{row.corr:.2f}',
+                )
+            )
+
+    def init_graph(self, statistics, histograms):
+        """
+        Draw mean popularity and popularity distribution of every artist on shared axes
+        :param statistics: Dataframe of statistics of each artist
+        :param histograms: Popularity histogram of each artist
+        """
+
+        import numpy as np
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+        from matplotlib.figure import Figure
+
+        n_artist = len(statistics)
+        positions = np.arange(n_artist)
+
+        fig = Figure(figsize=(10, max(4, 0.3 * n_artist)))
+        ax1 = fig.add_subplot(121)
+        ax2 = fig.add_subplot(122, sharey=ax1)
+
+        ax1.barh(positions, statistics['mean'], xerr=statistics['sd'].fillna(0))
+        ax1.scatter(statistics['median'], positions, marker='|', color='red', zorder=3)
+        ax1.set_yticks(positions, labels=statistics['artist_name'], fontsize='x-small')
+        ax1.set_xlim(0, 100)
+        ax1.set_title('Mean track popularity\n(line is median)')
+        ax1.set_xlabel('Popularity(1 - 100)')
+
+        # Share of artist tracks in each bin so artist with many track is comparable
+        totals = histograms.sum(axis=1, keepdims=True)
+        shares = histograms / np.maximum(totals, 1)
+
+        ax2.imshow(
+            shares,
+            aspect='auto',
+            cmap='viridis',
+            extent=(0, 100, n_artist - 0.5, -0.5),
+            interpolation='nearest'
+        )
+        ax2.set_title('Track popularity distribution')
+        ax2.set_xlabel('Popularity(1 - 100)')
+        ax2.tick_params(axis='y', labelleft=False)
+
+        fig.tight_layout()
+
+        self.canvas = FigureCanvasTkAgg(fig, master=self)
+        self.canvas.get_tk_widget().grid(row=1, column=0, sticky='news')
+        self.canvas.draw()
@@ -0,0 +1,231 @@
+"""
+HTTP cache for Spotify Web API request
+
+CachingSession can be given to spotipy.Spotify as requests_session.
+Response is kept in a cache store and revalidated with If-None-Match / If-Modified-Since,
+so refreshing unchanged data only cost a 304 response without body.
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import Counter
+import requests
+from requests.structures import CaseInsensitiveDict
+
+
+def parse_cache_control(value: str) -> dict:
+    """
+    Parse Cache-Control header
+    :param value: Cache-Control header value
+    :return: Dictionary of directive name and its value, directive without value get True
+    """
+
+    directives = {}
+
+    for directive in value.split(','):
+        name, _, argument = directive.strip().partition('=')
+
+        if name:
+            directives[name.lower()] = argument.strip('"') if argument else True
+
+    return directives
+
+
+class MemoryCacheStore:
+    """
+    Cache store that keep entry in dictionary
+    """
+
+    def __init__(self):
+        self._entries = {}
+
+    def get(self, key: str):
+        """
+        Return cache entry of key or None
+        """
+        return self._entries.get(key)
+
+    def set(self, key: str, entry: dict):
+        """
+        Keep cache entry of key
+        """
+        self._entries[key] = entry
+
+
+class DiskCacheStore:
+    """
+    Cache store that keep each entry in its own json file inside directory
+    """
+
+    def __init__(self, directory: str):
+        """
+        :param directory: Directory to keep cache file, created if not exist
+        """
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _file_name(self, key: str) -> str:
+        """
+        Return name of cache file of key
+        """
+        return os.path.join(self.directory, f'{key}.json')
+
+    def get(self, key: str):
+        """
+        Return cache entry of key or None
+        """
+
+        try:
+            with open(self._file_name(key), encoding='utf-8') as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return None
+
+    def set(self, key: str, entry: dict):
+        """
+        Keep cache entry of key
+        Entry is written to temporary file first so reader never see half written file
+        """
+
+        descriptor, temp_name = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+
+        try:
+            with os.fdopen(descriptor, 'w', encoding='utf-8') as file:
+                json.dump(entry, file)
+            os.replace(temp_name, self._file_name(key))
+        except OSError:
+            if os.path.exists(temp_name):
+                os.remove(temp_name)
+
+
+class CachingSession(requests.Session):
+    """
+    Requests session that cache GET response following Cache-Control, ETag and Last-Modified
+    """
+
+    def __init__(self, store=None):
+        """
+        :param store: Object with get(key) and set(key, entry) method, memory store by default
+        """
+
+        super().__init__()
+
+        self.store = store if store is not None else MemoryCacheStore()
+
+        # Number of request that is served from cache (hit), revalidated with
+        # 304 (revalidated), fetched in full (miss) and not cacheable (bypass)
+        self.stats = Counter()
+        self._stats_lock = threading.Lock()
+
+    def _count(self, name):
+        """
+        Increase statistic counter
+        """
+        with self._stats_lock:
+            self.stats[name] += 1
+
+    @staticmethod
+    def cache_key(url, params, headers) -> str:
+        """
+        Return cache key of request
+        Authorization is not part of the key since response of Web API catalog
+        doesn't depend on which client request it
+        """
+
+        full_url = requests.Request('GET', url, params=params).prepare().url
+        language = (headers or {}).get('Accept-Language', '')
+
+        return hashlib.sha1(f'{full_url} {language}'.encode()).hexdigest()
+
+    @staticmethod
+    def _expires(headers) -> float:
+        """
+        Return time that response become stale
+        """
+
+        cache_control = parse_cache_control(headers.get('Cache-Control', ''))
+
+        if 'no-cache' in cache_control:
+            return 0
+
+        try:
+            return time.time() + int(cache_control.get('max-age', 0))
+        except ValueError:
+            return 0
+
+    @staticmethod
+    def _response(entry: dict, request_url: str) -> requests.Response:
+        """
+        Build response object from cache entry
+        """
+
+        response = requests.Response()
+        response.status_code = 200
+        response.headers = CaseInsensitiveDict(entry['headers'])
+        response.url = request_url
+        response.encoding = 'utf-8'
+        response._content = entry['body'].encode('utf-8')
+
+        return response
+
+    def request(self, method, url, *args, params=None, headers=None, **kwargs):
+        """
+        Send request, GET request is served from or revalidated against cache
+        """
+
+        if method.upper() != 'GET':
+            return super().request(method, url, *args, params=params, headers=headers, **kwargs)
+
+        key = self.cache_key(url, params, headers)
+        entry = self.store.get(key)
+
+        if entry and time.time() < entry['expires']:
+            self._count('hit')
+            return self._response(entry, entry['url'])
+
+        headers = dict(headers or {})
+
+        if entry and entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+
+        if entry and entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+
+        response = super().request(method, url, *args, params=params, headers=headers, **kwargs)
+
+        if response.status_code == 304 and entry:
+            self._count('revalidated')
+
+            entry['expires'] = self._expires(response.headers)
+            entry['etag'] = response.headers.get('ETag', entry.get('etag'))
+            self.store.set(key, entry)
+
+            return self._response(entry, response.url)
+
+        cache_control = parse_cache_control(response.headers.get('Cache-Control', ''))
+
+        if response.status_code != 200 or 'no-store' in cache_control:
+            self._count('bypass')
+            return response
+
+        self._count('miss')
+
+        entry = {
+            'url': response.url,
+            'headers': {
+                name: value for name, value in response.headers.items()
+                if name.lower() in ('content-type', 'cache-control', 'etag', 'last-modified')
+            },
+            'body': response.content.decode(response.encoding or 'utf-8'),
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'expires': self._expires(response.headers),
+        }
+
+        if entry['etag'] or entry['last_modified'] or entry['expires'] > time.time():
+            self.store.set(key, entry)
+
+        return response
@@ -1,28 +1,57 @@
+"""
+Start More like this application
+Window is shown first, then spotipy, pandas, matplotlib and Pillow get imported
+and artist database get loaded on background thread
+Spotify object is created by spotify_client, see there for MLT_SPOTIFY environment variable
+Added artist is saved by snapshotter on background thread
+MLT_MEMORY_BUDGET environment variable limit megabyte of album and track kept in memory
+"""
+import os
 import dotenv
-import spotipy
-from spotipy.oauth2 import SpotifyClientCredentials
 from gui import GUI
-from controller import Controller
-from artist_db import ArtistDb
 
-if __name__ == "__main__":
-    dotenv.load_dotenv()
 
-    auth_manager = SpotifyClientCredentials()
+def load_model():
+    """
+    Create artist database
+    :return: ArtistDb object
+    """
+
+    from artist_db import ArtistDb
+    from snapshotter import Snapshotter
+    from spotify_client import create_client
+
+    budget = os.environ.get('MLT_MEMORY_BUDGET')
 
-    sp = ArtistDb(
-        spotipy.Spotify(auth_manager=auth_manager),
+    model = ArtistDb(
+        create_client(),
         'csv/artist.csv',
-        'csv/album.csv',
-        'csv/track.csv'
+        'csv/album',
+        'csv/track',
+        int(float(budget) * 1024 * 1024) if budget else None
     )
-    ui = GUI()
 
-    controller = Controller(ui, sp)
+    # Added artist is saved in background, what is left is saved when program exit
+    Snapshotter(model).start()
 
-    ui.set_controller(controller)
+    return model
 
-    ui.run()
 
-    sp.update_csv()
+def build_ui():
+    """
+    Create GUI and start loading artist database in background
+    :return: GUI object
+    """
+
+    dotenv.load_dotenv()
 
+    ui = GUI()
+    ui.load_model(load_model)
+
+    return ui
+
+
+if __name__ == "__main__":
+    ui = build_ui()
+
+    ui.run()
@@ -0,0 +1,267 @@
+"""
+Memory accounting of artist database table, cache and Tk image
+
+collect() return deep memory usage of every ArtistDb table by column, of any cache object
+and of image and figure shown by controller. GrowthTracker diff tracemalloc snapshot between
+artist selection to find what keep growing in a long session, it is turned on in the
+application with MLT_TRACEMALLOC=1.
+
+Usage: python memory_report.py [--select 20] [--budget 50] [--tracemalloc]
+"""
+import argparse
+import contextlib
+import gc
+import io
+import os
+import sys
+import tracemalloc
+from types import FunctionType, ModuleType
+
+# Object that is shared by the whole process and not owned by the measured object
+_SHARED_TYPES = (type, ModuleType, FunctionType)
+
+
+def deep_size(obj) -> int:
+    """
+    Return size in byte of object and every object reachable from it
+    :param obj: Object to measure
+    :return: Size in byte
+    """
+
+    seen = set()
+    stack = [obj]
+    size = 0
+
+    while stack:
+        current = stack.pop()
+
+        if id(current) in seen or isinstance(current, _SHARED_TYPES):
+            continue
+
+        seen.add(id(current))
+        size += sys.getsizeof(current)
+        stack.extend(gc.get_referents(current))
+
+    return size
+
+
+def image_usage(photo) -> int:
+    """
+    Return size in byte of Tk photo image, Tk keep 4 byte per pixel
+    :param photo: ImageTk.PhotoImage or tk.PhotoImage
+    """
+    return photo.width() * photo.height() * 4
+
+
+def figure_usage(figure) -> int:
+    """
+    Return size in byte of rendered buffer of matplotlib figure
+    :param figure: matplotlib Figure
+    """
+
+    width, height = figure.canvas.get_width_height()
+    return width * height * 4
+
+
+def controller_usage(controller) -> dict:
+    """
+    Return memory usage of image and figure shown by controller
+    :param controller: Controller object
+    :return: Dictionary of object name and size in byte
+    """
+
+    usage = {'blank_img': image_usage(controller.blank_img)}
+
+    if controller.showing_image is not controller.blank_img:
+        usage['showing_image'] = image_usage(controller.showing_image)
+
+    canvas = getattr(controller.ui.data, 'canvas', None)
+
+    if canvas is not None:
+        usage['figure'] = figure_usage(canvas.figure)
+
+    usage['figure_cache'] = controller.figure_cache.bitmap_bytes()
+
+    return usage
+
+
+def collect(db, controller=None, caches: dict = None) -> dict:
+    """
+    Collect memory usage of database, controller and cache
+    :param db: ArtistDb object
+    :param controller: Controller object whose image and figure is measured
+    :param caches: Dictionary of cache name and cache object
+    :return: Dictionary of tables, partitions, working_set, caches, tk and total byte
+    """
+
+    usage = db.memory_usage()
+
+    report = {
+        'tables': usage['tables'],
+        'partitions': usage['partitions'],
+        'working_set': usage['working_set'],
+        'caches': {name: deep_size(cache) for name, cache in (caches or {}).items()},
+        'tk': controller_usage(controller) if controller else {},
+    }
+
+    report['total'] = (
+        sum(sum(columns.values()) for columns in report['tables'].values())
+        + sum(report['caches'].values())
+        + sum(report['tk'].values())
+    )
+
+    return report
+
+
+def format_size(size: int) -> str:
+    """
+    Format byte as human readable text
+    """
+
+    for unit in ('B', 'kB', 'MB'):
+        if abs(size) < 1024:
+            return f'{size:.0f} {unit}'
+        size /= 1024
+
+    return f'{size:.1f} GB'
+
+
+def format_report(report: dict) -> str:
+    """
+    Format report returned by collect as text table
+    :param report: Memory report
+    :return: Text of report
+    """
+
+    working_set = report['working_set']
+    budget = working_set['budget']
+
+    lines = [
+        f"{report['partitions']} artist partition loaded",
+        f"working set {format_size(working_set['bytes'])} of "
+        f"{format_size(budget) if budget is not None else 'no'} budget, "
+        f"{working_set['evictions']} eviction, {working_set['reloads']} reload",
+    ]
+
+    for table, columns in report['tables'].items():
+        lines.append(f'{table:<28}{format_size(sum(columns.values())):>12}')
+
+        for column, size in sorted(columns.items(), key=lambda item: item[1], reverse=True):
+            lines.append(f'  {column:<26}{format_size(size):>12}')
+
+    for section in ('caches', 'tk'):
+        for name, size in report[section].items():
+            lines.append(f'{section}.{name:<{27 - len(section)}}{format_size(size):>12}')
+
+    lines.append(f"{'total':<28}{format_size(report['total']):>12}")
+
+    return '\n'.join(lines)
+
+
+class GrowthTracker:
+    """
+    Diff tracemalloc snapshot taken after each artist selection
+    """
+
+    def __init__(self, frames: int = 5, limit: int = 10):
+        """
+        :param frames: Number of stack frame kept for each allocation
+        :param limit: Number of line that grow the most shown in each diff
+        """
+
+        self.frames = frames
+        self.limit = limit
+        self._previous = None
+
+    @staticmethod
+    def _take_snapshot():
+        """
+        Take snapshot without allocation of tracemalloc itself
+        """
+        return tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+        ))
+
+    def start(self):
+        """
+        Start tracing allocation
+        """
+
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+
+        self._previous = self._take_snapshot()
+
+    def record(self, label: str) -> list:
+        """
+        Take snapshot and diff it with the previous one
+        :param label: Name of the step since previous snapshot, such as artist ID
+        :return: List of text line of allocation that grow the most
+        """
+
+        if self._previous is None:
+            self.start()
+            return []
+
+        snapshot = self._take_snapshot()
+        stats = snapshot.compare_to(self._previous, 'lineno')
+        self._previous = snapshot
+
+        current, peak = tracemalloc.get_traced_memory()
+
+        lines = [f'{label}: traced {format_size(current)}, peak {format_size(peak)}']
+        lines += [f'  {stat}' for stat in stats[:self.limit]]
+
+        return lines
+
+
+# Growth tracker of the application, only when turned on by environment variable
+growth = None
+
+if os.environ.get('MLT_TRACEMALLOC', '') not in ('', '0'):
+    growth = GrowthTracker()
+    growth.start()
+
+
+def main():
+    """
+    Load artist from csv database and print memory report
+    """
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--artist-csv', default='csv/artist.csv')
+    parser.add_argument('--album-dir', default='csv/album')
+    parser.add_argument('--track-dir', default='csv/track')
+    parser.add_argument('--select', type=int, default=20, help='Number of artist to load')
+    parser.add_argument('--budget', type=float, help='Megabyte of partition kept in memory')
+    parser.add_argument('--tracemalloc', action='store_true',
+                        help='Print allocation growth after each selection')
+    args = parser.parse_args()
+
+    from artist_db import ArtistDb
+
+    tracker = GrowthTracker() if args.tracemalloc else None
+
+    if tracker:
+        tracker.start()
+
+    # Artist already in csv file is loaded without Spotify
+    budget = int(args.budget * 1024 * 1024) if args.budget is not None else None
+    db = ArtistDb(None, args.artist_csv, args.album_dir, args.track_dir, budget)
+
+    for artist_id in db.snapshot().artist['artist_id'][:args.select]:
+
+        # SelectedArtist print every selected artist
+        with contextlib.redirect_stdout(io.StringIO()):
+            db.get_selected_artist(artist_id)
+
+        if tracker:
+            print('\n'.join(tracker.record(artist_id)))
+
+    import tracing
+
+    print(format_report(collect(db, caches={'trace': tracing.tracer})))
+
+
+if __name__ == '__main__':
+    main()
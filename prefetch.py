@@ -0,0 +1,138 @@
+"""
+Speculative background ingestion of related artist
+
+After an artist is shown, the first few related artist is added to database at background
+priority while user is reading, so selecting one of them next is served from local data.
+Prefetch is cancelled as soon as another artist get selected and is limited to a number
+of Spotify call per selection.
+
+Turned on by MLT_PREFETCH environment variable (number of related artist to add),
+MLT_PREFETCH_BUDGET set the number of Spotify call per selection (default 60).
+Call budget is enforced by request scheduler, which is used for Spotify Web API client.
+"""
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import spotipy
+from scheduler import BACKGROUND, BudgetExceeded, CallBudget, call_budget, priority
+
+
+class Prefetcher:
+    """
+    Add top related artist of shown artist on background thread
+    """
+
+    def __init__(self, db, top_n: int = 3, budget: int = 60):
+        """
+        :param db: ArtistDb or SqliteArtistDb object
+        :param top_n: Number of related artist to add after each selection
+        :param budget: Maximum number of Spotify call spent after each selection
+        """
+
+        self.db = db
+        self.top_n = top_n
+        self.budget = budget
+
+        self._lock = threading.Lock()
+        self._current = None
+        self._thread = None
+
+        # Artist added by prefetch that has not been selected yet
+        self._prefetched = set()
+
+        # Number of artist prefetched, selection served by prefetch,
+        # artist cancelled by new selection and artist stopped by budget
+        self.stats = {'prefetched': 0, 'hits': 0, 'cancelled': 0, 'exhausted': 0}
+
+    @classmethod
+    def from_environment(cls, db) -> 'Prefetcher':
+        """
+        Create prefetcher from MLT_PREFETCH and MLT_PREFETCH_BUDGET environment variable
+        :param db: ArtistDb or SqliteArtistDb object
+        :return: Prefetcher, None when prefetch is not turned on
+        """
+
+        top_n = int(os.environ.get('MLT_PREFETCH', 0) or 0)
+
+        if top_n <= 0:
+            return None
+
+        return cls(db, top_n, int(os.environ.get('MLT_PREFETCH_BUDGET', 60)))
+
+    def selected(self, artist_id):
+        """
+        Cancel running prefetch because user selected another artist
+        :param artist_id: Spotify artist ID of selected artist
+        """
+
+        with self._lock:
+            if self._current is not None and not self._current.cancelled:
+                self._current.cancel()
+
+            if artist_id in self._prefetched:
+                self._prefetched.discard(artist_id)
+                self.stats['hits'] += 1
+
+    def prefetch(self, artist_ids: list):
+        """
+        Start adding the first top_n artist that is not in database yet
+        Prefetch started before is cancelled.
+        :param artist_ids: Spotify artist ID of related artist, most related first
+        """
+
+        candidates = [
+            artist_id for artist_id in artist_ids[:self.top_n] if not self.db.has_artist(artist_id)
+        ]
+
+        budget = CallBudget(self.budget)
+
+        with self._lock:
+            if self._current is not None:
+                self._current.cancel()
+
+            self._current = budget
+
+        if candidates:
+            self._thread = threading.Thread(target=self._run, args=(candidates, budget), daemon=True)
+            self._thread.start()
+
+    def _run(self, artist_ids, budget: CallBudget):
+        """
+        Add every artist at the same time so their album and track lookup share batched request
+        """
+
+        with ThreadPoolExecutor(max_workers=len(artist_ids)) as executor:
+            list(executor.map(lambda artist_id: self._add(artist_id, budget), artist_ids))
+
+    def _add(self, artist_id, budget: CallBudget):
+        """
+        Add artist unless prefetch is cancelled or budget is used up
+        """
+
+        # Client without scheduler does not check budget, so check before starting
+        if budget.cancelled:
+            return
+
+        with priority(BACKGROUND), call_budget(budget):
+            try:
+                self.db.add_artist(artist_id)
+            except BudgetExceeded:
+                with self._lock:
+                    self.stats['cancelled' if budget.cancelled else 'exhausted'] += 1
+                return
+            except spotipy.SpotifyException:
+                return
+
+        with self._lock:
+            self.stats['prefetched'] += 1
+            self._prefetched.add(artist_id)
+
+    def wait(self, timeout: float = None):
+        """
+        Wait for the latest prefetch to finish, used by benchmark
+        """
+
+        thread = self._thread
+
+        if thread is not None:
+            thread.join(timeout)
@@ -0,0 +1,215 @@
+"""
+Record and replay of Spotify Web API response
+
+RecordingSpotify save every response of wrapped Spotify object into a ResponseStore,
+ReplaySpotify answer from that store without network or credential, so profiling,
+benchmark and demo can run offline and always get the same data.
+"""
+import gzip
+import json
+import os
+import tempfile
+import threading
+import spotipy
+
+
+# Method that look up a list of ID and the response key of its list of result,
+# each ID is recorded on its own so any batch of recorded ID can be replayed
+LOOKUP_METHODS = {'albums': 'albums', 'tracks': 'tracks', 'artists': 'artists'}
+
+
+class NotRecorded(KeyError):
+    """
+    Call was never recorded and there is no live Spotify object to fall back to
+    """
+
+
+def call_key(name: str, args: tuple, kwargs: dict) -> str:
+    """
+    Return key of Spotify method call
+    :param name: Method name
+    :param args: Positional argument
+    :param kwargs: Keyword argument
+    :return: Text that is the same for the same call
+    """
+    return json.dumps([name, list(args), kwargs], sort_keys=True, separators=(',', ':'))
+
+
+class ResponseStore:
+    """
+    Recorded response kept in memory and saved as a single gzip compressed json file
+    """
+
+    def __init__(self, file_name: str):
+        """
+        :param file_name: Name of store file, loaded if exist
+        """
+
+        self.file_name = file_name
+        self._lock = threading.Lock()
+        self._changed = False
+
+        try:
+            with gzip.open(file_name, 'rt', encoding='utf-8') as file:
+                self._entries = json.load(file)
+        except FileNotFoundError:
+            self._entries = {}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key: str):
+        """
+        Return recorded entry of key or None
+        """
+        return self._entries.get(key)
+
+    def set(self, key: str, entry: dict):
+        """
+        Keep entry of key
+        """
+
+        with self._lock:
+            self._entries[key] = entry
+            self._changed = True
+
+    def save(self):
+        """
+        Write store file if anything got recorded
+        File is written to temporary file first so store is never left half written
+        """
+
+        with self._lock:
+
+            if not self._changed:
+                return
+
+            directory = os.path.dirname(os.path.abspath(self.file_name))
+            os.makedirs(directory, exist_ok=True)
+
+            descriptor, temp_name = tempfile.mkstemp(dir=directory, suffix='.tmp')
+
+            try:
+                with os.fdopen(descriptor, 'wb') as raw, \
+                        gzip.open(raw, 'wt', encoding='utf-8') as file:
+                    json.dump(self._entries, file, separators=(',', ':'))
+                os.replace(temp_name, self.file_name)
+            except OSError:
+                if os.path.exists(temp_name):
+                    os.remove(temp_name)
+                raise
+
+            self._changed = False
+
+
+class RecordingSpotify:
+    """
+    Wrapper of spotipy.Spotify object that record every response into store
+    """
+
+    def __init__(self, sp, store: ResponseStore):
+        """
+        :param sp: Spotify object to wrap
+        :param store: Store to record response into
+        """
+        self._sp = sp
+        self.store = store
+
+    def __getattr__(self, name):
+        attribute = getattr(self._sp, name)
+
+        if not callable(attribute):
+            return attribute
+
+        def record(*args, **kwargs):
+            key = call_key(name, args, kwargs)
+
+            try:
+                result = attribute(*args, **kwargs)
+            except spotipy.SpotifyException as error:
+                # Throttling is not part of the data, only keep real error such as 404
+                if error.http_status != 429:
+                    self.store.set(key, {'error': {
+                        'http_status': error.http_status,
+                        'code': error.code,
+                        'msg': error.msg,
+                    }})
+                raise
+
+            if name in LOOKUP_METHODS:
+                field = LOOKUP_METHODS[name]
+                for item_id, item in zip(args[0], result[field]):
+                    self.store.set(
+                        call_key(name, ([item_id],) + args[1:], kwargs),
+                        {'result': {field: [item]}}
+                    )
+            else:
+                self.store.set(key, {'result': result})
+
+            return result
+
+        return record
+
+
+class ReplaySpotify:
+    """
+    Spotify object that answer every call from recorded response
+    """
+
+    def __init__(self, store: ResponseStore, fallback=None):
+        """
+        :param store: Store of recorded response
+        :param fallback: Spotify object called when call is not recorded,
+        usually RecordingSpotify so the response is recorded for next time
+        """
+        self.store = store
+        self.fallback = fallback
+
+    def __getattr__(self, name):
+
+        def replay(*args, **kwargs):
+
+            if name in LOOKUP_METHODS:
+                entry = self._lookup(name, args, kwargs)
+            else:
+                entry = self.store.get(call_key(name, args, kwargs))
+
+            if entry is None:
+                if self.fallback is None:
+                    raise NotRecorded(f'{name} call with {args} {kwargs} is not recorded')
+                return getattr(self.fallback, name)(*args, **kwargs)
+
+            if 'error' in entry:
+                raise spotipy.SpotifyException(**entry['error'])
+
+            return entry['result']
+
+        return replay
+
+    def _lookup(self, name, args, kwargs):
+        """
+        Combine recorded entry of each ID into one response
+        Error is recorded for the whole lookup, so it is replayed for the same list of ID.
+        :return: Entry of whole lookup or None when any ID is not recorded
+        """
+
+        entry = self.store.get(call_key(name, args, kwargs))
+
+        if entry is not None and 'error' in entry:
+            return entry
+
+        field = LOOKUP_METHODS[name]
+        items = []
+
+        for item_id in args[0]:
+            entry = self.store.get(call_key(name, ([item_id],) + args[1:], kwargs))
+
+            if entry is None:
+                return None
+
+            if 'error' in entry:
+                return entry
+
+            items += entry['result'][field]
+
+        return {'result': {field: items}}
@@ -0,0 +1,383 @@
+"""
+Rate limit aware scheduler for Spotify Web API call
+
+Every call wait for a token from a shared token bucket. Waiting call is served by priority,
+interactive request (search, selected artist) always go before background request
+(prefetch, crawl). When Spotify answer 429 every thread stop sending request until
+Retry-After passed, then the call is retried. Background work can be limited to a number
+of call and cancelled with call_budget(). Coroutine take its turn with acquire_async().
+"""
+import asyncio
+import heapq
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+import spotipy
+
+INTERACTIVE = 0
+BACKGROUND = 1
+
+PRIORITY_NAME = {INTERACTIVE: 'interactive', BACKGROUND: 'background'}
+
+_local = threading.local()
+
+
+def current_priority() -> int:
+    """
+    Return priority of call made by current thread
+    :return: INTERACTIVE unless changed by priority()
+    """
+    return getattr(_local, 'priority', INTERACTIVE)
+
+
+@contextmanager
+def priority(level: int):
+    """
+    Make every call inside with block of current thread use given priority
+    :param level: INTERACTIVE or BACKGROUND
+    """
+
+    previous = current_priority()
+    _local.priority = level
+
+    try:
+        yield
+    finally:
+        _local.priority = previous
+
+
+class BudgetExceeded(Exception):
+    """
+    Background call was refused because its budget is used up or cancelled
+    """
+
+
+class CallBudget:
+    """
+    Number of Spotify call that background work may still send, can be cancelled at any time
+    """
+
+    def __init__(self, calls: int):
+        """
+        :param calls: Maximum number of call
+        """
+
+        self.remaining = calls
+        self._cancelled = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def cancel(self):
+        """
+        Refuse every call from now on
+        """
+        self._cancelled.set()
+
+    def spend(self):
+        """
+        Use one call from budget
+        :raise BudgetExceeded: When budget is cancelled or used up
+        """
+
+        with self._lock:
+            if self._cancelled.is_set():
+                raise BudgetExceeded('cancelled')
+
+            if self.remaining <= 0:
+                raise BudgetExceeded('budget used up')
+
+            self.remaining -= 1
+
+
+@contextmanager
+def call_budget(budget: CallBudget):
+    """
+    Make every background call inside with block of current thread spend from budget
+    :param budget: Budget of background work
+    """
+
+    previous = getattr(_local, 'budget', None)
+    _local.budget = budget
+
+    try:
+        yield
+    finally:
+        _local.budget = previous
+
+
+class TokenBucket:
+    """
+    Token bucket that refill at constant rate up to its capacity
+    """
+
+    def __init__(self, rate: float, capacity: int):
+        """
+        :param rate: Number of token added per second
+        :param capacity: Maximum number of token, allowed burst size
+        """
+
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+
+    def _refill(self, now):
+        """
+        Add token for time passed since last refill
+        """
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def delay(self, now) -> float:
+        """
+        Return second until a token is available
+        """
+        self._refill(now)
+        return max(0.0, (1 - self._tokens) / self.rate)
+
+    def take(self, now):
+        """
+        Use one token
+        """
+        self._refill(now)
+        self._tokens -= 1
+
+    def drain(self, now):
+        """
+        Remove every token so request start again slowly after being throttled
+        """
+        self._refill(now)
+        self._tokens = min(self._tokens, 0.0)
+
+
+class RequestScheduler:
+    """
+    Shared scheduler that pace every Spotify call of the application
+    """
+
+    def __init__(
+            self,
+            rate: float = 10.0,
+            burst: int = 20,
+            max_retries: int = 5,
+            backoff: float = 1.0
+    ):
+        """
+        :param rate: Average number of request per second
+        :param burst: Number of request that can be sent at once after being idle
+        :param max_retries: Number of time a throttled call is retried before giving up
+        :param backoff: Second to wait after first 429 without Retry-After, doubled every retry
+        """
+
+        self.max_retries = max_retries
+        self.backoff = backoff
+
+        self._bucket = TokenBucket(rate, burst)
+        self._condition = threading.Condition()
+        self._queue = []
+        self._sequence = itertools.count()
+        self._blocked_until = 0.0
+
+        # Metrics, guarded by condition lock
+        self._calls = 0
+        self._throttled = 0
+        self._wait = {
+            level: {'count': 0, 'total': 0.0, 'max': 0.0} for level in PRIORITY_NAME
+        }
+
+    def call(self, function, *args, **kwargs):
+        """
+        Call function when its turn come and retry when it got throttled
+        :param function: Spotify method to call
+        :return: Return value of function
+        """
+
+        level = current_priority()
+        budget = getattr(_local, 'budget', None)
+        attempt = 0
+
+        while True:
+
+            # Batch sent by background thread for interactive caller is not charged
+            if budget is not None and level == BACKGROUND:
+                budget.spend()
+
+            self._acquire(level)
+
+            try:
+                return function(*args, **kwargs)
+            except spotipy.SpotifyException as error:
+                if error.http_status != 429 or attempt == self.max_retries:
+                    raise
+
+                self.throttle(self.retry_after(error.headers, attempt))
+                attempt += 1
+
+    def retry_after(self, headers, attempt) -> float:
+        """
+        Return second to wait before retry throttled call
+        :param headers: Response header of 429 response, may be None
+        :param attempt: Number of retry done before
+        """
+
+        try:
+            return float((headers or {})['Retry-After'])
+        except (KeyError, TypeError, ValueError):
+            return self.backoff * 2 ** attempt
+
+    def throttle(self, retry_after):
+        """
+        Stop every thread from sending request until retry_after second passed
+        """
+
+        with self._condition:
+            now = time.monotonic()
+
+            self._throttled += 1
+            self._blocked_until = max(self._blocked_until, now + retry_after)
+            self._bucket.drain(now)
+
+            self._condition.notify_all()
+
+    def _enqueue(self, level):
+        """
+        Put call into waiting queue, condition lock must be held
+        :param level: Priority of call
+        :return: Tuple of ticket of call and time it got enqueued
+        """
+
+        ticket = (level, next(self._sequence))
+        heapq.heappush(self._queue, ticket)
+
+        return ticket, time.monotonic()
+
+    def _take_turn(self, ticket, enqueued):
+        """
+        Take token if it is turn of ticket, condition lock must be held
+        :return: 0 when token is taken, second until token is available for first call in queue
+        and None for other call
+        """
+
+        now = time.monotonic()
+
+        if self._queue[0] != ticket:
+            return None
+
+        wait = max(self._blocked_until - now, self._bucket.delay(now))
+
+        if wait > 0:
+            return wait
+
+        heapq.heappop(self._queue)
+        self._bucket.take(now)
+        self._calls += 1
+
+        waited = now - enqueued
+        stats = self._wait[ticket[0]]
+        stats['count'] += 1
+        stats['total'] += waited
+        stats['max'] = max(stats['max'], waited)
+
+        # Let next call in queue check its turn
+        self._condition.notify_all()
+
+        return 0
+
+    def _acquire(self, level):
+        """
+        Wait until this call is the highest priority waiting call and a token is available
+        :param level: Priority of call
+        """
+
+        with self._condition:
+            ticket, enqueued = self._enqueue(level)
+
+            while True:
+                wait = self._take_turn(ticket, enqueued)
+
+                if wait == 0:
+                    return
+
+                self._condition.wait(wait)
+
+    async def acquire_async(self, level: int = INTERACTIVE, poll: float = 0.005):
+        """
+        Wait on event loop until this call is the highest priority waiting call and a token is available
+        Call from thread and coroutine share the same queue and token bucket.
+        :param level: Priority of call
+        :param poll: Second between check while other call is first in queue
+        """
+
+        with self._condition:
+            ticket, enqueued = self._enqueue(level)
+
+        try:
+            while True:
+                with self._condition:
+                    wait = self._take_turn(ticket, enqueued)
+
+                if wait == 0:
+                    return
+
+                await asyncio.sleep(poll if wait is None else wait)
+        except asyncio.CancelledError:
+            with self._condition:
+                self._queue.remove(ticket)
+                heapq.heapify(self._queue)
+                self._condition.notify_all()
+            raise
+
+    def metrics(self) -> dict:
+        """
+        Return queue depth and wait time of scheduler
+        :return: Dictionary of metrics
+        """
+
+        with self._condition:
+            return {
+                'queue_depth': len(self._queue),
+                'queue_depth_by_priority': {
+                    name: sum(1 for level, _ in self._queue if level == key)
+                    for key, name in PRIORITY_NAME.items()
+                },
+                'calls': self._calls,
+                'throttled': self._throttled,
+                'blocked_for': max(0.0, self._blocked_until - time.monotonic()),
+                'wait': {
+                    name: {
+                        'count': self._wait[key]['count'],
+                        'mean': self._wait[key]['total'] / max(1, self._wait[key]['count']),
+                        'max': self._wait[key]['max'],
+                    }
+                    for key, name in PRIORITY_NAME.items()
+                },
+            }
+
+
+class ScheduledSpotify:
+    """
+    Wrapper of spotipy.Spotify object that send every method call through scheduler
+    """
+
+    def __init__(self, sp: 'spotipy.Spotify', scheduler: RequestScheduler):
+        """
+        :param sp: Spotify object to wrap
+        :param scheduler: Scheduler shared by every Spotify call
+        """
+        self._sp = sp
+        self.scheduler = scheduler
+
+    def __getattr__(self, name):
+        attribute = getattr(self._sp, name)
+
+        if not callable(attribute):
+            return attribute
+
+        def scheduled(*args, **kwargs):
+            return self.scheduler.call(attribute, *args, **kwargs)
+
+        return scheduled
@@ -0,0 +1,460 @@
+"""
+Headless HTTP service that share one artist database with many client
+
+Every answer is JSON:
+    GET /search?q=plini                      Search artist
+    GET /artist/<artist_id>                  Artist detail with album and track
+    GET /artist/<artist_id>/related          Related artist
+    GET /statistics?ids=<id>,<id>            Popularity statistics and histogram of artist
+    GET /stats                               Cache and request counter of service
+
+Request is handled on its own thread. Encoded answer is cached, artist answer stay
+valid until artist rows change and Spotify only answer expire after a while.
+Client asking for the same artist at the same time share a single fetch.
+
+Usage: python server.py [--port 8000] [--sqlite artist.db]
+"""
+import argparse
+import json
+import re
+import threading
+import time
+from collections import Counter, OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlparse
+import numpy as np
+import spotipy
+from artist_db import parse_genres
+from comparison import artist_statistics, popularity_histograms
+
+
+def records(table) -> list:
+    """
+    Convert dataframe into list of dictionary with None instead of NaN
+    """
+    return table.astype(object).where(table.notna(), None).to_dict('records')
+
+
+def encode(value) -> bytes:
+    """
+    Encode answer as JSON
+    """
+
+    def default(obj):
+        if isinstance(obj, np.generic):
+            return obj.item()
+        if isinstance(obj, np.ndarray):
+            return obj.tolist()
+        return str(obj)
+
+    return json.dumps(value, default=default, allow_nan=False).encode('utf-8')
+
+
+class BadRequest(Exception):
+    """
+    Request that cannot be answered because of its parameter
+    """
+
+
+class SingleFlight:
+    """
+    Run function only once for every caller that ask for the same key at the same time
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+        # Number of caller that waited for another caller instead of running function
+        self.coalesced = 0
+
+    def do(self, key, function):
+        """
+        Return result of function, caller that come while it is running get the same result
+        :param key: Key of call
+        :param function: Function without argument
+        :return: Return value of function
+        """
+
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+
+            if leader:
+                future = Future()
+                self._calls[key] = future
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            return future.result()
+
+        try:
+            future.set_result(function())
+        except Exception as error:  # noqa: BLE001, error is handed to every waiting caller
+            future.set_exception(error)
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+        return future.result()
+
+
+class ResponseCache:
+    """
+    Least recently used cache of encoded answer with optional expiry
+    """
+
+    def __init__(self, capacity: int = 1024):
+        """
+        :param capacity: Maximum number of answer kept
+        """
+
+        self.capacity = capacity
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """
+        Return cached answer of key or None
+        """
+
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is None or (entry[1] is not None and entry[1] < time.monotonic()):
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+
+            return entry[0]
+
+    def put(self, key, body: bytes, ttl: float = None):
+        """
+        Keep answer of key
+        :param key: Key of answer
+        :param body: Encoded answer
+        :param ttl: Second until answer expire, never when None
+        """
+
+        with self._lock:
+            self._entries[key] = (body, time.monotonic() + ttl if ttl is not None else None)
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+
+
+class ArtistService:
+    """
+    JSON answer of every endpoint from one artist database
+    """
+
+    def __init__(self, db, cache_size: int = 1024, spotify_ttl: float = 300.0):
+        """
+        :param db: ArtistDb or SqliteArtistDb object
+        :param cache_size: Maximum number of answer kept in cache
+        :param spotify_ttl: Second that search and related artist answer is cached
+        """
+
+        self.db = db
+        self.spotify_ttl = spotify_ttl
+        self.cache = ResponseCache(cache_size)
+        self.flights = SingleFlight()
+
+    def _cached(self, key, function, ttl=None) -> bytes:
+        """
+        Return cached answer or compute it once for every concurrent caller
+        """
+
+        body = self.cache.get(key)
+
+        if body is None:
+            body = self.flights.do(key, lambda: encode(function()))
+            self.cache.put(key, body, ttl)
+
+        return body
+
+    def _ensure(self, artist_id):
+        """
+        Add artist to database, concurrent request for the same artist share one fetch
+        """
+
+        if not self.db.has_artist(artist_id):
+            self.flights.do(('add', artist_id), lambda: self.db.add_artist(artist_id))
+
+    def search(self, query: str) -> bytes:
+        """
+        Search artist by name
+        """
+
+        def search():
+            return [
+                {'name': name, 'genres': genres, 'id': artist_id}
+                for name, genres, artist_id in self.db.search(query)
+            ]
+
+        return self._cached(('search', query.strip().lower()), search, self.spotify_ttl)
+
+    def related(self, artist_id: str) -> bytes:
+        """
+        Related artist of artist
+        """
+
+        def related():
+            return [
+                {'name': name, 'genres': genres, 'id': related_id}
+                for name, genres, related_id in self.db.get_related_artist(artist_id)
+            ]
+
+        return self._cached(('related', artist_id), related, self.spotify_ttl)
+
+    def artist(self, artist_id: str) -> bytes:
+        """
+        Artist detail with every album and its track
+        """
+
+        self._ensure(artist_id)
+
+        def detail():
+            artist, album, track = self.db.get_artists([artist_id])
+
+            answer = records(artist)[0]
+            answer['genres'] = parse_genres(answer['genres'])
+
+            tracks = {
+                album_id: records(album_track.drop(columns=['artist_id', 'album_id']))
+                for album_id, album_track in track.groupby('album_id', sort=False)
+            }
+
+            answer['albums'] = [
+                {**row, 'tracks': tracks.get(row['album_id'], [])}
+                for row in records(album.drop(columns=['artist_id']))
+            ]
+
+            return answer
+
+        return self._cached(('artist', artist_id, self.db.data_version(artist_id)), detail)
+
+    def statistics(self, artist_ids: list) -> bytes:
+        """
+        Popularity statistics and histogram of every artist
+        """
+
+        if not artist_ids:
+            raise BadRequest('No artist ID given')
+
+        missing = [artist_id for artist_id in artist_ids if not self.db.has_artist(artist_id)]
+
+        if missing:
+            with ThreadPoolExecutor(max_workers=min(8, len(missing))) as executor:
+                list(executor.map(self._ensure, missing))
+
+        def statistics():
+            artist, album, track = self.db.get_artists(artist_ids)
+
+            table = artist_statistics(artist, album, track)
+            histograms = popularity_histograms(track, list(table.index))
+
+            return [
+                {'id': artist_id, **row, 'histogram': histogram}
+                for artist_id, row, histogram in zip(table.index, records(table), histograms)
+            ]
+
+        versions = tuple(self.db.data_version(artist_id) for artist_id in artist_ids)
+
+        return self._cached(('statistics', tuple(artist_ids), versions), statistics)
+
+    def stats(self) -> dict:
+        """
+        Cache and coalescing counter
+        """
+        return {
+            'cache_hits': self.cache.hits,
+            'cache_misses': self.cache.misses,
+            'coalesced': self.flights.coalesced,
+        }
+
+
+# Path pattern and function that answer it from service and query parameter
+ROUTES = [
+    (re.compile(r'^/search$'), lambda service, query: service.search(query['q'])),
+    (re.compile(r'^/artist/(\w+)$'), lambda service, query, artist_id: service.artist(artist_id)),
+    (re.compile(r'^/artist/(\w+)/related$'),
+     lambda service, query, artist_id: service.related(artist_id)),
+    (re.compile(r'^/statistics$'), lambda service, query: service.statistics(
+        [artist_id for artist_id in query['ids'].split(',') if artist_id]
+    )),
+]
+
+
+class ArtistServer(ThreadingHTTPServer):
+    """
+    Threaded HTTP server of artist service
+    """
+
+    daemon_threads = True
+
+    def __init__(self, service: ArtistService, host: str = '127.0.0.1', port: int = 8000):
+        """
+        :param service: Service that answer request
+        :param host: Address to listen on, localhost by default
+        :param port: Port to listen on, 0 for random free port
+        """
+
+        super().__init__((host, port), ArtistHandler)
+
+        self.service = service
+
+        # Number of request by status code
+        self.requests = Counter()
+        self._requests_lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        """
+        Base URL of server
+        """
+        return f'http://{self.server_address[0]}:{self.server_address[1]}'
+
+    def count(self, status):
+        """
+        Count answered request
+        """
+        with self._requests_lock:
+            self.requests[status] += 1
+
+    def start(self):
+        """
+        Serve request on background thread
+        """
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """
+        Stop serving and close socket
+        """
+        self.shutdown()
+        self.server_close()
+
+
+class ArtistHandler(BaseHTTPRequestHandler):
+    """
+    Handle one request of artist server
+    """
+
+    server: ArtistServer
+
+    # Keep connection open between request of the same client
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        """
+        Request is counted instead of logged
+        """
+
+    def send_json(self, status, body: bytes):
+        """
+        Send response with json body
+        """
+
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+        self.server.count(status)
+
+    def send_error_json(self, status, message):
+        """
+        Send error message as json
+        """
+        self.send_json(status, encode({'error': message}))
+
+    def do_GET(self):
+        """
+        Answer GET request from artist service
+        """
+
+        url = urlparse(self.path)
+        query = {name: values[-1] for name, values in parse_qs(url.query).items()}
+        path = unquote(url.path)
+
+        if path == '/stats':
+            self.send_json(200, encode({**self.server.service.stats(), 'requests': self.server.requests}))
+            return
+
+        for pattern, handler in ROUTES:
+            match = pattern.match(path)
+
+            if match is None:
+                continue
+
+            try:
+                body = handler(self.server.service, query, *match.groups())
+            except KeyError as error:
+                self.send_error_json(400, f'Missing query parameter {error}')
+            except BadRequest as error:
+                self.send_error_json(400, str(error))
+            except spotipy.SpotifyException as error:
+                self.send_error_json(404 if error.http_status in (400, 404) else 502, error.msg)
+            except Exception as error:  # noqa: BLE001, client always get an answer
+                self.server.handle_error(self.request, self.client_address)
+                self.send_error_json(500, f'{type(error).__name__}: {error}')
+            else:
+                self.send_json(200, body)
+
+            return
+
+        self.send_error_json(404, f'Unknown path {path}')
+
+
+def main():
+    """
+    Start service from command line
+    """
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--sqlite', help='Use SQLite database file instead of csv database')
+    args = parser.parse_args()
+
+    import dotenv
+    from snapshotter import Snapshotter
+    from spotify_client import create_client
+
+    dotenv.load_dotenv()
+
+    if args.sqlite:
+        from artist_sqlite_db import SqliteArtistDb
+        db = SqliteArtistDb(create_client(), args.sqlite)
+    else:
+        from artist_db import ArtistDb
+        db = ArtistDb(create_client(), 'csv/artist.csv', 'csv/album', 'csv/track')
+
+    snapshotter = Snapshotter(db).start()
+
+    server = ArtistServer(ArtistService(db), args.host, args.port)
+    print(f'Serving on {server.url}')
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        snapshotter.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""
+Periodic background save of artist database
+
+Artist that got added is written to disk on a worker thread every few second
+instead of all at once when program exit. ArtistDb.update_csv write every file atomically,
+so the catalog on disk stay readable even if program is killed while saving.
+"""
+import atexit
+import threading
+
+
+class Snapshotter:
+    """
+    Save unsaved artist of database on background thread at fixed interval
+    """
+
+    def __init__(self, db, interval: float = 30.0):
+        """
+        :param db: ArtistDb or SqliteArtistDb object
+        :param interval: Second between save
+        """
+
+        self.db = db
+        self.interval = interval
+
+        self._stop = threading.Event()
+        self._thread = None
+
+        # Number of save done and failed, error of the latest failed save
+        self.snapshots = 0
+        self.failures = 0
+        self.last_error = None
+
+    def start(self) -> 'Snapshotter':
+        """
+        Start saving on background thread, what is left unsaved is saved when program exit
+        :return: This snapshotter
+        """
+
+        self._thread = threading.Thread(target=self._run, name='snapshotter', daemon=True)
+        self._thread.start()
+
+        atexit.register(self.stop)
+
+        return self
+
+    def _run(self):
+        """
+        Save database every interval until stopped
+        """
+
+        while not self._stop.wait(self.interval):
+            self.save()
+
+    def save(self) -> bool:
+        """
+        Save database if any artist is unsaved, failed save is tried again next interval
+        :return: True if database got saved
+        """
+
+        if not self.db.has_unsaved():
+            return False
+
+        try:
+            self.db.update_csv()
+        except OSError as error:
+            self.failures += 1
+            self.last_error = error
+            return False
+
+        self.snapshots += 1
+        return True
+
+    def stop(self):
+        """
+        Stop background thread and save what is left, can be called more than once
+        """
+
+        self._stop.set()
+        atexit.unregister(self.stop)
+
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+        if self.db.has_unsaved():
+            self.db.update_csv()
@@ -0,0 +1,77 @@
+"""
+Create Spotify object used by the application and the HTTP service
+
+MLT_SPOTIFY environment variable choose where Spotify response come from:
+    live    (default) Spotify Web API
+    record  Spotify Web API, every response is saved into MLT_SPOTIFY_STORE
+    replay  Only saved response, no network and no credential needed
+    warm    Saved response, Spotify Web API for anything that is not saved yet
+"""
+import atexit
+import os
+
+SPOTIFY_MODES = ('live', 'record', 'replay', 'warm')
+
+
+def create_spotify():
+    """
+    Create Spotify object that use Spotify Web API
+    :return: Spotify object wrapped by request scheduler
+    """
+
+    import spotipy
+    from spotipy.oauth2 import SpotifyClientCredentials
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+    from http_cache import CachingSession, DiskCacheStore
+    from scheduler import RequestScheduler, ScheduledSpotify
+
+    auth_manager = SpotifyClientCredentials()
+
+    session = CachingSession(DiskCacheStore('cache/http'))
+
+    # spotipy only set up retry on session that it create itself,
+    # 429 is left to scheduler so every thread back off together
+    retry = Retry(
+        total=3,
+        status=3,
+        read=False,
+        backoff_factor=0.3,
+        status_forcelist=[
+            code for code in spotipy.Spotify.default_retry_codes if code != 429
+        ]
+    )
+    session.mount('https://', HTTPAdapter(max_retries=retry))
+
+    return ScheduledSpotify(
+        spotipy.Spotify(auth_manager=auth_manager, requests_session=session),
+        RequestScheduler()
+    )
+
+
+def create_client():
+    """
+    Create Spotify object for mode chosen by MLT_SPOTIFY environment variable
+    :return: Spotify object
+    """
+
+    mode = os.environ.get('MLT_SPOTIFY', 'live')
+
+    if mode not in SPOTIFY_MODES:
+        raise ValueError(f'MLT_SPOTIFY must be one of {", ".join(SPOTIFY_MODES)}')
+
+    if mode == 'live':
+        return create_spotify()
+
+    from replay import RecordingSpotify, ReplaySpotify, ResponseStore
+
+    store = ResponseStore(os.environ.get('MLT_SPOTIFY_STORE', 'recordings/spotify.json.gz'))
+    atexit.register(store.save)
+
+    if mode == 'replay':
+        return ReplaySpotify(store)
+
+    if mode == 'record':
+        return RecordingSpotify(create_spotify(), store)
+
+    return ReplaySpotify(store, fallback=RecordingSpotify(create_spotify(), store))
@@ -0,0 +1,345 @@
+"""
+Per-stage tracing of artist selection pipeline and Spotify call
+
+Tracing is off unless MLT_TRACE environment variable is set to a file name:
+    MLT_TRACE=trace.jsonl python main.py                          JSON lines, one span per line
+    MLT_TRACE=trace.json MLT_TRACE_FORMAT=chrome python main.py   Chrome trace (chrome://tracing)
+    MLT_TRACE_OVERLAY=1                                           show summary in status bar
+When tracing is off span() cost a single attribute check.
+"""
+import atexit
+import functools
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+
+class Span:
+    """
+    Timed stage with name and attribute such as count and byte size
+    """
+
+    __slots__ = ('name', 'attributes', 'parent', 'root', 'start', 'end', 'thread', 'totals')
+
+    def __init__(self, name: str, attributes: dict, parent: 'Span'):
+        self.name = name
+        self.attributes = attributes
+        self.parent = parent
+        self.root = parent.root if parent else self
+        self.thread = threading.get_ident()
+        self.start = time.perf_counter()
+        self.end = None
+
+        # Duration, count and byte of every descendant span by name, only used by root span
+        self.totals = defaultdict(lambda: {'duration': 0.0, 'count': 0, 'bytes': 0})
+
+    @property
+    def duration(self) -> float:
+        """
+        Second from start to end of span
+        """
+        return (self.end or time.perf_counter()) - self.start
+
+    def set(self, **attributes):
+        """
+        Add attribute to span
+        """
+        self.attributes.update(attributes)
+
+
+class _NoSpan:
+    """
+    Span returned when tracing is off
+    """
+
+    def set(self, **attributes):
+        """
+        Ignore attribute
+        """
+
+
+NO_SPAN = _NoSpan()
+
+
+class Tracer:
+    """
+    Collect span of every thread and export them
+    """
+
+    def __init__(self, file_name: str = None, trace_format: str = 'jsonl', enabled: bool = None):
+        """
+        :param file_name: File to export span into, span is only kept in memory when None
+        :param trace_format: 'jsonl' or 'chrome'
+        :param enabled: Trace without exporting when True, enabled when file_name is given by default
+        """
+
+        if trace_format not in ('jsonl', 'chrome'):
+            raise ValueError(f'Unknown trace format {trace_format}')
+
+        self.enabled = bool(file_name) if enabled is None else enabled
+        self.file_name = file_name
+        self.trace_format = trace_format
+
+        self._origin = time.perf_counter()
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._events = []
+        self._summary = {}
+        self._file = None
+
+        if self.enabled and file_name and trace_format == 'jsonl':
+            self._file = open(file_name, 'w', encoding='utf-8')
+
+        if self.enabled and file_name:
+            atexit.register(self.close)
+
+    @classmethod
+    def from_environment(cls) -> 'Tracer':
+        """
+        Create tracer from MLT_TRACE and MLT_TRACE_FORMAT environment variable
+        """
+        return cls(os.environ.get('MLT_TRACE'), os.environ.get('MLT_TRACE_FORMAT', 'jsonl'))
+
+    def _stack(self) -> list:
+        """
+        Open span of current thread
+        """
+
+        stack = getattr(self._local, 'stack', None)
+
+        if stack is None:
+            stack = self._local.stack = []
+
+        return stack
+
+    def current_span(self):
+        """
+        Return innermost open span of current thread
+        """
+
+        if not self.enabled:
+            return NO_SPAN
+
+        stack = self._stack()
+        return stack[-1] if stack else NO_SPAN
+
+    @contextmanager
+    def span(self, name: str, **attributes):
+        """
+        Time with block as a span nested in current span of this thread
+        :param name: Name of stage
+        :param attributes: Attribute of span
+        """
+
+        if not self.enabled:
+            yield NO_SPAN
+            return
+
+        stack = self._stack()
+        current = Span(name, attributes, stack[-1] if stack else None)
+        stack.append(current)
+
+        try:
+            yield current
+        finally:
+            stack.pop()
+            current.end = time.perf_counter()
+            self._finish(current)
+
+    def _finish(self, span: Span):
+        """
+        Add finished span to summary of its root and export it
+        """
+
+        with self._lock:
+
+            if span.root is span:
+                self._summary[span.name] = {
+                    'duration': span.duration,
+                    'attributes': dict(span.attributes),
+                    'stages': {name: dict(total) for name, total in span.root.totals.items()},
+                }
+            else:
+                total = span.root.totals[span.name]
+                total['duration'] += span.duration
+                total['count'] += 1
+                total['bytes'] += span.attributes.get('bytes', 0)
+
+            if self._file:
+                self._file.write(json.dumps({
+                    'name': span.name,
+                    'start': span.start - self._origin,
+                    'duration': span.duration,
+                    'thread': span.thread,
+                    'parent': span.parent.name if span.parent else None,
+                    'attributes': span.attributes,
+                }, default=str) + '\n')
+                self._file.flush()
+            elif self.file_name:
+                self._events.append({
+                    'name': span.name,
+                    'ph': 'X',
+                    'ts': (span.start - self._origin) * 1e6,
+                    'dur': span.duration * 1e6,
+                    'pid': os.getpid(),
+                    'tid': span.thread,
+                    'args': span.attributes,
+                })
+
+    def summary(self, name: str):
+        """
+        Return summary of the latest root span with name
+        :param name: Name of root span
+        :return: Dictionary of duration, attribute and total of each stage or None
+        """
+
+        with self._lock:
+            return self._summary.get(name)
+
+    def close(self):
+        """
+        Write remaining span into file
+        """
+
+        with self._lock:
+
+            if self._file:
+                self._file.close()
+                self._file = None
+
+            if self.file_name and self.trace_format == 'chrome':
+                with open(self.file_name, 'w', encoding='utf-8') as file:
+                    json.dump({'traceEvents': self._events}, file, default=str)
+
+
+tracer = Tracer.from_environment()
+
+# Show summary of selection in GUI status bar
+OVERLAY = tracer.enabled and os.environ.get('MLT_TRACE_OVERLAY', '') not in ('', '0')
+
+
+def span(name: str, **attributes):
+    """
+    Time with block as a span of default tracer
+    """
+    return tracer.span(name, **attributes)
+
+
+def current_span():
+    """
+    Return innermost open span of current thread of default tracer
+    """
+    return tracer.current_span()
+
+
+def traced(name: str):
+    """
+    Decorator that time every call of function as a span
+    :param name: Name of span
+    """
+
+    def decorator(function):
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not tracer.enabled:
+                return function(*args, **kwargs)
+
+            with tracer.span(name):
+                return function(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def _count_items(result) -> int:
+    """
+    Return number of item in Spotify response
+    """
+
+    if not isinstance(result, dict):
+        return 1
+
+    # Paging object such as artist_albums
+    if isinstance(result.get('items'), list):
+        return len(result['items'])
+
+    # List wrapped in a single key such as albums, tracks and search
+    if len(result) == 1:
+        value = next(iter(result.values()))
+
+        if isinstance(value, list):
+            return len(value)
+        if isinstance(value, dict) and isinstance(value.get('items'), list):
+            return len(value['items'])
+
+    return 1
+
+
+class TracedSpotify:
+    """
+    Wrapper of spotipy.Spotify object that time every method call with response size
+    """
+
+    def __init__(self, sp):
+        """
+        :param sp: Spotify object to wrap
+        """
+        self._sp = sp
+
+    def __getattr__(self, name):
+        attribute = getattr(self._sp, name)
+
+        if not callable(attribute):
+            return attribute
+
+        def call(*args, **kwargs):
+            with span(f'spotify.{name}') as current:
+                result = attribute(*args, **kwargs)
+                current.set(
+                    items=_count_items(result),
+                    bytes=len(json.dumps(result)) if result is not None else 0
+                )
+
+            return result
+
+        return call
+
+
+def trace_client(sp):
+    """
+    Wrap Spotify object when tracing is on
+    :param sp: Spotify object
+    :return: Traced Spotify object or sp itself when tracing is off
+    """
+    return TracedSpotify(sp) if tracer.enabled else sp
+
+
+def format_summary(summary: dict, limit: int = 6) -> str:
+    """
+    Format span summary as one line of text for status bar
+    :param summary: Summary returned by Tracer.summary
+    :param limit: Maximum number of stage to show
+    :return: Text of summary
+    """
+
+    stages = sorted(summary['stages'].items(), key=lambda item: item[1]['duration'], reverse=True)
+
+    parts = [f"total {summary['duration'] * 1000:.0f} ms"]
+
+    for name, total in stages[:limit]:
+        text = f"{name} {total['duration'] * 1000:.0f} ms"
+
+        if total['count'] > 1:
+            text += f" x{total['count']}"
+
+        if total['bytes']:
+            text += f" {total['bytes'] / 1024:.0f} kB"
+
+        parts.append(text)
+
+    return ' | '.join(parts)